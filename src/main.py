@@ -1,5 +1,12 @@
+import sys
+
 from textlayer.app import run_app
 
 
 if __name__ == "__main__":
+    # Any arguments select the command line tools; none starts the GUI.
+    if len(sys.argv) > 1:
+        from textlayer.cli import main
+
+        sys.exit(main())
     run_app()
@@ -1,10 +1,13 @@
+import logging
 import sys
+
 from PySide6.QtCore import QCoreApplication
 from PySide6.QtWidgets import QApplication
 
 from textlayer.font_utils import pick_font_for_language
 from textlayer.i18n import I18nManager
 from textlayer.logging_config import setup_logging
+from textlayer.services.workspace import configure_workspace
 from textlayer.settings import SettingsManager
 from textlayer.ui.main_window import MainWindow
 
@@ -16,6 +19,15 @@ def run_app() -> None:
 
     setup_logging()
     settings = SettingsManager()
+    try:
+        configure_workspace(
+            settings.get_temp_dir(),
+            settings.get_job_temp_budget_mb(),
+            settings.get_total_temp_budget_mb(),
+        )
+    except OSError:
+        # An unplugged RAM disk or missing drive falls back to the system temp.
+        logging.getLogger(__name__).warning("Temp folder %s unavailable", settings.get_temp_dir())
 
     i18n = I18nManager()
     lang = settings.get_language()
@@ -0,0 +1,536 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from textlayer.logging_config import setup_logging
+from textlayer.services.confidence import DEFAULT_REFINE_THRESHOLD
+from textlayer.services.detection import BLANK_PAGE_MODES, DEFAULT_BLANK_MODE, DetectionResult, detect_file
+from textlayer.services.journal import DEFAULT_MAX_ATTEMPTS, JobJournal, JournalEntry
+from textlayer.services.ocr_service import DEFAULT_STALL_SECONDS, OCRResult, OCRTask
+from textlayer.services.prefetch import DEFAULT_PREFETCH_BUDGET_MB, DEFAULT_PREFETCH_DEPTH
+from textlayer.services.rasterize import DEFAULT_RASTERIZER, RASTERIZERS
+from textlayer.services.tesseract_pool import DEFAULT_ENGINE, ENGINE_CHOICES
+from textlayer.services.workspace import configure_workspace
+
+logger = logging.getLogger(__name__)
+
+
+_REJECT_DECISIONS = (
+    "reject_not_found",
+    "reject_not_pdf",
+    "reject_encrypted",
+    "reject_signed",
+    "reject_error",
+    "reject_empty",
+)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="textlayer", description="TextLayer command line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser("coordinator", help="Split PDFs into page ranges and OCR them on workers.")
+    coordinator.add_argument("inputs", nargs="+", help="Input PDF files.")
+    coordinator.add_argument("--output-dir", required=True, help="Directory for output PDFs and sidecars.")
+    coordinator.add_argument(
+        "--bind",
+        default="127.0.0.1:50000",
+        help="host:port to listen on; the default only accepts workers on this machine (e.g. 0.0.0.0:50000 for all).",
+    )
+    coordinator.add_argument("--chunk-pages", type=int, default=10, help="Pages per work item.")
+    coordinator.add_argument("--local-workers", type=int, default=0, help="Also start N workers on this machine.")
+    _add_authkey_option(coordinator)
+    _add_ocr_options(coordinator)
+    _add_workspace_options(coordinator)
+    coordinator.set_defaults(handler=_run_coordinator)
+
+    worker = commands.add_parser("worker", help="Process page ranges for a coordinator.")
+    worker.add_argument("--connect", required=True, help="Coordinator host:port.")
+    worker.add_argument("--tesseract-path", default="", help="Local path to the Tesseract executable.")
+    _add_authkey_option(worker)
+    _add_workspace_options(worker)
+    worker.set_defaults(handler=_run_worker)
+
+    batch = commands.add_parser("batch", help="OCR many PDFs on this machine, shortest predicted job first.")
+    batch.add_argument("inputs", nargs="*", help="Input PDF files.")
+    batch.add_argument("--output-dir", default="", help="Directory for output PDFs and sidecars.")
+    batch.add_argument("--parallel", type=int, default=2, help="Documents converted at the same time.")
+    batch.add_argument(
+        "--resume",
+        action="store_true",
+        help="Also run the unfinished jobs of earlier batches from the job journal, with their own options.",
+    )
+    batch.add_argument(
+        "--attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Runs per document before it counts as failed; retries wait longer each time.",
+    )
+    batch.add_argument("--no-journal", action="store_true", help="Do not record or skip jobs in the job journal.")
+    batch.add_argument(
+        "--prefetch",
+        type=int,
+        default=DEFAULT_PREFETCH_DEPTH,
+        help="Inputs on network shares copied to local staging ahead of their job (0: off).",
+    )
+    batch.add_argument(
+        "--prefetch-budget-mb",
+        type=int,
+        default=DEFAULT_PREFETCH_BUDGET_MB,
+        help="Local space prefetched inputs may take while they wait.",
+    )
+    _add_ocr_options(batch)
+    _add_workspace_options(batch)
+    batch.set_defaults(handler=_run_batch)
+
+    preflight = commands.add_parser("preflight", help="Inventory a directory tree without converting anything.")
+    preflight.add_argument("root", help="Directory to scan recursively.")
+    preflight.add_argument("--output", required=True, help="Report file (.jsonl or .csv); an existing report is resumed.")
+    preflight.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Default: from the report extension.")
+    preflight.add_argument("--workers", type=int, default=0, help="Detection processes (default: one per CPU).")
+    preflight.add_argument("--all-files", action="store_true", help="Report non-PDF files too.")
+    preflight.add_argument("-l", "--lang", default="chi_sim", help="OCR language(s) assumed for time estimates.")
+    preflight.add_argument("--output-type", choices=["pdfa", "pdfa_fast", "pdf"], default="pdfa")
+    preflight.set_defaults(handler=_run_preflight)
+
+    bench = commands.add_parser("bench-raster", help="Time page rendering with each available rasterizer.")
+    bench.add_argument("input", help="PDF to render.")
+    bench.add_argument("--pages", type=int, default=5, help="Render the first N pages.")
+    bench.add_argument("--dpi", type=float, default=300.0)
+    bench.add_argument(
+        "--device",
+        choices=["png16m", "pnggray", "pngmono", "png256", "jpeg", "jpeggray"],
+        default="png16m",
+        help="Ghostscript device (pixel format) to render to.",
+    )
+    bench.set_defaults(handler=_run_bench_raster)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    if hasattr(args, "temp_dir"):
+        configure_workspace(args.temp_dir, args.job_temp_budget_mb, args.temp_budget_mb)
+    return args.handler(args)
+
+
+def _add_authkey_option(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--authkey",
+        default=os.environ.get("TEXTLAYER_AUTHKEY", ""),
+        help=(
+            "Shared secret between coordinator and workers (default: $TEXTLAYER_AUTHKEY). "
+            "Without one the coordinator makes up a random key and prints it."
+        ),
+    )
+
+
+def _add_ocr_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("-l", "--lang", default="chi_sim", help="Tesseract language(s), e.g. eng or eng+jpn, or auto to detect per document.")
+    parser.add_argument("--output-type", choices=["pdfa", "pdfa_fast", "pdf"], default="pdfa")
+    parser.add_argument("--color-strategy", choices=["auto", "rgb", "gray"], default="auto")
+    parser.add_argument("--preprocess", choices=["none", "auto", "binarize"], default="none")
+    parser.add_argument("--optimize", choices=["none", "fast", "balanced", "max"], default="fast")
+    parser.add_argument("--redo-ocr", action="store_true", help="Rebuild the text layer of image + text PDFs.")
+    parser.add_argument("--tesseract-path", default="", help="Path to the Tesseract executable.")
+    parser.add_argument("--no-sidecar", action="store_true", help="Do not write the OCR text file.")
+    parser.add_argument("--words", action="store_true", help="Also write word boxes as .words.npz, .hocr and .alto.xml.")
+    parser.add_argument(
+        "--ocr-engine",
+        choices=ENGINE_CHOICES,
+        default=DEFAULT_ENGINE,
+        help="cli runs tesseract per page; persistent keeps models loaded in worker processes.",
+    )
+    parser.add_argument(
+        "--rasterizer",
+        choices=RASTERIZERS,
+        default=DEFAULT_RASTERIZER,
+        help=(
+            "default leaves page rendering to OCRmyPDF; pymupdf renders pages with PyMuPDF; "
+            "embedded OCRs the scan image of single-image pages directly."
+        ),
+    )
+    parser.add_argument("--timeout", type=float, default=0, help="Seconds per OCRmyPDF run (0: derived from the estimate).")
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=DEFAULT_STALL_SECONDS,
+        help="Stop a run with no output and no CPU use for this many seconds (0: never).",
+    )
+    parser.add_argument("--memory-limit-mb", type=int, default=0, help="Memory limit for the OCR process tree (0: 80%% of RAM).")
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="OCR at reduced resolution first, then re-OCR pages with low word confidence.",
+    )
+    parser.add_argument(
+        "--refine-below",
+        type=float,
+        default=DEFAULT_REFINE_THRESHOLD,
+        help="Mean word confidence (0-100) below which --adaptive re-OCRs a page.",
+    )
+    parser.add_argument(
+        "--blank-pages",
+        choices=BLANK_PAGE_MODES,
+        default=DEFAULT_BLANK_MODE,
+        help="off OCRs blank pages; skip leaves them without OCR; drop removes them from the output.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "With --output-type pdf, write the input unchanged plus an incremental update holding the "
+            "text layer instead of rewriting the whole file."
+        ),
+    )
+
+
+def _add_workspace_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--temp-dir",
+        default=os.environ.get("TEXTLAYER_TMPDIR", ""),
+        help="Root for OCR intermediates, e.g. a RAM disk (default: $TEXTLAYER_TMPDIR or the system temp).",
+    )
+    parser.add_argument("--temp-budget-mb", type=int, default=0, help="Temp space shared by running jobs (0: free space only).")
+    parser.add_argument("--job-temp-budget-mb", type=int, default=0, help="Temp space one job may use (0: no limit).")
+
+
+def _parse_address(value: str) -> tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _check_detection(path: str, result: DetectionResult, redo_ocr: bool) -> bool:
+    if result.decision in _REJECT_DECISIONS or result.decision in ("skip_text_only", "skip_blank"):
+        print(f"SKIP {path}: {result.details}")
+        return False
+    if result.decision == "ask_reocr" and not redo_ocr:
+        print(f"SKIP {path}: {result.details} (pass --redo-ocr)")
+        return False
+    return True
+
+
+def _build_task(args: argparse.Namespace, input_pdf: str, result: Optional[DetectionResult]) -> OCRTask:
+    # Without a detection result: the task as far as the options decide it.
+    stem = Path(input_pdf).stem
+    output_dir = Path(args.output_dir)
+    return OCRTask(
+        input_pdf=input_pdf,
+        output_pdf=str(output_dir / f"{stem}_textlayer.pdf"),
+        lang=args.lang,
+        output_txt=None if args.no_sidecar else str(output_dir / f"{stem}_ocr.txt"),
+        tesseract_path=args.tesseract_path,
+        redo_ocr=result is not None and result.decision == "ask_reocr",
+        output_type=args.output_type,
+        color_strategy=args.color_strategy,
+        preprocess=args.preprocess,
+        optimize=args.optimize,
+        page_count=result.page_count if result is not None else 0,
+        output_words=str(output_dir / stem) if args.words else None,
+        ocr_engine=args.ocr_engine,
+        rasterizer=args.rasterizer,
+        timeout_seconds=args.timeout,
+        stall_seconds=args.stall_timeout,
+        memory_limit_mb=args.memory_limit_mb,
+        adaptive=args.adaptive,
+        refine_threshold=args.refine_below,
+        blank_pages=args.blank_pages,
+        incremental=args.incremental,
+        profile=result.profile if result is not None else None,
+    )
+
+
+def _outcome_line(path: str, outcome: OCRResult) -> str:
+    line = f"{'OK' if outcome.success else 'FAIL'} {path}: {outcome.message}"
+    if outcome.report is not None and outcome.report.blank_pages:
+        action = "removed" if outcome.report.blank_removed else "skipped"
+        line += f" ({len(outcome.report.blank_pages)} blank page(s) {action})"
+    if outcome.report is not None and outcome.report.incremental:
+        line += " (text layer appended to the input)"
+    return line
+
+
+def _print_progress(percent: int, line: str) -> None:
+    if percent >= 0:
+        logger.info("%d%% %s", percent, line)
+
+
+def _run_coordinator(args: argparse.Namespace) -> int:
+    from textlayer.services.distributed import Coordinator, spawn_local_workers
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    authkey = args.authkey.encode("utf-8") if args.authkey else None
+    coordinator = Coordinator(_parse_address(args.bind), authkey=authkey, chunk_pages=args.chunk_pages)
+    coordinator.start()
+    if authkey is None:
+        # Remote workers need it; local ones are handed it directly.
+        print(f"Worker authkey: {coordinator.authkey.decode('ascii')}")
+    workers = spawn_local_workers(args.local_workers, coordinator.address, coordinator.authkey)
+    failures = 0
+    try:
+        for input_pdf in args.inputs:
+            result = detect_file(input_pdf)
+            if not _check_detection(input_pdf, result, args.redo_ocr):
+                continue
+            outcome = coordinator.process(_build_task(args, input_pdf, result), _print_progress)
+            print(_outcome_line(input_pdf, outcome))
+            if not outcome.success:
+                failures += 1
+    finally:
+        coordinator.stop()
+        for process in workers:
+            process.join(timeout=10)
+    return 1 if failures else 0
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    import asyncio
+    import shutil
+    import time
+
+    from textlayer.services.estimator import extract_features, get_estimator
+    from textlayer.services.input_source import is_remote_path
+    from textlayer.services.job_queue import JobQueue
+    from textlayer.services.ocr_service import run_ocr_task_async
+    from textlayer.services.prefetch import Prefetcher, local_outputs, output_staging_dir, write_back
+    from textlayer.services.resource_governor import get_governor
+    from textlayer.utils import format_dt
+
+    if not args.inputs and not args.resume:
+        print("Nothing to convert: give input files or --resume.")
+        return 2
+    if args.inputs and not args.output_dir:
+        print("--output-dir is required with input files.")
+        return 2
+    if args.resume and args.no_journal:
+        print("--resume needs the job journal.")
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    journal = None if args.no_journal else JobJournal()
+    batch_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    estimator = get_estimator()
+    # Jobs of this run: task, predicted seconds and journal id (None
+    # without a journal). Retries come back by journal id.
+    ready: list[tuple[OCRTask, float, Optional[int]]] = []
+    known: dict[int, tuple[OCRTask, float]] = {}
+    # Input path -> failed for good; a later successful retry clears it.
+    failures: dict[str, bool] = {}
+
+    if journal is not None:
+        journal.recover()
+    for input_pdf in args.inputs:
+        if journal is not None:
+            # Skip inputs finished by an earlier run before reading them.
+            probe = _build_task(args, input_pdf, None)
+            done = journal.completed([probe, dataclasses.replace(probe, redo_ocr=True)] if args.redo_ocr else [probe])
+            if done is not None:
+                print(f"DONE {input_pdf}: converted {format_dt(done.finished_at)}")
+                continue
+        result = detect_file(input_pdf)
+        if not _check_detection(input_pdf, result, args.redo_ocr):
+            continue
+        task = _build_task(args, input_pdf, result)
+        features = extract_features(input_pdf, result.page_count, task.lang, task.output_type, profile=result.profile)
+        predicted = estimator.predict(features)
+        job_id = None
+        if journal is not None:
+            entry = journal.add(task, batch_id, predicted, args.attempts)
+            if entry.state == "done":
+                print(f"DONE {input_pdf}: converted {format_dt(entry.finished_at)}")
+                continue
+            if entry.state == "running":
+                print(f"SKIP {input_pdf}: being converted by process {entry.pid}")
+                continue
+            if entry.state == "failed":
+                print(f"FAIL {input_pdf}: {entry.message}")
+                failures[input_pdf] = True
+                continue
+            job_id = entry.job_id
+            known[job_id] = (task, predicted)
+        ready.append((task, predicted, job_id))
+        logger.info("Queued %s (%d pages, ~%.0fs)", input_pdf, result.page_count, predicted)
+
+    if args.resume:
+        now = time.time()
+        for entry in journal.pending():
+            if entry.job_id in known:
+                continue
+            task = _resume_task(journal, entry)
+            if task is None:
+                continue
+            known[entry.job_id] = (task, entry.predicted_seconds)
+            if not entry.retrying or entry.next_attempt_at <= now:
+                ready.append((task, entry.predicted_seconds, entry.job_id))
+            logger.info("Resuming %s from batch %s", task.input_pdf, entry.batch)
+
+    async def finish(
+        task: OCRTask,
+        local_task: OCRTask,
+        outcome: OCRResult,
+        local_dir: Optional[str],
+        job_id: Optional[int],
+        seconds: float,
+    ) -> None:
+        try:
+            if local_dir is not None and outcome.success:
+                await asyncio.to_thread(write_back, local_task, task)
+                outcome = dataclasses.replace(outcome, output_pdf=task.output_pdf, output_txt=task.output_txt or "")
+        except OSError as exc:
+            outcome = OCRResult(False, f"Could not write output: {exc}")
+        finally:
+            if local_dir is not None:
+                shutil.rmtree(local_dir, ignore_errors=True)
+        line = _outcome_line(task.input_pdf, outcome)
+        entry = journal.finish(job_id, outcome, seconds) if journal is not None and job_id is not None else None
+        if entry is not None and entry.retrying:
+            line += f" (attempt {entry.attempts} of {entry.max_attempts}, retry in {entry.next_attempt_at - time.time():.0f}s)"
+        print(line)
+        failures[task.input_pdf] = not outcome.success and not (entry is not None and entry.retrying)
+
+    async def consume(queue: JobQueue, prefetcher: Prefetcher, job_ids: dict[int, Optional[int]]) -> None:
+        # At most one write-back per consumer is in flight, which bounds
+        # the local space finished outputs take.
+        writing = None
+        governor = get_governor()
+        # The queue is already closed, so get() returns at once.
+        while (job := queue.get()) is not None:
+            # Announced before the other consumers' jobs take their cores,
+            # so parallel jobs split them instead of the first taking all.
+            ticket = governor.expect(job.task.page_count)
+            governor.bind(ticket)
+            source = await prefetcher.take(job)
+            job_id = job_ids[job.sequence]
+            if journal is not None and job_id is not None and not journal.start(job_id):
+                # Another process resumed the same job meanwhile.
+                print(f"SKIP {job.task.input_pdf}: taken by another process")
+                governor.forget(ticket)
+                if source is not None:
+                    source.close()
+                continue
+            task = dataclasses.replace(job.task, input_source=source) if source else job.task
+            # Outputs for a network share are written locally first and
+            # copied back while the next job already runs.
+            remote_output = is_remote_path(os.path.dirname(os.path.abspath(task.output_pdf)))
+            local_dir = output_staging_dir() if remote_output else None
+            local_task = local_outputs(task, local_dir) if local_dir else task
+            started = time.monotonic()
+            try:
+                outcome = await run_ocr_task_async(local_task, _print_progress)
+            except asyncio.CancelledError:
+                # Interrupted, not failed: the next --resume runs it again.
+                if journal is not None and job_id is not None:
+                    journal.requeue(job_id)
+                raise
+            finally:
+                governor.forget(ticket)
+                if source is not None:
+                    source.close()
+            seconds = time.monotonic() - started
+            if writing is not None:
+                await writing
+            writing = asyncio.create_task(finish(job.task, local_task, outcome, local_dir, job_id, seconds))
+        if writing is not None:
+            await writing
+
+    async def run_round(jobs: list[tuple[OCRTask, float, Optional[int]]]) -> None:
+        queue = JobQueue()
+        job_ids = {}
+        for task, predicted, job_id in jobs:
+            job_ids[queue.put(task, predicted).sequence] = job_id
+        queue.close()
+        prefetcher = Prefetcher(queue, args.prefetch, args.prefetch_budget_mb)
+        prefetcher.fill()
+        try:
+            await asyncio.gather(*(consume(queue, prefetcher, job_ids) for _ in range(max(1, args.parallel))))
+        finally:
+            await prefetcher.close()
+
+    async def run_all() -> None:
+        # All consumers share one event loop; Ctrl+C cancels them, which
+        # kills their OCRmyPDF process trees. Failed jobs with attempts
+        # left run again in later rounds once their retry is due.
+        jobs = ready
+        while True:
+            if jobs:
+                await run_round(jobs)
+            if journal is None:
+                return
+            retries = [entry for entry in journal.pending() if entry.job_id in known and entry.retrying]
+            if not retries:
+                return
+            wait = max(0.0, min(entry.next_attempt_at for entry in retries) - time.time())
+            logger.info("%d job(s) to retry, next in %.0fs", len(retries), wait)
+            await asyncio.sleep(wait)
+            now = time.time()
+            jobs = [(*known[entry.job_id], entry.job_id) for entry in retries if entry.next_attempt_at <= now]
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        if journal is not None:
+            journal.close()
+    return 1 if any(failures.values()) else 0
+
+
+def _resume_task(journal: JobJournal, entry: JournalEntry) -> Optional[OCRTask]:
+    # The journaled task, checked and analyzed again; the file may have
+    # changed or gone since it was queued.
+    task = entry.task
+    result = detect_file(task.input_pdf)
+    if not _check_detection(task.input_pdf, result, task.redo_ocr):
+        journal.abandon(entry.job_id, result.details)
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(task.output_pdf)), exist_ok=True)
+    return dataclasses.replace(task, page_count=result.page_count, profile=result.profile)
+
+
+def _run_bench_raster(args: argparse.Namespace) -> int:
+    from textlayer.services.rasterize import benchmark_rasterizers
+
+    timings = benchmark_rasterizers(args.input, args.pages, args.dpi, args.device)
+    for timing in timings:
+        if not timing.available:
+            print(f"{timing.name:12} not available")
+        elif timing.error:
+            print(f"{timing.name:12} failed: {timing.error}")
+        else:
+            print(
+                f"{timing.name:12} {timing.pages} page(s) in {timing.seconds:.2f}s "
+                f"({timing.seconds_per_page:.3f}s/page), {timing.size[0]}x{timing.size[1]} px"
+            )
+    return 0 if any(timing.pages for timing in timings) else 1
+
+
+def _run_worker(args: argparse.Namespace) -> int:
+    from textlayer.services.distributed import run_worker
+
+    if not args.authkey:
+        print("A worker needs the coordinator's --authkey (or $TEXTLAYER_AUTHKEY).")
+        return 2
+    run_worker(_parse_address(args.connect), args.authkey.encode("utf-8"), tesseract_path=args.tesseract_path)
+    return 0
+
+
+def _run_preflight(args: argparse.Namespace) -> int:
+    from textlayer.services.preflight import run_preflight
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    summary = run_preflight(
+        args.root,
+        args.output,
+        fmt=fmt,
+        workers=args.workers,
+        all_files=args.all_files,
+        lang=args.lang,
+        output_type=args.output_type,
+    )
+    print(f"Inspected {summary.files} files ({summary.resumed} already in report), {summary.pages} pages.")
+    for decision, count in sorted(summary.decisions.items()):
+        print(f"  {decision}: {count}")
+    print(f"Estimated OCR time: {summary.est_seconds / 3600:.1f} core-hours")
+    return 0
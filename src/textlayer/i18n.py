@@ -64,6 +64,56 @@ _TRANSLATIONS = {
         "No OCR text available. Run OCR first.": "\u6ca1\u6709OCR\u6587\u672c\uff0c\u8bf7\u5148\u6267\u884cOCR\u3002",
         "Saved text to {path}": "\u5df2\u4fdd\u5b58\u6587\u672c\u5230 {path}",
         "Tesseract language '{lang}' not installed.": "Tesseract\u8bed\u8a00\u5305\u672a\u5b89\u88c5\uff1a{lang}",
+        "Preprocessing": "\u9884\u5904\u7406",
+        "Off": "\u5173\u95ed",
+        "Auto + Binarize": "\u81ea\u52a8 + \u4e8c\u503c\u5316",
+        "Optimization": "\u4f18\u5316",
+        "None": "\u65e0",
+        "Fast": "\u5feb\u901f",
+        "Balanced": "\u5747\u8861",
+        "Max": "\u6700\u5927",
+        "Output size: {before} -> {after} ({saved}% saved) in {seconds}s": "\u8f93\u51fa\u5927\u5c0f\uff1a{before} -> {after}\uff08\u8282\u7701 {saved}%\uff09\uff0c\u8017\u65f6 {seconds} \u79d2",
+        "Word Data": "\u8bcd\u5750\u6807\u6570\u636e",
+        "OCR language: {lang}": "OCR \u8bed\u8a00\uff1a{lang}",
+        "OCR Engine": "OCR \u5f15\u64ce",
+        "Per page": "\u9010\u9875",
+        "Persistent": "\u5e38\u9a7b",
+        "Set Temp Folder...": "\u8bbe\u7f6e\u4e34\u65f6\u6587\u4ef6\u5939...",
+        "Select temp folder (e.g. a RAM disk or fast local drive)": "\u9009\u62e9\u4e34\u65f6\u6587\u4ef6\u5939\uff08\u4f8b\u5982 RAM \u78c1\u76d8\u6216\u5feb\u901f\u672c\u5730\u78c1\u76d8\uff09",
+        "Temp folder saved.": "\u4e34\u65f6\u6587\u4ef6\u5939\u5df2\u4fdd\u5b58\u3002",
+        "All": "\u5168\u90e8",
+        "Warnings and errors": "\u8b66\u544a\u548c\u9519\u8bef",
+        "Errors only": "\u4ec5\u9519\u8bef",
+        "Open Full Log": "\u6253\u5f00\u5b8c\u6574\u65e5\u5fd7",
+        "Log file: {path}": "\u65e5\u5fd7\u6587\u4ef6\uff1a{path}",
+        "CPU time {seconds}s, peak memory {memory}": "CPU \u65f6\u95f4 {seconds} \u79d2\uff0c\u5cf0\u503c\u5185\u5b58 {memory}",
+        "image": "\u56fe\u50cf",
+        "text": "\u6587\u5b57",
+        "image + text": "\u56fe\u50cf + \u6587\u5b57",
+        "blank": "\u7a7a\u767d",
+        "OCR Passes": "\u8bc6\u522b\u904d\u6570",
+        "Single": "\u5355\u6b21",
+        "Adaptive": "\u81ea\u9002\u5e94",
+        "Mean confidence {mean}, {refined} page(s) re-OCRed, {low} still below {threshold}": "\u5e73\u5747\u7f6e\u4fe1\u5ea6 {mean}\uff0c\u91cd\u65b0\u8bc6\u522b {refined} \u9875\uff0c\u4ecd\u6709 {low} \u9875\u4f4e\u4e8e {threshold}",
+        "Blank Pages": "\u7a7a\u767d\u9875",
+        "OCR": "\u8bc6\u522b",
+        "Skip OCR": "\u8df3\u8fc7\u8bc6\u522b",
+        "Remove": "\u5220\u9664",
+        "{count} blank page(s) removed": "\u5df2\u5220\u9664 {count} \u4e2a\u7a7a\u767d\u9875",
+        "{count} blank page(s) skipped": "\u5df2\u8df3\u8fc7 {count} \u4e2a\u7a7a\u767d\u9875",
+        "PDF has no pages. Rejected.": "PDF\u6ca1\u6709\u9875\u9762\u3002\u5df2\u62d2\u7edd\u3002",
+        "PDF pages are blank. No conversion.": "PDF\u9875\u9762\u5747\u4e3a\u7a7a\u767d\uff0c\u4e0d\u6267\u884c\u8f6c\u6362\u3002",
+        "Cancel": "\u53d6\u6d88",
+        "Cancelling...": "\u6b63\u5728\u53d6\u6d88...",
+        "Conversion cancelled.": "\u8f6c\u6362\u5df2\u53d6\u6d88\u3002",
+        "Page Rendering": "\u9875\u9762\u6e32\u67d3",
+        "Embedded Images": "\u5d4c\u5165\u56fe\u50cf",
+        "Resume Conversion": "\u7ee7\u7eed\u8f6c\u6362",
+        "The conversion of {name} did not finish. Resume it?": "{name} \u7684\u8f6c\u6362\u672a\u5b8c\u6210\u3002\u662f\u5426\u7ee7\u7eed\uff1f",
+        "PDF Writing": "PDF \u5199\u5165\u65b9\u5f0f",
+        "Rewrite": "\u5b8c\u6574\u91cd\u5199",
+        "Append to Input": "\u8ffd\u52a0\u5230\u539f\u6587\u4ef6",
+        "Text layer appended to the input file": "\u6587\u672c\u5c42\u5df2\u8ffd\u52a0\u5230\u539f\u6587\u4ef6",
     },
     "ja": {
         "Input": "\u5165\u529b",
@@ -126,6 +176,56 @@ _TRANSLATIONS = {
         "No OCR text available. Run OCR first.": "OCR\u30c6\u30ad\u30b9\u30c8\u304c\u3042\u308a\u307e\u305b\u3093\u3002\u5148\u306bOCR\u3092\u5b9f\u884c\u3057\u3066\u304f\u3060\u3055\u3044\u3002",
         "Saved text to {path}": "\u30c6\u30ad\u30b9\u30c8\u3092\u4fdd\u5b58\u3057\u307e\u3057\u305f: {path}",
         "Tesseract language '{lang}' not installed.": "Tesseract\u8a00\u8a9e\u30d1\u30c3\u30af\u304c\u672a\u30a4\u30f3\u30b9\u30c8\u30fc\u30eb\u3067\u3059: {lang}",
+        "Preprocessing": "\u524d\u51e6\u7406",
+        "Off": "\u30aa\u30d5",
+        "Auto + Binarize": "\u81ea\u52d5 + \u4e8c\u5024\u5316",
+        "Optimization": "\u6700\u9069\u5316",
+        "None": "\u306a\u3057",
+        "Fast": "\u9ad8\u901f",
+        "Balanced": "\u30d0\u30e9\u30f3\u30b9",
+        "Max": "\u6700\u5927",
+        "Output size: {before} -> {after} ({saved}% saved) in {seconds}s": "\u51fa\u529b\u30b5\u30a4\u30ba: {before} -> {after}\uff08{saved}% \u524a\u6e1b\uff09\u3001\u6240\u8981\u6642\u9593 {seconds} \u79d2",
+        "Word Data": "\u5358\u8a9e\u5ea7\u6a19\u30c7\u30fc\u30bf",
+        "OCR language: {lang}": "OCR \u8a00\u8a9e: {lang}",
+        "OCR Engine": "OCR \u30a8\u30f3\u30b8\u30f3",
+        "Per page": "\u30da\u30fc\u30b8\u3054\u3068",
+        "Persistent": "\u5e38\u99d0",
+        "Set Temp Folder...": "\u4e00\u6642\u30d5\u30a9\u30eb\u30c0\u30fc\u3092\u8a2d\u5b9a...",
+        "Select temp folder (e.g. a RAM disk or fast local drive)": "\u4e00\u6642\u30d5\u30a9\u30eb\u30c0\u30fc\u3092\u9078\u629e\uff08RAM \u30c7\u30a3\u30b9\u30af\u3084\u9ad8\u901f\u306a\u30ed\u30fc\u30ab\u30eb\u30c9\u30e9\u30a4\u30d6\u306a\u3069\uff09",
+        "Temp folder saved.": "\u4e00\u6642\u30d5\u30a9\u30eb\u30c0\u30fc\u3092\u4fdd\u5b58\u3057\u307e\u3057\u305f\u3002",
+        "All": "\u3059\u3079\u3066",
+        "Warnings and errors": "\u8b66\u544a\u3068\u30a8\u30e9\u30fc",
+        "Errors only": "\u30a8\u30e9\u30fc\u306e\u307f",
+        "Open Full Log": "\u5b8c\u5168\u306a\u30ed\u30b0\u3092\u958b\u304f",
+        "Log file: {path}": "\u30ed\u30b0\u30d5\u30a1\u30a4\u30eb\uff1a{path}",
+        "CPU time {seconds}s, peak memory {memory}": "CPU \u6642\u9593 {seconds} \u79d2\u3001\u30d4\u30fc\u30af\u30e1\u30e2\u30ea {memory}",
+        "image": "\u753b\u50cf",
+        "text": "\u30c6\u30ad\u30b9\u30c8",
+        "image + text": "\u753b\u50cf + \u30c6\u30ad\u30b9\u30c8",
+        "blank": "\u7a7a\u767d",
+        "OCR Passes": "OCR\u30d1\u30b9",
+        "Single": "1\u56de",
+        "Adaptive": "\u9069\u5fdc",
+        "Mean confidence {mean}, {refined} page(s) re-OCRed, {low} still below {threshold}": "\u5e73\u5747\u4fe1\u983c\u5ea6 {mean}\u3001{refined} \u30da\u30fc\u30b8\u3092\u518d\u8a8d\u8b58\u3001{low} \u30da\u30fc\u30b8\u304c {threshold} \u672a\u6e80",
+        "Blank Pages": "\u767d\u7d19\u30da\u30fc\u30b8",
+        "OCR": "OCR",
+        "Skip OCR": "OCR\u3057\u306a\u3044",
+        "Remove": "\u524a\u9664",
+        "{count} blank page(s) removed": "\u767d\u7d19\u30da\u30fc\u30b8\u3092 {count} \u30da\u30fc\u30b8\u524a\u9664\u3057\u307e\u3057\u305f",
+        "{count} blank page(s) skipped": "\u767d\u7d19\u30da\u30fc\u30b8 {count} \u30da\u30fc\u30b8\u3092\u30b9\u30ad\u30c3\u30d7\u3057\u307e\u3057\u305f",
+        "PDF has no pages. Rejected.": "PDF\u306b\u30da\u30fc\u30b8\u304c\u3042\u308a\u307e\u305b\u3093\u3002\u62d2\u5426\u3057\u307e\u3057\u305f\u3002",
+        "PDF pages are blank. No conversion.": "PDF\u306e\u30da\u30fc\u30b8\u306f\u3059\u3079\u3066\u767d\u7d19\u3067\u3059\u3002\u5909\u63db\u3057\u307e\u305b\u3093\u3002",
+        "Cancel": "\u30ad\u30e3\u30f3\u30bb\u30eb",
+        "Cancelling...": "\u30ad\u30e3\u30f3\u30bb\u30eb\u3057\u3066\u3044\u307e\u3059...",
+        "Conversion cancelled.": "\u5909\u63db\u3092\u30ad\u30e3\u30f3\u30bb\u30eb\u3057\u307e\u3057\u305f\u3002",
+        "Page Rendering": "\u30da\u30fc\u30b8\u306e\u30ec\u30f3\u30c0\u30ea\u30f3\u30b0",
+        "Embedded Images": "\u57cb\u3081\u8fbc\u307f\u753b\u50cf",
+        "Resume Conversion": "\u5909\u63db\u306e\u518d\u958b",
+        "The conversion of {name} did not finish. Resume it?": "{name} \u306e\u5909\u63db\u304c\u5b8c\u4e86\u3057\u3066\u3044\u307e\u305b\u3093\u3002\u518d\u958b\u3057\u307e\u3059\u304b\uff1f",
+        "PDF Writing": "PDF \u306e\u66f8\u304d\u8fbc\u307f",
+        "Rewrite": "\u5168\u4f53\u3092\u66f8\u304d\u76f4\u3059",
+        "Append to Input": "\u5143\u30d5\u30a1\u30a4\u30eb\u306b\u8ffd\u8a18",
+        "Text layer appended to the input file": "\u30c6\u30ad\u30b9\u30c8\u30ec\u30a4\u30e4\u30fc\u3092\u5143\u30d5\u30a1\u30a4\u30eb\u306b\u8ffd\u8a18\u3057\u307e\u3057\u305f",
     },
 }
 
@@ -2,10 +2,13 @@ import logging
 from pathlib import Path
 
 
+def log_file_path() -> Path:
+    return Path("logs") / "textlayer.log"
+
+
 def setup_logging() -> None:
-    log_dir = Path("logs")
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_path = log_dir / "textlayer.log"
+    log_path = log_file_path()
+    log_path.parent.mkdir(parents=True, exist_ok=True)
 
     logging.basicConfig(
         level=logging.INFO,
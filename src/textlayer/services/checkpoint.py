@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Optional
+
+import pikepdf
+
+from textlayer.services.confidence import ConfidenceSummary
+from textlayer.services.incremental import place_output
+from textlayer.services.language_detect import describe_range_languages
+from textlayer.services.ocr_service import (
+    OCRReport,
+    OCRResult,
+    OCRTask,
+    ProgressCallback,
+    incremental_output,
+    run_ocr_task_async,
+)
+from textlayer.services.optimize import get_preset, repack_pdf
+from textlayer.services.pdf_split import extract_pages, merge_pdfs, merge_sidecars, output_starts, page_ranges
+from textlayer.services.words import WordTable, load_words, word_output_paths, write_word_outputs
+from textlayer.utils import app_data_dir
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_NAME = "manifest.json"
+_MANIFEST_VERSION = 1
+
+
+def jobs_dir() -> str:
+    return os.path.join(app_data_dir(), "jobs")
+
+
+def job_work_dir(task: OCRTask) -> str:
+    return os.path.join(jobs_dir(), task_fingerprint(task)[:24])
+
+
+def task_fingerprint(task: OCRTask) -> str:
+    # Anything that changes the produced pages invalidates old checkpoints;
+    # the job journal also uses it to recognize a job it has seen before.
+    stat = os.stat(task.input_pdf)
+    key = {
+        "input": os.path.abspath(task.input_pdf),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "output": os.path.abspath(task.output_pdf),
+        "sidecar": bool(task.output_txt),
+        "lang": task.lang,
+        "redo_ocr": task.redo_ocr,
+        "output_type": task.output_type,
+        "color_strategy": task.color_strategy,
+        "preprocess": task.preprocess,
+        "preprocess_target_dpi": task.preprocess_target_dpi,
+        "rasterizer": task.rasterizer,
+        "optimize": task.optimize,
+        "words": bool(task.output_words),
+        "adaptive": task.adaptive,
+        "refine_threshold": task.refine_threshold,
+        "blank_pages": task.blank_pages,
+        "incremental": task.incremental,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def run_checkpointed_task(task: OCRTask, progress: ProgressCallback, chunk_pages: int) -> OCRResult:
+    return asyncio.run(run_checkpointed_task_async(task, progress, chunk_pages))
+
+
+async def run_checkpointed_task_async(task: OCRTask, progress: ProgressCallback, chunk_pages: int) -> OCRResult:
+    # OCR the document in page ranges, recording each finished range so a
+    # rerun of the same task only processes what is left.
+    if chunk_pages <= 0 or task.page_count <= chunk_pages:
+        return await run_ocr_task_async(task, progress)
+
+    started = time.monotonic()
+    work_dir = job_work_dir(task)
+    manifest = await asyncio.to_thread(_load_manifest, work_dir, task, chunk_pages)
+    ranges = [tuple(item) for item in manifest["ranges"]]
+    done = set(manifest["done"])
+    if done:
+        skipped = sum(end - start for index, (start, end) in enumerate(ranges) if index in done)
+        progress(-1, f"Resuming: {skipped} of {task.page_count} pages already done")
+
+    try:
+        with (task.input_source.open_pikepdf() if task.input_source else pikepdf.open(task.input_pdf)) as pdf:
+            for index, (start, end) in enumerate(ranges):
+                if index in done:
+                    continue
+                chunk_input = os.path.join(work_dir, f"input-{index:05d}.pdf")
+                await asyncio.to_thread(_write_chunk_input, pdf, start, end, chunk_input)
+                chunk_task = dataclasses.replace(
+                    task,
+                    input_pdf=chunk_input,
+                    output_pdf=_chunk_path(work_dir, index, "pdf"),
+                    output_txt=_chunk_path(work_dir, index, "txt") if task.output_txt else None,
+                    output_words=_words_prefix(work_dir, index) if task.output_words else None,
+                    word_formats=("npz",),
+                    page_count=end - start,
+                    # Ranges are assembled first; only the whole output can
+                    # be an update of the input.
+                    optimize="none" if incremental_output(task) else task.optimize,
+                    incremental=False,
+                    input_source=None,
+                    profile=task.profile.subset(range(start, end)) if task.profile else None,
+                )
+
+                def chunk_progress(percent: int, line: str, start: int = start, end: int = end) -> None:
+                    if percent < 0:
+                        progress(percent, line)
+                        return
+                    pages_done = start + (end - start) * percent / 100
+                    progress(int(pages_done / task.page_count * 100), line)
+
+                result = await run_ocr_task_async(chunk_task, chunk_progress)
+                os.remove(chunk_input)
+                if not result.success:
+                    return result
+                done.add(index)
+                manifest["done"] = sorted(done)
+                if result.report is not None:
+                    manifest.setdefault("langs", {})[str(index)] = result.report.lang
+                    if result.report.confidence is not None:
+                        manifest.setdefault("confidence", {})[str(index)] = result.report.confidence.as_dict()
+                    manifest.setdefault("blank", {})[str(index)] = result.report.blank_pages
+                _write_manifest(work_dir, manifest)
+    except Exception as exc:
+        logger.exception("Checkpointed OCR failed")
+        return OCRResult(False, f"Conversion failed: {exc}")
+
+    progress(-1, "Assembling output...")
+    incremental = await asyncio.to_thread(_assemble, task, work_dir, len(ranges))
+    preset = get_preset(task.optimize)
+    report = OCRReport(
+        input_bytes=os.path.getsize(task.input_pdf),
+        optimize=preset.name,
+        lang=describe_range_languages(ranges, manifest.get("langs", {}), task.lang),
+        incremental=incremental,
+    )
+    blank = manifest.get("blank", {})
+    report.blank_pages = [start + page for index, (start, _end) in enumerate(ranges) for page in blank.get(str(index), [])]
+    report.blank_removed = bool(report.blank_pages) and task.blank_pages == "drop"
+    if task.adaptive:
+        summaries = manifest.get("confidence", {})
+        starts = output_starts(ranges, blank, report.blank_removed)
+        report.confidence = ConfidenceSummary.combine(
+            [
+                (starts[index], ConfidenceSummary.from_dict(summaries[str(index)]))
+                for index in range(len(ranges))
+                if str(index) in summaries
+            ]
+        )
+    if preset.repack and not incremental:
+        report.repack_seconds = await asyncio.to_thread(repack_pdf, task.output_pdf)
+    report.output_bytes = os.path.getsize(task.output_pdf)
+    report.elapsed_seconds = time.monotonic() - started
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    progress(100, "Finished")
+    return OCRResult(True, "Conversion finished.", task.output_pdf, task.output_txt or "", report)
+
+
+def _write_chunk_input(pdf: pikepdf.Pdf, start: int, end: int, path: str) -> None:
+    with open(path, "wb") as handle:
+        handle.write(extract_pages(pdf, start, end))
+
+
+def _assemble(task: OCRTask, work_dir: str, chunks: int) -> bool:
+    # True if the output was written as an incremental update of the input.
+    merged = os.path.join(work_dir, "merged.pdf") if incremental_output(task) else task.output_pdf
+    merge_pdfs([_chunk_path(work_dir, index, "pdf") for index in range(chunks)], merged)
+    if task.output_txt:
+        merge_sidecars([_chunk_path(work_dir, index, "txt") for index in range(chunks)], task.output_txt)
+    if task.output_words:
+        tables = [load_words(_words_path(work_dir, index)) for index in range(chunks)]
+        write_word_outputs(WordTable.concat(tables), task.output_words, task.word_formats)
+    if merged == task.output_pdf:
+        return False
+    original = task.input_source.local_path if task.input_source else task.input_pdf
+    return place_output(original, merged, task.output_pdf)
+
+
+def _chunk_path(work_dir: str, index: int, ext: str) -> str:
+    return os.path.join(work_dir, f"chunk-{index:05d}.{ext}")
+
+
+def _words_prefix(work_dir: str, index: int) -> str:
+    return os.path.join(work_dir, f"chunk-{index:05d}")
+
+
+def _words_path(work_dir: str, index: int) -> str:
+    return word_output_paths(_words_prefix(work_dir, index), ("npz",))["npz"]
+
+
+def _load_manifest(work_dir: str, task: OCRTask, chunk_pages: int) -> dict:
+    fingerprint = task_fingerprint(task)
+    manifest = _read_manifest(work_dir)
+    if manifest is not None and manifest.get("fingerprint") == fingerprint:
+        # Completed chunks only count if their files survived.
+        manifest["done"] = [
+            index
+            for index in manifest.get("done", [])
+            if os.path.exists(_chunk_path(work_dir, index, "pdf"))
+            and (not task.output_txt or os.path.exists(_chunk_path(work_dir, index, "txt")))
+            and (not task.output_words or os.path.exists(_words_path(work_dir, index)))
+        ]
+        return manifest
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir, exist_ok=True)
+    manifest = {
+        "version": _MANIFEST_VERSION,
+        "fingerprint": fingerprint,
+        "input_pdf": os.path.abspath(task.input_pdf),
+        "output_pdf": os.path.abspath(task.output_pdf),
+        "ranges": page_ranges(task.page_count, chunk_pages),
+        "done": [],
+    }
+    _write_manifest(work_dir, manifest)
+    return manifest
+
+
+def _read_manifest(work_dir: str) -> Optional[dict]:
+    path = os.path.join(work_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(work_dir: str, manifest: dict) -> None:
+    # Write-then-rename so a crash never leaves a half-written manifest.
+    path = os.path.join(work_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
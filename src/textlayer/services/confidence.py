@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+
+from textlayer.services.words import WordTable
+
+# Adaptive two-pass OCR: every page is read once at a reduced resolution,
+# and only pages whose mean word confidence stays below the threshold are
+# read again at full (over-sampled) resolution.
+
+DEFAULT_REFINE_THRESHOLD = 70.0
+# First-pass OCR images are downsampled to this resolution. Clean laser
+# prints read just as well at 200 dpi, at roughly half the pixels.
+FAST_PASS_DPI = 200
+# Second-pass pages are rasterized at least at this resolution.
+REFINE_DPI = 400
+# Pages with fewer words give too noisy a mean to act on.
+_MIN_WORDS = 3
+
+
+@dataclass
+class ConfidenceSummary:
+    threshold: float = DEFAULT_REFINE_THRESHOLD
+    # Mean word confidence (0-100) per zero-based page, after refinement.
+    # Pages with too few words count as 0; blank pages are left out.
+    page_means: dict[int, float] = field(default_factory=dict)
+    # Zero-based pages that were OCRed a second time.
+    refined: list[int] = field(default_factory=list)
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self.page_means:
+            return None
+        return float(np.mean(list(self.page_means.values())))
+
+    @property
+    def low_pages(self) -> list[int]:
+        return low_confidence_pages(self.page_means, self.threshold)
+
+    def as_dict(self) -> dict:
+        # JSON-friendly form for checkpoint manifests.
+        return {
+            "threshold": self.threshold,
+            "page_means": {str(page): round(mean, 1) for page, mean in self.page_means.items()},
+            "refined": self.refined,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ConfidenceSummary:
+        return cls(
+            threshold=float(data.get("threshold", DEFAULT_REFINE_THRESHOLD)),
+            page_means={int(page): float(mean) for page, mean in data.get("page_means", {}).items()},
+            refined=[int(page) for page in data.get("refined", [])],
+        )
+
+    @classmethod
+    def combine(cls, parts: list[tuple[int, ConfidenceSummary]]) -> ConfidenceSummary:
+        # parts are (first page of the range, summary of the range).
+        combined = cls(threshold=parts[0][1].threshold if parts else DEFAULT_REFINE_THRESHOLD)
+        for start, part in parts:
+            combined.page_means.update({start + page: mean for page, mean in part.page_means.items()})
+            combined.refined.extend(start + page for page in part.refined)
+        return combined
+
+
+def page_confidence(table: WordTable, blank: Iterable[int] = ()) -> dict[int, float]:
+    # Mean of Tesseract's word confidences per page; words without a
+    # confidence (-1) are ignored. A page that is not blank but yielded
+    # fewer than _MIN_WORDS words was all but unreadable, typically at the
+    # reduced first-pass resolution: it counts as 0 so it gets refined.
+    counts, sums = _page_sums(table)
+    means = {int(page): 0.0 for page in sparse_pages(table)}
+    for page in blank:
+        means.pop(page, None)
+    means.update({int(page): float(sums[page] / counts[page]) for page in np.flatnonzero(counts >= _MIN_WORDS)})
+    return dict(sorted(means.items()))
+
+
+def sparse_pages(table: WordTable) -> list[int]:
+    # Zero-based pages with fewer than _MIN_WORDS words, including those with none.
+    counts, _sums = _page_sums(table)
+    return [int(page) for page in np.flatnonzero(counts < _MIN_WORDS)]
+
+
+def _page_sums(table: WordTable) -> tuple[np.ndarray, np.ndarray]:
+    valid = table.conf >= 0
+    pages = table.page[valid]
+    conf = table.conf[valid].astype(np.float64)
+    counts = np.bincount(pages, minlength=table.page_count)
+    sums = np.bincount(pages, weights=conf, minlength=table.page_count)
+    return counts, sums
+
+
+def low_confidence_pages(page_means: dict[int, float], threshold: float) -> list[int]:
+    return sorted(page for page, mean in page_means.items() if mean < threshold)
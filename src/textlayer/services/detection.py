@@ -5,8 +5,11 @@ import os
 from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
 import pikepdf
 
+from textlayer.services.input_source import InputSource
+from textlayer.services.profile import DocumentProfile, document_color, profile_page
 
 # PyMuPDF (fitz) is optional at import time to avoid crashing the UI;
 # missing dependency is reported via DetectionResult.
@@ -15,7 +18,25 @@ from textlayer.utils import format_bytes, format_dt, is_pdf_path, size_on_disk
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# Blank page handling for OCR jobs: "off" OCRs every page, "skip" leaves
+# blank pages in the output without OCR, "drop" removes them.
+BLANK_PAGE_MODES = ("off", "skip", "drop")
+DEFAULT_BLANK_MODE = "off"
+# Blank detection renders pages at this resolution; enough to see a line
+# of text, cheap enough to run on every page.
+_BLANK_RENDER_DPI = 40
+# Edge band ignored: scanner shadows, punch holes and staple marks.
+_BLANK_MARGIN = 0.06
+# Pixels this much darker than the paper count as ink; bleed-through from
+# the other side of thin paper stays lighter.
+_INK_CONTRAST = 60
+# Pages with less ink than this share of the area are blank.
+_MAX_INK_COVERAGE = 0.001
+# Below this standard deviation a page is flat, whatever its tone.
+_FLAT_STDDEV = 4.0
+
+
+@dataclass(slots=True)
 class FileInfo:
     path: str
     location: str
@@ -26,7 +47,7 @@ class FileInfo:
     accessed: str
 
 
-@dataclass
+@dataclass(slots=True)
 class DetectionResult:
     is_pdf: bool
     is_encrypted: bool
@@ -38,6 +59,8 @@ class DetectionResult:
     details: str
     error: Optional[str]
     file_info: Optional[FileInfo]
+    # Per-page analysis for later stages; set when the PDF could be read.
+    profile: Optional[DocumentProfile] = None
 
 
 def _get_file_info(path: str) -> FileInfo:
@@ -75,7 +98,7 @@ def _has_signature(pdf: pikepdf.Pdf) -> bool:
     return False
 
 
-def detect_file(path: str) -> DetectionResult:
+def detect_file(path: str, source: Optional[InputSource] = None) -> DetectionResult:
     if not os.path.exists(path):
         return DetectionResult(
             is_pdf=False,
@@ -107,10 +130,14 @@ def detect_file(path: str) -> DetectionResult:
             file_info=file_info,
         )
 
+    profile = DocumentProfile(path=path, size=file_info.size, mtime_ns=os.stat(path).st_mtime_ns)
+
     # Detect encryption and signatures early to avoid destructive operations.
     try:
-        with pikepdf.open(path) as pdf:
+        # Reuse the caller's mapped/staged input instead of reading it again.
+        with (source.open_pikepdf() if source else pikepdf.open(path)) as pdf:
             if pdf.is_encrypted:
+                profile.is_encrypted = True
                 return DetectionResult(
                     is_pdf=True,
                     is_encrypted=True,
@@ -122,8 +149,10 @@ def detect_file(path: str) -> DetectionResult:
                     details="Encrypted or signed PDF. Rejected.",
                     error=None,
                     file_info=file_info,
+                    profile=profile,
                 )
             if _has_signature(pdf):
+                profile.is_signed = True
                 return DetectionResult(
                     is_pdf=True,
                     is_encrypted=False,
@@ -135,8 +164,10 @@ def detect_file(path: str) -> DetectionResult:
                     details="Encrypted or signed PDF. Rejected.",
                     error=None,
                     file_info=file_info,
+                    profile=profile,
                 )
     except pikepdf.PasswordError:
+        profile.is_encrypted = True
         return DetectionResult(
             is_pdf=True,
             is_encrypted=True,
@@ -148,6 +179,7 @@ def detect_file(path: str) -> DetectionResult:
             details="Encrypted or signed PDF. Rejected.",
             error=None,
             file_info=file_info,
+            profile=profile,
         )
     except Exception as exc:
         logger.exception("Failed to open PDF with pikepdf")
@@ -164,11 +196,8 @@ def detect_file(path: str) -> DetectionResult:
             file_info=file_info,
         )
 
-    # Detect text/image layers using PyMuPDF for OCR decisioning.
-    has_text = False
-    has_image = False
-    page_count = 0
-
+    # One pass over every page with PyMuPDF: text/image layers for the
+    # OCR decision, image resolution and color for job setup.
     try:
         try:
             import fitz
@@ -186,23 +215,14 @@ def detect_file(path: str) -> DetectionResult:
                 file_info=file_info,
             )
 
-        doc = fitz.open(path)
-        page_count = doc.page_count
-        for page in doc:
-            if not has_text:
-                text = page.get_text("text")
-                if text and text.strip():
-                    has_text = True
-            if not has_image:
-                blocks = page.get_text("dict").get("blocks", [])
-                for block in blocks:
-                    if block.get("type") == 1:
-                        has_image = True
-                        break
-                if not has_image and page.get_images():
-                    has_image = True
-            if has_text and has_image:
-                break
+        doc = source.open_fitz() if source else fitz.open(path)
+        profile.pages = [profile_page(page) for page in doc]
+        profile.color = document_color(doc)
+        has_text = profile.has_text
+        has_image = profile.has_image
+        page_count = profile.page_count
+        # Neither text nor images: either vector drawings or nothing at all.
+        all_blank = not has_text and not has_image and all(_page_is_blank(page) for page in doc)
         doc.close()
     except Exception as exc:
         logger.exception("Failed to inspect PDF with PyMuPDF")
@@ -228,6 +248,12 @@ def detect_file(path: str) -> DetectionResult:
     elif has_text and has_image:
         decision = "ask_reocr"
         details = "PDF with image + text. Re-OCR?"
+    elif page_count == 0:
+        decision = "reject_empty"
+        details = "PDF has no pages. Rejected."
+    elif all_blank:
+        decision = "skip_blank"
+        details = "PDF pages are blank. No conversion."
     else:
         decision = "ocr"
         details = "PDF appears empty. OCR will be applied."
@@ -243,9 +269,118 @@ def detect_file(path: str) -> DetectionResult:
         details=details,
         error=None,
         file_info=file_info,
+        profile=profile,
     )
 
 
+def classify_page(page) -> str:
+    # Per-page counterpart of the document decision, for previews:
+    # "image", "text", "mixed" (image + text) or "blank".
+    has_text = _page_has_text(page)
+    has_image = _page_has_image(page)
+    if has_text and has_image:
+        return "mixed"
+    if has_image:
+        return "image"
+    if has_text:
+        return "text"
+    return "blank"
+
+
+def find_blank_pages(
+    path: str,
+    source: Optional[InputSource] = None,
+    profile: Optional[DocumentProfile] = None,
+) -> tuple[list[int], int]:
+    # Returns the zero-based blank pages and the page count. Pages with a
+    # text layer are never blank. Without PyMuPDF nothing is blank.
+    try:
+        import fitz
+    except Exception:
+        return [], 0
+    doc = source.open_fitz() if source else fitz.open(path)
+    try:
+        if profile is not None and profile.page_count == doc.page_count:
+            candidates = [index for index, page in enumerate(profile.pages) if not page.has_text]
+        else:
+            candidates = [index for index, page in enumerate(doc) if not _page_has_text(page)]
+        blank = [index for index in candidates if _page_is_blank(doc.load_page(index))]
+        return blank, doc.page_count
+    finally:
+        doc.close()
+
+
+def blank_pages_among(path: str, pages: list[int]) -> list[int]:
+    # Which of the zero-based pages of path look blank when rendered,
+    # whatever their text layer. Without PyMuPDF none do.
+    if not pages:
+        return []
+    try:
+        import fitz
+    except Exception:
+        return []
+    doc = fitz.open(path)
+    try:
+        return [index for index in pages if index < doc.page_count and _page_is_blank(doc.load_page(index))]
+    finally:
+        doc.close()
+
+
+def is_blank_image(gray: np.ndarray) -> bool:
+    # gray: 2-D uint8 page render. Blank means flat, or almost no ink once
+    # the edges and isolated noise pixels are discounted.
+    height, width = gray.shape
+    margin_y = int(height * _BLANK_MARGIN)
+    margin_x = int(width * _BLANK_MARGIN)
+    core = gray[margin_y:height - margin_y, margin_x:width - margin_x]
+    if core.size == 0 or core.std() < _FLAT_STDDEV:
+        return True
+    # The paper tone, robust against the ink itself and gray recycled paper.
+    paper = np.percentile(core, 90)
+    ink = core < paper - _INK_CONTRAST
+    # Dust and scanner noise are single pixels; strokes have an inked
+    # neighbour to the right or below.
+    strokes = ink[:-1, :-1] & (ink[:-1, 1:] | ink[1:, :-1])
+    return strokes.mean() < _MAX_INK_COVERAGE
+
+
+def _page_is_blank(page) -> bool:
+    import fitz
+
+    zoom = _BLANK_RENDER_DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    # Rows may be padded; the stride is the row length in bytes.
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    return is_blank_image(gray)
+
+
+def _page_has_text(page) -> bool:
+    text = page.get_text("text")
+    return bool(text and text.strip())
+
+
+def _page_has_image(page) -> bool:
+    blocks = page.get_text("dict").get("blocks", [])
+    if any(block.get("type") == 1 for block in blocks):
+        return True
+    return bool(page.get_images())
+
+
+def is_pdf_grayscale(path: str, source: Optional[InputSource] = None) -> Optional[bool]:
+    try:
+        import fitz
+    except Exception:
+        return None
+    try:
+        doc = source.open_fitz() if source else fitz.open(path)
+        try:
+            return document_color(doc) == "gray"
+        finally:
+            doc.close()
+    except Exception:
+        return None
+
+
 def format_file_info(file_info: FileInfo) -> dict[str, str]:
     return {
         "Location": file_info.location,
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import logging
+import multiprocessing
+import os
+import secrets
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseManager
+from typing import Optional
+
+from textlayer.services.confidence import ConfidenceSummary
+from textlayer.services.incremental import place_output
+from textlayer.services.language_detect import describe_range_languages
+from textlayer.services.ocr_service import (
+    OCRReport,
+    OCRResult,
+    OCRTask,
+    ProgressCallback,
+    incremental_output,
+    run_ocr_task,
+)
+from textlayer.services.pdf_split import merge_pdfs, merge_sidecars, output_starts, page_ranges, split_pdf
+from textlayer.services.words import WordTable, load_words, word_output_paths, write_word_outputs
+from textlayer.services.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORT = 50000
+DEFAULT_CHUNK_PAGES = 10
+# Workers ping this often; a worker silent for HEARTBEAT_TIMEOUT is presumed
+# dead and its in-flight chunks go back to the queue.
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 30.0
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class WorkItem:
+    job_id: str
+    chunk_index: int
+    start_page: int
+    page_count: int
+    pdf_bytes: bytes
+    task: OCRTask
+    attempt: int = 0
+
+
+@dataclass
+class WorkResult:
+    job_id: str
+    chunk_index: int
+    success: bool
+    message: str
+    pdf_bytes: bytes = b""
+    sidecar: str = ""
+    # Word table of the chunk (.npz bytes) when word output was requested.
+    words: bytes = b""
+    lang: str = ""
+    # ConfidenceSummary.as_dict() of the chunk, for adaptive OCR.
+    confidence: Optional[dict] = None
+    # Zero-based blank pages of the chunk.
+    blank_pages: list[int] = field(default_factory=list)
+
+
+@dataclass
+class _Job:
+    chunk_count: int
+    results: dict[int, WorkResult] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Dispatcher:
+    # Lives in the coordinator process; workers call it through manager proxies.
+    def __init__(self, heartbeat_timeout: float = HEARTBEAT_TIMEOUT, max_attempts: int = MAX_ATTEMPTS) -> None:
+        self._heartbeat_timeout = heartbeat_timeout
+        self._max_attempts = max_attempts
+        self._cond = threading.Condition()
+        self._pending: collections.deque[WorkItem] = collections.deque()
+        self._in_flight: dict[tuple[str, int], tuple[str, WorkItem]] = {}
+        self._last_seen: dict[str, float] = {}
+        self._jobs: dict[str, _Job] = {}
+        self._shutdown = False
+
+    def add_job(self, job_id: str, items: list[WorkItem]) -> None:
+        with self._cond:
+            self._jobs[job_id] = _Job(chunk_count=len(items))
+            self._pending.extend(items)
+            self._cond.notify_all()
+
+    def get_work(self, worker_id: str) -> Optional[WorkItem]:
+        with self._cond:
+            self._last_seen[worker_id] = time.monotonic()
+            while self._pending:
+                item = self._pending.popleft()
+                job = self._jobs.get(item.job_id)
+                if job is None or job.error or item.chunk_index in job.results:
+                    continue
+                self._in_flight[(item.job_id, item.chunk_index)] = (worker_id, item)
+                return item
+            return None
+
+    def heartbeat(self, worker_id: str) -> bool:
+        with self._cond:
+            self._last_seen[worker_id] = time.monotonic()
+            return not self._shutdown
+
+    def submit(self, worker_id: str, result: WorkResult) -> None:
+        with self._cond:
+            self._last_seen[worker_id] = time.monotonic()
+            key = (result.job_id, result.chunk_index)
+            owner = self._in_flight.get(key)
+            job = self._jobs.get(result.job_id)
+            if job is None or result.chunk_index in job.results:
+                # Late result from a worker whose chunk was already reassigned.
+                return
+            if owner is not None and owner[0] == worker_id:
+                del self._in_flight[key]
+            if result.success:
+                job.results[result.chunk_index] = result
+            elif owner is not None:
+                self._retry_locked(owner[1], result.message)
+            self._cond.notify_all()
+
+    def reap_dead_workers(self) -> None:
+        now = time.monotonic()
+        with self._cond:
+            for key, (worker_id, item) in list(self._in_flight.items()):
+                if now - self._last_seen.get(worker_id, 0.0) > self._heartbeat_timeout:
+                    logger.warning("Worker %s timed out; reassigning chunk %d", worker_id, item.chunk_index)
+                    del self._in_flight[key]
+                    self._retry_locked(item, f"Worker {worker_id} stopped responding.")
+            self._cond.notify_all()
+
+    def wait_job(self, job_id: str, timeout: float) -> bool:
+        # Returns True once the job has finished or failed.
+        with self._cond:
+            job = self._jobs[job_id]
+            self._cond.wait_for(lambda: job.error or len(job.results) == job.chunk_count, timeout)
+            return bool(job.error) or len(job.results) == job.chunk_count
+
+    def job_status(self, job_id: str) -> tuple[int, int, Optional[str]]:
+        with self._cond:
+            job = self._jobs[job_id]
+            return len(job.results), job.chunk_count, job.error
+
+    def pop_job(self, job_id: str) -> list[WorkResult]:
+        with self._cond:
+            job = self._jobs.pop(job_id)
+            return [job.results[index] for index in sorted(job.results)]
+
+    def is_shutdown(self) -> bool:
+        return self._shutdown
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def _retry_locked(self, item: WorkItem, message: str) -> None:
+        job = self._jobs.get(item.job_id)
+        if job is None:
+            return
+        if item.attempt + 1 >= self._max_attempts:
+            job.error = f"Chunk starting at page {item.start_page + 1} failed: {message}"
+            return
+        self._pending.appendleft(dataclasses.replace(item, attempt=item.attempt + 1))
+
+
+class _WorkerManager(BaseManager):
+    pass
+
+
+_WorkerManager.register("dispatcher")
+
+
+class Coordinator:
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        authkey: Optional[bytes] = None,
+        chunk_pages: int = DEFAULT_CHUNK_PAGES,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+    ) -> None:
+        # The manager unpickles what clients send: the key is all that keeps
+        # others from running code here, so there is no built-in one.
+        self._address = address
+        self.authkey = authkey or secrets.token_urlsafe(32).encode("ascii")
+        self._chunk_pages = chunk_pages
+        self.dispatcher = Dispatcher(heartbeat_timeout=heartbeat_timeout)
+        self._server = None
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            return self._address
+        return self._server.address
+
+    def start(self) -> None:
+        dispatcher = self.dispatcher
+        # A fresh manager class per coordinator: register() is class-wide.
+        manager_cls = type("_CoordinatorManager", (BaseManager,), {})
+        manager_cls.register("dispatcher", callable=lambda: dispatcher)
+        manager = manager_cls(address=self._address, authkey=self.authkey)
+        self._server = manager.get_server()
+        serve = threading.Thread(target=self._serve, name="textlayer-coordinator", daemon=True)
+        reaper = threading.Thread(target=self._reap_loop, name="textlayer-reaper", daemon=True)
+        self._threads = [serve, reaper]
+        for thread in self._threads:
+            thread.start()
+        logger.info("Coordinator listening on %s:%d", *self.address)
+
+    def stop(self) -> None:
+        self.dispatcher.shutdown()
+        if self._server is not None:
+            # Give polling workers a chance to see the shutdown flag.
+            time.sleep(HEARTBEAT_INTERVAL / 5)
+            self._server.stop_event.set()
+
+    def process(self, task: OCRTask, progress: ProgressCallback) -> OCRResult:
+        started = time.monotonic()
+        ranges = page_ranges(task.page_count, self._chunk_pages)
+        if not ranges:
+            return OCRResult(False, "PDF has no pages.")
+
+        job_id = uuid.uuid4().hex
+        # Chunks come back as full PDFs; the merged output can still be
+        # written as an update of the input.
+        incremental = incremental_output(task)
+        items = [
+            WorkItem(
+                job_id=job_id,
+                chunk_index=index,
+                start_page=start,
+                page_count=end - start,
+                pdf_bytes=data,
+                task=dataclasses.replace(
+                    task,
+                    optimize="none" if incremental else task.optimize,
+                    incremental=False,
+                    input_source=None,
+                    profile=task.profile.subset(range(start, end)) if task.profile else None,
+                ),
+            )
+            for index, ((start, end), data) in enumerate(zip(ranges, split_pdf(task.input_pdf, ranges)))
+        ]
+        self.dispatcher.add_job(job_id, items)
+        progress(0, f"Distributed {len(items)} chunks")
+
+        while not self.dispatcher.wait_job(job_id, timeout=1.0):
+            done, total, _ = self.dispatcher.job_status(job_id)
+            progress(int(done / total * 100), f"Chunks {done} of {total}")
+        _, _, error = self.dispatcher.job_status(job_id)
+        results = self.dispatcher.pop_job(job_id)
+        if error:
+            return OCRResult(False, f"Conversion failed: {error}")
+
+        # Reassemble in page order.
+        with tempfile.TemporaryDirectory(prefix="textlayer-merge-", dir=get_workspace().root) as tmp:
+            pdf_parts = []
+            txt_parts = []
+            for result in results:
+                pdf_path = os.path.join(tmp, f"{result.chunk_index:05d}.pdf")
+                txt_path = os.path.join(tmp, f"{result.chunk_index:05d}.txt")
+                with open(pdf_path, "wb") as handle:
+                    handle.write(result.pdf_bytes)
+                with open(txt_path, "w", encoding="utf-8") as handle:
+                    handle.write(result.sidecar)
+                pdf_parts.append(pdf_path)
+                txt_parts.append(txt_path)
+            if incremental:
+                merged = os.path.join(tmp, "merged.pdf")
+                merge_pdfs(pdf_parts, merged)
+                incremental = place_output(task.input_pdf, merged, task.output_pdf)
+            else:
+                merge_pdfs(pdf_parts, task.output_pdf)
+            if task.output_txt:
+                merge_sidecars(txt_parts, task.output_txt)
+            if task.output_words:
+                tables = []
+                for result in results:
+                    words_path = os.path.join(tmp, f"{result.chunk_index:05d}.npz")
+                    with open(words_path, "wb") as handle:
+                        handle.write(result.words)
+                    tables.append(load_words(words_path))
+                write_word_outputs(WordTable.concat(tables), task.output_words, task.word_formats)
+
+        report = OCRReport(
+            input_bytes=os.path.getsize(task.input_pdf),
+            output_bytes=os.path.getsize(task.output_pdf),
+            elapsed_seconds=time.monotonic() - started,
+            optimize=task.optimize,
+            lang=describe_range_languages(ranges, {str(r.chunk_index): r.lang for r in results}, task.lang),
+            incremental=incremental,
+        )
+        blank = {str(r.chunk_index): r.blank_pages for r in results}
+        report.blank_pages = [ranges[r.chunk_index][0] + page for r in results for page in r.blank_pages]
+        report.blank_removed = bool(report.blank_pages) and task.blank_pages == "drop"
+        if task.adaptive:
+            starts = output_starts(ranges, blank, report.blank_removed)
+            report.confidence = ConfidenceSummary.combine(
+                [
+                    (starts[r.chunk_index], ConfidenceSummary.from_dict(r.confidence))
+                    for r in results
+                    if r.confidence is not None
+                ]
+            )
+        progress(100, "Finished")
+        return OCRResult(True, "Conversion finished.", task.output_pdf, task.output_txt or "", report)
+
+    def _serve(self) -> None:
+        # serve_forever() ends with sys.exit() once stop() sets its event.
+        try:
+            self._server.serve_forever()
+        except SystemExit:
+            pass
+
+    def _reap_loop(self) -> None:
+        while not self.dispatcher.is_shutdown():
+            time.sleep(HEARTBEAT_INTERVAL)
+            self.dispatcher.reap_dead_workers()
+
+
+def run_worker(
+    address: tuple[str, int],
+    authkey: bytes,
+    tesseract_path: str = "",
+    worker_id: Optional[str] = None,
+    poll_interval: float = 1.0,
+) -> None:
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    manager = _WorkerManager(address=address, authkey=authkey)
+    manager.connect()
+    dispatcher = manager.dispatcher()
+    stop = threading.Event()
+
+    def beat() -> None:
+        # Proxies open one connection per thread, so this is safe alongside
+        # the main loop.
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                if not dispatcher.heartbeat(worker_id):
+                    return
+            except (ConnectionError, EOFError, OSError):
+                return
+
+    heart = threading.Thread(target=beat, name="textlayer-heartbeat", daemon=True)
+    heart.start()
+    logger.info("Worker %s connected to %s:%d", worker_id, *address)
+    try:
+        while True:
+            try:
+                if dispatcher.is_shutdown():
+                    break
+                item = dispatcher.get_work(worker_id)
+            except (ConnectionError, EOFError, OSError):
+                logger.info("Coordinator went away; worker %s exiting", worker_id)
+                break
+            if item is None:
+                time.sleep(poll_interval)
+                continue
+            result = _process_item(item, tesseract_path)
+            try:
+                dispatcher.submit(worker_id, result)
+            except (ConnectionError, EOFError, OSError):
+                break
+    finally:
+        stop.set()
+
+
+def spawn_local_workers(count: int, address: tuple[str, int], authkey: bytes) -> list[multiprocessing.Process]:
+    host, port = address
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    processes = []
+    for index in range(count):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=((host, port), authkey),
+            kwargs={"worker_id": f"local-{index}"},
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def _process_item(item: WorkItem, tesseract_path: str) -> WorkResult:
+    with tempfile.TemporaryDirectory(prefix="textlayer-chunk-", dir=get_workspace().root) as tmp:
+        input_pdf = os.path.join(tmp, "input.pdf")
+        output_pdf = os.path.join(tmp, "output.pdf")
+        output_txt = os.path.join(tmp, "output.txt")
+        output_words = os.path.join(tmp, "output")
+        with open(input_pdf, "wb") as handle:
+            handle.write(item.pdf_bytes)
+        # Paths are local to this machine; so is the Tesseract install.
+        task = dataclasses.replace(
+            item.task,
+            input_pdf=input_pdf,
+            output_pdf=output_pdf,
+            output_txt=output_txt,
+            tesseract_path=tesseract_path or item.task.tesseract_path,
+            page_count=item.page_count,
+            output_words=output_words if item.task.output_words else None,
+            word_formats=("npz",),
+        )
+        result = run_ocr_task(task, lambda percent, line: None)
+        if not result.success:
+            return WorkResult(item.job_id, item.chunk_index, False, result.message)
+        with open(output_pdf, "rb") as handle:
+            pdf_bytes = handle.read()
+        sidecar = ""
+        if os.path.exists(output_txt):
+            with open(output_txt, encoding="utf-8") as handle:
+                sidecar = handle.read()
+        words = b""
+        if task.output_words:
+            with open(word_output_paths(output_words, ("npz",))["npz"], "rb") as handle:
+                words = handle.read()
+        lang = result.report.lang if result.report else task.lang
+        confidence = None
+        blank_pages: list[int] = []
+        if result.report is not None:
+            if result.report.confidence is not None:
+                confidence = result.report.confidence.as_dict()
+            blank_pages = result.report.blank_pages
+        return WorkResult(
+            item.job_id, item.chunk_index, True, result.message, pdf_bytes, sidecar, words, lang, confidence, blank_pages
+        )
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from textlayer.services.ocr_service import OCRResult, OCRTask, ProgressCallback, run_job_async
+from textlayer.services.resource_governor import get_governor
+
+logger = logging.getLogger(__name__)
+
+
+# queued -> running -> finished | failed | cancelled
+JOB_STATES = ("queued", "running", "finished", "failed", "cancelled")
+CANCELLED_MESSAGE = "Conversion cancelled."
+
+
+@dataclass
+class EngineJob:
+    job_id: int
+    task: OCRTask
+    state: str = "queued"
+    # Last reported percentage, -1 before the first one.
+    percent: int = -1
+    result: Optional[OCRResult] = None
+    _future: Optional[asyncio.Task] = field(default=None, repr=False)
+    # Governor ticket while the job is about to start or running.
+    _ticket: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("finished", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        # Kills the job's OCRmyPDF process tree, or drops it from the queue.
+        if self._future is not None:
+            self._future.cancel()
+
+    async def wait(self) -> OCRResult:
+        # Cancelling the waiter does not cancel the job.
+        try:
+            return await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            if not self._future.cancelled():
+                raise
+            return self.result
+
+    def _settle(self, future: asyncio.Task) -> None:
+        # Also covers jobs cancelled before they ever started.
+        if future.cancelled():
+            logger.info("Job %d cancelled", self.job_id)
+            self.state = "cancelled"
+            self.result = OCRResult(False, CANCELLED_MESSAGE)
+
+
+class OCREngine:
+    # Runs conversions as tasks on one asyncio event loop, without Qt: the
+    # GUI, the CLI or a test drive it the same way. Each job streams its
+    # OCRmyPDF output on the loop; blocking PDF work runs in the loop's
+    # default executor. max_jobs caps conversions running at once (0: no
+    # cap; the resource governor still splits the cores between them).
+    def __init__(self, max_jobs: int = 0) -> None:
+        self._slots = asyncio.Semaphore(max_jobs) if max_jobs > 0 else None
+        self._max_jobs = max_jobs
+        self._ids = itertools.count(1)
+        self.jobs: dict[int, EngineJob] = {}
+
+    def submit(self, task: OCRTask, progress: Optional[ProgressCallback] = None) -> EngineJob:
+        # Must be called on the engine's event loop. progress is called
+        # there as well, with (percent, line).
+        job = EngineJob(job_id=next(self._ids), task=task)
+        # Jobs that start alongside the running ones are announced to the
+        # governor now, so a job that gets its cores first leaves them a
+        # share; jobs waiting for a slot are announced when they get one.
+        if self._slots is None or len(self.active()) < self._max_jobs:
+            job._ticket = get_governor().expect(task.page_count)
+        job._future = asyncio.get_running_loop().create_task(self._run(job, progress))
+        job._future.add_done_callback(job._settle)
+        self.jobs[job.job_id] = job
+        return job
+
+    async def run(self, task: OCRTask, progress: Optional[ProgressCallback] = None) -> OCRResult:
+        return await self.submit(task, progress).wait()
+
+    def cancel(self, job_id: int) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def active(self) -> list[EngineJob]:
+        return [job for job in self.jobs.values() if not job.done]
+
+    async def shutdown(self) -> None:
+        # Cancels every unfinished job and waits until their process trees
+        # are gone and their temp space is released.
+        jobs = self.active()
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*(job._future for job in jobs), return_exceptions=True)
+
+    async def _run(self, job: EngineJob, progress: Optional[ProgressCallback]) -> OCRResult:
+        def report(percent: int, line: str) -> None:
+            if percent >= 0:
+                job.percent = percent
+            if progress is not None:
+                progress(percent, line)
+
+        try:
+            if self._slots is not None:
+                async with self._slots:
+                    result = await self._convert(job, report)
+            else:
+                result = await self._convert(job, report)
+        except Exception as exc:
+            logger.exception("Job %d failed", job.job_id)
+            result = OCRResult(False, f"Conversion failed: {exc}")
+        finally:
+            if job._ticket is not None:
+                get_governor().forget(job._ticket)
+        job.state = "finished" if result.success else "failed"
+        job.result = result
+        return result
+
+    async def _convert(self, job: EngineJob, progress: ProgressCallback) -> OCRResult:
+        job.state = "running"
+        governor = get_governor()
+        if job._ticket is None:
+            job._ticket = governor.expect(job.task.page_count)
+        governor.bind(job._ticket)
+        return await run_job_async(job.task, progress)
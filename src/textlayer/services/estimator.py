@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+import pikepdf
+
+from textlayer.services.detection import is_pdf_grayscale
+from textlayer.services.input_source import InputSource
+from textlayer.services.profile import DocumentProfile, PageProfile
+from textlayer.utils import app_data_dir
+
+logger = logging.getLogger(__name__)
+
+
+HISTORY_NAME = "timings.jsonl"
+_MAX_SAMPLES = 500
+_SAMPLE_PAGES = 25
+# ocrmypdf rasterizes pages without images at this resolution.
+_DEFAULT_DPI = 300.0
+# Core-seconds per feature, used until enough local history exists and as
+# the ridge prior afterwards: per page, per megapixel, extra per color
+# megapixel, extra per megapixel for each additional language, and the
+# Ghostscript PDF/A pass per page.
+_PRIOR = np.array([0.3, 0.25, 0.1, 0.2, 0.15])
+_RIDGE = 5.0
+_MIN_SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class JobFeatures:
+    pages: int
+    megapixels: float
+    color: str
+    langs: int
+    output_type: str
+
+    def vector(self) -> np.ndarray:
+        return np.array([
+            self.pages,
+            self.megapixels,
+            self.megapixels if self.color == "color" else 0.0,
+            self.megapixels * max(0, self.langs - 1),
+            self.pages if self.output_type == "pdfa" else 0.0,
+        ], dtype=float)
+
+
+def extract_features(
+    path: str,
+    page_count: int,
+    lang: str,
+    output_type: str,
+    source: Optional[InputSource] = None,
+    color: Optional[str] = None,
+    profile: Optional[DocumentProfile] = None,
+) -> JobFeatures:
+    # With a profile from detection, no page is read again.
+    megapixels = page_count * _letter_megapixels(_DEFAULT_DPI)
+    if profile is not None and profile.pages:
+        page_count = page_count or profile.page_count
+        megapixels = sum(_profile_megapixels(page) for page in profile.pages)
+    else:
+        try:
+            with (source.open_pikepdf() if source else pikepdf.open(path)) as pdf:
+                page_count = page_count or len(pdf.pages)
+                megapixels = _estimate_megapixels(pdf, page_count)
+        except Exception as exc:
+            logger.debug("Feature extraction failed for %s: %s", path, exc)
+    if color is None and profile is not None:
+        color = profile.color
+    if color is None:
+        is_gray = is_pdf_grayscale(path, source)
+        color = "unknown" if is_gray is None else ("gray" if is_gray else "color")
+    return JobFeatures(
+        pages=page_count,
+        megapixels=round(megapixels, 2),
+        color=color,
+        langs=len([item for item in lang.split("+") if item]) or 1,
+        output_type=output_type,
+    )
+
+
+class DurationEstimator:
+    # Linear model of OCR core-seconds, fitted by ridge regression towards
+    # the built-in prior from timings of jobs that ran on this machine.
+    def __init__(self, history_path: Optional[str] = None) -> None:
+        self._path = history_path or os.path.join(app_data_dir(), HISTORY_NAME)
+        self._lock = threading.Lock()
+        self._samples: list[dict] = self._load()
+        self._weights = self._fit()
+
+    def predict(self, features: JobFeatures, jobs: int = 1) -> float:
+        # Wall time: page workers split the core-seconds, but never more
+        # ways than there are pages.
+        with self._lock:
+            core_seconds = float(features.vector() @ self._weights)
+        return max(1.0, core_seconds) / max(1, min(jobs, features.pages or 1))
+
+    def record(self, features: JobFeatures, wall_seconds: float, jobs: int) -> None:
+        sample = asdict(features)
+        sample["jobs"] = jobs
+        sample["wall_seconds"] = round(wall_seconds, 2)
+        sample["recorded"] = int(time.time())
+        with self._lock:
+            self._samples.append(sample)
+            compact = len(self._samples) > 2 * _MAX_SAMPLES
+            self._samples = self._samples[-_MAX_SAMPLES:]
+            self._weights = self._fit()
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                if compact:
+                    self._rewrite()
+                else:
+                    with open(self._path, "a", encoding="utf-8") as handle:
+                        handle.write(json.dumps(sample) + "\n")
+            except OSError as exc:
+                logger.warning("Could not save OCR timing: %s", exc)
+
+    def _fit(self) -> np.ndarray:
+        if len(self._samples) < _MIN_SAMPLES:
+            return _PRIOR.copy()
+        x = np.array([_sample_features(sample).vector() for sample in self._samples])
+        y = np.array([
+            sample["wall_seconds"] * max(1, min(sample["jobs"], sample["pages"] or 1)) for sample in self._samples
+        ])
+        # Solve (X'X + λI) w = X'y + λ·prior; a few samples only nudge the
+        # prior, many samples dominate it.
+        penalty = _RIDGE * np.eye(len(_PRIOR))
+        weights = np.linalg.solve(x.T @ x + penalty, x.T @ y + penalty @ _PRIOR)
+        return np.clip(weights, 0.0, None)
+
+    def _load(self) -> list[dict]:
+        samples = []
+        try:
+            with open(self._path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        sample = json.loads(line)
+                        _sample_features(sample)
+                        float(sample["wall_seconds"])
+                        int(sample["jobs"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    samples.append(sample)
+        except OSError:
+            return []
+        return samples[-_MAX_SAMPLES:]
+
+    def _rewrite(self) -> None:
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            for sample in self._samples:
+                handle.write(json.dumps(sample) + "\n")
+        os.replace(tmp_path, self._path)
+
+
+class EtaTracker:
+    # Blends the model's prediction with extrapolation from observed
+    # progress; the further along, the more the observation counts.
+    def __init__(self, predicted_seconds: float) -> None:
+        self.predicted_seconds = predicted_seconds
+        self._started = time.monotonic()
+
+    def remaining(self, percent: int) -> float:
+        elapsed = time.monotonic() - self._started
+        by_model = max(0.0, self.predicted_seconds - elapsed)
+        if percent <= 0:
+            return by_model
+        by_progress = elapsed * (100 - percent) / percent
+        weight = min(1.0, percent / 100)
+        return (1 - weight) * by_model + weight * by_progress
+
+
+def _sample_features(sample: dict) -> JobFeatures:
+    return JobFeatures(
+        pages=int(sample["pages"]),
+        megapixels=float(sample["megapixels"]),
+        color=str(sample["color"]),
+        langs=int(sample["langs"]),
+        output_type=str(sample["output_type"]),
+    )
+
+
+def _estimate_megapixels(pdf: pikepdf.Pdf, page_count: int) -> float:
+    # Average a spread of sampled pages and scale to the whole document.
+    total = len(pdf.pages)
+    if total == 0:
+        return 0.0
+    step = max(1, total // _SAMPLE_PAGES)
+    sampled = [_page_megapixels(pdf.pages[index]) for index in range(0, total, step)][:_SAMPLE_PAGES]
+    return sum(sampled) / len(sampled) * page_count
+
+
+def _page_megapixels(page: pikepdf.Page) -> float:
+    # Pages are rasterized at the resolution of their sharpest image.
+    try:
+        box = [float(value) for value in page.mediabox]
+        width_in = abs(box[2] - box[0]) / 72
+        height_in = abs(box[3] - box[1]) / 72
+    except Exception:
+        return _letter_megapixels(_DEFAULT_DPI)
+    dpi = 0.0
+    try:
+        for _, image in page.images.items():
+            pixels_wide = int(image.get("/Width", 0))
+            if width_in > 0 and pixels_wide > 0:
+                dpi = max(dpi, pixels_wide / width_in)
+    except Exception:
+        pass
+    dpi = dpi or _DEFAULT_DPI
+    return width_in * dpi * height_in * dpi / 1e6
+
+
+def _profile_megapixels(page: PageProfile) -> float:
+    dpi = page.dpi or _DEFAULT_DPI
+    return page.width_pt / 72 * dpi * page.height_pt / 72 * dpi / 1e6
+
+
+def _letter_megapixels(dpi: float) -> float:
+    return 8.5 * dpi * 11 * dpi / 1e6
+
+
+_estimator: Optional[DurationEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_estimator() -> DurationEstimator:
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = DurationEstimator()
+        return _estimator
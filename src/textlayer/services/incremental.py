@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+import zlib
+from typing import Optional
+
+import pikepdf
+
+logger = logging.getLogger(__name__)
+
+
+# OCRmyPDF names the Form XObject holding a page's text layer /OCR-<random>.
+_TEXT_LAYER_PREFIX = "/OCR-"
+# The last cross-reference section is named in the final bytes of a PDF.
+_TAIL_BYTES = 4096
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+# Linux FICLONE ioctl: share the blocks of another file (btrfs, XFS, ...).
+_FICLONE = 0x40049409
+
+
+def write_incremental(original_pdf: str, ocr_pdf: str, output_pdf: str) -> bool:
+    # Writes output_pdf as the bytes of original_pdf followed by one
+    # incremental update: the text layers OCRmyPDF grafted into ocr_pdf,
+    # their fonts, and the pages that now draw them. Output costs the new
+    # objects instead of a full rewrite; the original is cloned where the
+    # file system allows. False, with nothing written, when the original
+    # cannot be updated in place or ocr_pdf has no text layers for it.
+    partial = output_pdf + ".part"
+    try:
+        with pikepdf.open(original_pdf) as pdf, pikepdf.open(ocr_pdf) as ocr:
+            reason = _refusal(pdf, ocr)
+            xref = None if reason else _last_xref(original_pdf)
+            if xref is None:
+                logger.info("Writing %s in full: %s", output_pdf, reason or "no cross-reference section found")
+                return False
+            objects = _graft_text_layers(pdf, ocr)
+            if not objects:
+                logger.info("Writing %s in full: no text layers to append", output_pdf)
+                return False
+            cloned = clone_file(original_pdf, partial)
+            with open(partial, "ab") as handle:
+                appended = _append_update(handle, pdf, objects, *xref)
+        os.replace(partial, output_pdf)
+    except Exception:
+        logger.exception("Failed to write %s as an incremental update", output_pdf)
+        return False
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    logger.info(
+        "Appended %d bytes to %s of %s (%s)",
+        appended,
+        "a clone" if cloned else "a copy",
+        original_pdf,
+        os.path.basename(output_pdf),
+    )
+    return True
+
+
+def place_output(original_pdf: str, ocr_pdf: str, output_pdf: str) -> bool:
+    # output_pdf as an incremental update of original_pdf where possible,
+    # else OCRmyPDF's full output moved there. True if incremental.
+    if write_incremental(original_pdf, ocr_pdf, output_pdf):
+        os.remove(ocr_pdf)
+        return True
+    shutil.move(ocr_pdf, output_pdf)
+    return False
+
+
+def clone_file(source: str, target: str) -> bool:
+    # Copies source to target, sharing its blocks on copy-on-write file
+    # systems. True if cloned, False if the bytes were copied.
+    try:
+        import fcntl
+
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except (ImportError, OSError):
+        shutil.copyfile(source, target)
+        return False
+
+
+def _refusal(pdf: pikepdf.Pdf, ocr: pikepdf.Pdf) -> str:
+    if pdf.is_encrypted:
+        return "the input is encrypted"
+    if pdf.get_warnings():
+        # Opened by reconstructing the cross-reference table: offsets an
+        # update would point back to are not trustworthy.
+        return "the input is damaged"
+    if len(pdf.pages) != len(ocr.pages):
+        return "the OCR output has different pages"
+    return ""
+
+
+def _last_xref(path: str) -> Optional[tuple[int, bool]]:
+    # Offset of the last cross-reference section and whether it is a
+    # cross-reference stream (PDF 1.5) rather than a table.
+    with open(path, "rb") as handle:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        handle.seek(max(0, size - _TAIL_BYTES))
+        matches = _STARTXREF.findall(handle.read())
+        if not matches:
+            return None
+        offset = int(matches[-1])
+        if offset >= size:
+            return None
+        handle.seek(offset)
+        head = handle.read(32).lstrip()
+    if head.startswith(b"xref"):
+        return offset, False
+    if re.match(rb"\d+\s+\d+\s+obj", head):
+        return offset, True
+    return None
+
+
+def _graft_text_layers(pdf: pikepdf.Pdf, ocr: pikepdf.Pdf) -> list[pikepdf.Object]:
+    # Draws the text layer of every OCRed page of ocr on the same page of
+    # pdf, like OCRmyPDF does: a form XObject painted before the page
+    # content. Returns the objects the update has to write, i.e. the
+    # changed pages and everything new.
+    objects: dict[tuple[int, int], pikepdf.Object] = {}
+    for page, ocr_page in zip(pdf.pages, ocr.pages):
+        layer = _text_layer(ocr, ocr_page)
+        if layer is None:
+            continue
+        name, form, draw = layer
+        resources = _page_resources(page.obj)
+        xobjects = pikepdf.Dictionary(dict(resources.get(pikepdf.Name.XObject, pikepdf.Dictionary()).items()))
+        if name in xobjects:
+            raise ValueError(f"page already has an XObject named {name}")
+        xobjects[name] = pdf.copy_foreign(form)
+        updated = pikepdf.Dictionary(dict(resources.items()))
+        updated.XObject = xobjects
+        draw_stream = pdf.make_stream(draw)
+        contents = page.obj.get(pikepdf.Name.Contents)
+        if contents is None:
+            parts = []
+        elif isinstance(contents, pikepdf.Array):
+            parts = list(contents)
+        else:
+            parts = [contents]
+        # Replaced rather than edited: the old values may be shared with
+        # other pages, which must stay as they are.
+        page.obj.Resources = updated
+        page.obj.Contents = pikepdf.Array([draw_stream, *parts])
+        objects[page.obj.objgen] = page.obj
+        for obj in _reachable(draw_stream, xobjects[name]):
+            objects.setdefault(obj.objgen, obj)
+    return [objects[key] for key in sorted(objects)]
+
+
+def _text_layer(pdf: pikepdf.Pdf, page: pikepdf.Page) -> Optional[tuple[pikepdf.Name, pikepdf.Object, bytes]]:
+    # The text layer OCRmyPDF put on page: its XObject name, the form, and
+    # the "q [cm] /OCR-... Do Q" that draws it at the start of the content.
+    resources = page.obj.get(pikepdf.Name.Resources)
+    xobjects = resources.get(pikepdf.Name.XObject) if resources is not None else None
+    if xobjects is None:
+        return None
+    names = [name for name in xobjects.keys() if name.startswith(_TEXT_LAYER_PREFIX)]
+    if not names:
+        return None
+    contents = page.obj.get(pikepdf.Name.Contents)
+    if isinstance(contents, pikepdf.Array):
+        data = b"\n".join(part.read_bytes() for part in contents)
+    elif contents is not None:
+        data = contents.read_bytes()
+    else:
+        return None
+    data = data.lstrip()
+    for name in names:
+        marker = name.encode("ascii") + b" Do"
+        start = data.find(marker)
+        end = data.find(b"Q", start + len(marker))
+        if not data.startswith(b"q") or start < 0 or end < 0:
+            continue
+        instructions = pikepdf.parse_content_stream(pikepdf.Stream(pdf, data[: end + 1]))
+        operators = [str(instruction.operator) for instruction in instructions]
+        if operators not in (["q", "Do", "Q"], ["q", "cm", "Do", "Q"]) or instructions[-2].operands[0] != name:
+            continue
+        return name, xobjects[name], pikepdf.unparse_content_stream(instructions)
+    return None
+
+
+def _page_resources(page: pikepdf.Dictionary) -> pikepdf.Dictionary:
+    # /Resources may be inherited from the page tree.
+    node = page
+    while node is not None:
+        resources = node.get(pikepdf.Name.Resources)
+        if resources is not None:
+            return resources
+        node = node.get(pikepdf.Name.Parent)
+    return pikepdf.Dictionary()
+
+
+def _reachable(*roots: pikepdf.Object) -> list[pikepdf.Object]:
+    # Indirect objects reachable from roots. Used on freshly made or
+    # copied objects only, which never point back into the original.
+    found: dict[tuple[int, int], pikepdf.Object] = {}
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if not isinstance(obj, pikepdf.Object):
+            continue
+        if obj.is_indirect:
+            if obj.objgen in found:
+                continue
+            found[obj.objgen] = obj
+        if isinstance(obj, pikepdf.Stream):
+            stack.extend(obj.stream_dict.values())
+        elif isinstance(obj, pikepdf.Dictionary):
+            stack.extend(obj.values())
+        elif isinstance(obj, pikepdf.Array):
+            stack.extend(obj)
+    return list(found.values())
+
+
+def _append_update(handle, pdf: pikepdf.Pdf, objects: list[pikepdf.Object], prev: int, xref_stream: bool) -> int:
+    # Writes objects, a cross-reference section for them chained to the
+    # previous one, and a trailer. Returns the bytes appended.
+    start = handle.tell()
+    handle.write(b"\n")
+    offsets: dict[int, tuple[int, int]] = {}
+    for obj in objects:
+        number, generation = obj.objgen
+        offsets[number] = (handle.tell(), generation)
+        handle.write(b"%d %d obj\n" % (number, generation))
+        if isinstance(obj, pikepdf.Stream):
+            data = obj.read_raw_bytes()
+            obj.stream_dict.Length = len(data)
+            handle.write(obj.stream_dict.unparse(resolved=True))
+            handle.write(b"\nstream\n%s\nendstream\nendobj\n" % data)
+        else:
+            handle.write(obj.unparse(resolved=True))
+            handle.write(b"\nendobj\n")
+
+    trailer = pikepdf.Dictionary(Prev=prev, Root=pdf.trailer.Root)
+    for key in (pikepdf.Name.Info, pikepdf.Name.ID):
+        if key in pdf.trailer:
+            trailer[key] = pdf.trailer[key]
+    size = max(int(pdf.trailer.get(pikepdf.Name.Size, 0)), max(offsets) + 1)
+    xref_offset = handle.tell()
+    if xref_stream:
+        # The stream lists itself too.
+        offsets[size] = (xref_offset, 0)
+        trailer.Size = size + 1
+        _write_xref_stream(handle, trailer, offsets, xref_offset)
+    else:
+        trailer.Size = size
+        handle.write(b"xref\n")
+        for first, numbers in _runs(offsets):
+            handle.write(b"%d %d\n" % (first, len(numbers)))
+            for number in numbers:
+                handle.write(b"%010d %05d n\r\n" % offsets[number])
+        handle.write(b"trailer\n%s\n" % trailer.unparse(resolved=True))
+    handle.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+    return handle.tell() - start
+
+
+def _write_xref_stream(handle, trailer: pikepdf.Dictionary, offsets: dict[int, tuple[int, int]], xref_offset: int) -> None:
+    width = max(4, (xref_offset.bit_length() + 7) // 8)
+    index = []
+    rows = []
+    for first, numbers in _runs(offsets):
+        index.extend((first, len(numbers)))
+        for number in numbers:
+            offset, generation = offsets[number]
+            rows.append(b"\x01" + offset.to_bytes(width, "big") + generation.to_bytes(2, "big"))
+    data = zlib.compress(b"".join(rows))
+    trailer.Type = pikepdf.Name.XRef
+    trailer.W = pikepdf.Array([1, width, 2])
+    trailer.Index = pikepdf.Array(index)
+    trailer.Filter = pikepdf.Name.FlateDecode
+    trailer.Length = len(data)
+    handle.write(b"%d 0 obj\n" % (int(trailer.Size) - 1))
+    handle.write(trailer.unparse(resolved=True))
+    handle.write(b"\nstream\n%s\nendstream\nendobj\n" % data)
+
+
+def _runs(offsets: dict[int, tuple[int, int]]) -> list[tuple[int, list[int]]]:
+    # Object numbers in consecutive runs, one xref subsection each.
+    runs: list[tuple[int, list[int]]] = []
+    for number in sorted(offsets):
+        if runs and runs[-1][1][-1] == number - 1:
+            runs[-1][1].append(number)
+        else:
+            runs.append((number, [number]))
+    return runs
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+from typing import Optional
+
+import pikepdf
+
+from textlayer.services.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+
+# Large sequential reads keep SMB/NFS pipelines full while staging.
+_READ_AHEAD = 8 * 1024 * 1024
+_REMOTE_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs"}
+_DRIVE_REMOTE = 4
+
+
+class InputSource:
+    # One physical read of an input file, shared by detection, color probing
+    # and hashing. Files on network shares are first staged to local disk.
+    def __init__(self, path: str, stage_remote: bool = True) -> None:
+        self.path = path
+        self.local_path = path
+        self.size = 0
+        self.staged = False
+        self._stage_remote = stage_remote
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._sha256: Optional[str] = None
+        self._stage_dir: Optional[str] = None
+        self._stat: Optional[os.stat_result] = None
+
+    def __enter__(self) -> InputSource:
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def open(self) -> None:
+        if self._file is not None:
+            return
+        if self._stage_remote and is_remote_path(self.path):
+            self._stage()
+        else:
+            self._stat = os.stat(self.path)
+        self._file = open(self.local_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size and self.mmap_safe:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def mmap_safe(self) -> bool:
+        # A mapped file that another program truncates kills the process with
+        # SIGBUS on POSIX. Staged copies are private to us, and Windows refuses
+        # to truncate a mapped file, so only those are mapped.
+        return self.staged or os.name == "nt"
+
+    def is_stale(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_size, stat.st_mtime_ns) != (self._stat.st_size, self._stat.st_mtime_ns)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view is still exported; the mapping goes away with it.
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._stage_dir is not None:
+            shutil.rmtree(self._stage_dir, ignore_errors=True)
+            self._stage_dir = None
+
+    @property
+    def data(self) -> memoryview:
+        if self._mmap is None:
+            return memoryview(b"")
+        return memoryview(self._mmap)
+
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            if self._mmap is not None:
+                view = self.data
+                for offset in range(0, len(view), _READ_AHEAD):
+                    digest.update(view[offset:offset + _READ_AHEAD])
+            else:
+                self._file.seek(0)
+                for block in iter(lambda: self._file.read(_READ_AHEAD), b""):
+                    digest.update(block)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def open_pikepdf(self) -> pikepdf.Pdf:
+        if self.mmap_safe:
+            return pikepdf.open(self.local_path, access_mode=pikepdf.AccessMode.mmap)
+        return pikepdf.open(self.local_path)
+
+    def open_fitz(self):
+        import fitz
+
+        if self._mmap is not None:
+            try:
+                return fitz.open(stream=self.data, filetype="pdf")
+            except (TypeError, ValueError):
+                # Older PyMuPDF releases only accept bytes streams.
+                pass
+        return fitz.open(self.local_path)
+
+    def _stage(self) -> None:
+        self._stage_dir = get_workspace().temp_dir("textlayer-stage-")
+        target = os.path.join(self._stage_dir, os.path.basename(self.path))
+        digest = hashlib.sha256()
+        # Size and mtime from before the copy: a file changed while it was
+        # copied then shows up as stale instead of as a torn copy.
+        self._stat = os.stat(self.path)
+        copied = 0
+        # Hash while copying so the remote file is read exactly once.
+        with open(self.path, "rb", buffering=0) as src, open(target, "wb") as dst:
+            while True:
+                block = src.read(_READ_AHEAD)
+                if not block:
+                    break
+                digest.update(block)
+                dst.write(block)
+                copied += len(block)
+        if copied != self._stat.st_size or self.is_stale():
+            raise OSError(f"{self.path} changed while it was staged")
+        shutil.copystat(self.path, target)
+        self._sha256 = digest.hexdigest()
+        self.local_path = target
+        self.staged = True
+        logger.info("Staged %s to %s", self.path, target)
+
+
+def is_remote_path(path: str) -> bool:
+    path = os.path.abspath(path)
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True
+        try:
+            import ctypes
+
+            drive = os.path.splitdrive(path)[0] + "\\"
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == _DRIVE_REMOTE
+        except Exception:
+            return False
+    return _mount_fs_type(path) in _REMOTE_FS_TYPES
+
+
+def _mount_fs_type(path: str) -> str:
+    # Longest mount point that prefixes the path wins.
+    best = ""
+    fs_type = ""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as handle:
+            for line in handle:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace("\\040", " ")
+                if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+                    best = mount_point
+                    fs_type = fields[2]
+    except OSError:
+        return ""
+    return fs_type
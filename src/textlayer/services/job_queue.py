@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from textlayer.services.ocr_service import OCRTask
+
+# Seconds of predicted runtime forgiven per second spent waiting. At 0.5 a
+# job predicted to take an hour overtakes newly queued short jobs after two
+# hours in the queue, so giant books are delayed but never starved.
+DEFAULT_AGING = 0.5
+
+
+@dataclass(order=True)
+class QueuedJob:
+    priority: float
+    sequence: int
+    task: OCRTask = field(compare=False)
+    predicted_seconds: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class JobQueue:
+    # Shortest predicted job first, with aging. A job's effective priority is
+    # predicted - aging * waited, which for every waiting job shifts by the
+    # same amount over time; ordering by predicted + aging * enqueued_at is
+    # therefore equivalent and lets a plain heap keep the order.
+    def __init__(self, aging: float = DEFAULT_AGING) -> None:
+        self._aging = aging
+        self._heap: list[QueuedJob] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    def put(self, task: OCRTask, predicted_seconds: float) -> QueuedJob:
+        now = time.monotonic()
+        job = QueuedJob(
+            priority=predicted_seconds + self._aging * now,
+            sequence=next(self._sequence),
+            task=task,
+            predicted_seconds=predicted_seconds,
+            enqueued_at=now,
+        )
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job queue is closed.")
+            heapq.heappush(self._heap, job)
+            self._condition.notify()
+        return job
+
+    def get(self, timeout: Optional[float] = None) -> Optional[QueuedJob]:
+        # Returns None once the queue is closed and drained, or on timeout.
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._heap or self._closed, timeout):
+                return None
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)
+
+    def peek(self, count: int) -> list[QueuedJob]:
+        # The next jobs get() will return, in order. Priorities never change
+        # once queued, so this stays true until more jobs are put.
+        with self._condition:
+            return heapq.nsmallest(count, self._heap)
+
+    def close(self) -> None:
+        # No more jobs will be added; waiting consumers drain what is left.
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from textlayer.services.checkpoint import task_fingerprint
+from textlayer.services.ocr_service import OCRResult, OCRTask
+from textlayer.services.workspace import pid_alive
+from textlayer.utils import app_data_dir
+
+logger = logging.getLogger(__name__)
+
+
+JOURNAL_NAME = "journal.sqlite3"
+# queued -> running -> done | failed; a failed job with attempts left goes
+# back to running once its retry is due.
+JOURNAL_STATES = ("queued", "running", "done", "failed")
+# Runs per job, the first included.
+DEFAULT_MAX_ATTEMPTS = 3
+# Wait before the first retry; doubles with every failed attempt.
+RETRY_BASE_SECONDS = 60.0
+RETRY_MAX_SECONDS = 3600.0
+# Finished jobs are forgotten after this long.
+_KEEP_SECONDS = 90 * 24 * 3600
+_SCHEMA_VERSION = 1
+# Task fields that only exist in memory.
+_TRANSIENT_FIELDS = ("input_source", "profile")
+# Stored absolute, so a job can be resumed from any working directory.
+_PATH_FIELDS = ("input_pdf", "output_pdf", "output_txt", "output_words")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    input_pdf TEXT NOT NULL,
+    output_pdf TEXT NOT NULL,
+    task TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    pid INTEGER,
+    queued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    next_attempt_at REAL,
+    predicted_seconds REAL NOT NULL DEFAULT 0,
+    seconds REAL,
+    message TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, batch);
+"""
+
+
+@dataclass
+class JournalEntry:
+    job_id: int
+    batch: str
+    fingerprint: str
+    task: OCRTask
+    state: str
+    attempts: int
+    max_attempts: int
+    pid: Optional[int]
+    queued_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    # Set while a failed job waits for its retry.
+    next_attempt_at: Optional[float]
+    predicted_seconds: float
+    seconds: Optional[float]
+    message: str
+
+    @property
+    def retrying(self) -> bool:
+        return self.state == "failed" and self.next_attempt_at is not None
+
+
+class JobJournal:
+    # Durable record of conversions in SQLite, shared by every TextLayer
+    # process of the user: what is queued, running, done or failed, with
+    # the task options, attempts, timings and outputs. Every change is one
+    # transaction, so a crash leaves each job either before or after it.
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.path.join(app_data_dir(), JOURNAL_NAME)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at < ? AND (state = 'done' OR (state = 'failed' AND next_attempt_at IS NULL))",
+                (time.time() - _KEEP_SECONDS,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add(
+        self,
+        task: OCRTask,
+        batch: str,
+        predicted_seconds: float = 0.0,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        rerun: bool = False,
+    ) -> JournalEntry:
+        # Records a job, or returns the one already recorded for the same
+        # input, outputs and options: as it is if it is running in a live
+        # process or done (and its output still exists, unless rerun),
+        # otherwise queued again with fresh attempts under this batch. An
+        # input that cannot be read is recorded as failed for good.
+        now = time.time()
+        try:
+            fingerprint = task_fingerprint(task)
+        except OSError as exc:
+            logger.warning("Cannot read %s: %s", task.input_pdf, exc)
+            return self._add_failed(task, batch, predicted_seconds, f"Cannot read input: {exc.strerror or exc}", now)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE fingerprint = ? ORDER BY id DESC LIMIT 1", (fingerprint,)
+            ).fetchone()
+            if row is not None:
+                if row["state"] == "done" and not rerun and os.path.exists(row["output_pdf"]):
+                    return _entry(row)
+                if row["state"] == "running" and row["pid"] is not None and pid_alive(row["pid"]):
+                    return _entry(row)
+                self._conn.execute(
+                    "UPDATE jobs SET batch = ?, task = ?, state = 'queued', attempts = 0, max_attempts = ?, pid = NULL,"
+                    " queued_at = ?, next_attempt_at = NULL, predicted_seconds = ?, message = '' WHERE id = ?",
+                    (batch, _dump_task(task), max(1, max_attempts), now, predicted_seconds, row["id"]),
+                )
+                job_id = row["id"]
+            else:
+                job_id = self._conn.execute(
+                    "INSERT INTO jobs (batch, fingerprint, input_pdf, output_pdf, task, state, max_attempts, queued_at,"
+                    " predicted_seconds) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (
+                        batch,
+                        fingerprint,
+                        os.path.abspath(task.input_pdf),
+                        os.path.abspath(task.output_pdf),
+                        _dump_task(task),
+                        max(1, max_attempts),
+                        now,
+                        predicted_seconds,
+                    ),
+                ).lastrowid
+            return _entry(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def _add_failed(self, task: OCRTask, batch: str, predicted_seconds: float, message: str, now: float) -> JournalEntry:
+        # Without a fingerprint the job can never be matched again; a later
+        # add() of the readable input records a new one.
+        with self._lock, self._conn:
+            job_id = self._conn.execute(
+                "INSERT INTO jobs (batch, fingerprint, input_pdf, output_pdf, task, state, max_attempts, queued_at,"
+                " finished_at, predicted_seconds, message) VALUES (?, '', ?, ?, ?, 'failed', 1, ?, ?, ?, ?)",
+                (
+                    batch,
+                    os.path.abspath(task.input_pdf),
+                    os.path.abspath(task.output_pdf),
+                    _dump_task(task),
+                    now,
+                    now,
+                    predicted_seconds,
+                    message,
+                ),
+            ).lastrowid
+            return _entry(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def completed(self, tasks: Iterable[OCRTask]) -> Optional[JournalEntry]:
+        # The finished job for any of tasks whose output still exists. Lets
+        # a rerun skip finished inputs before reading them.
+        with self._lock:
+            for task in tasks:
+                try:
+                    fingerprint = task_fingerprint(task)
+                except OSError:
+                    continue
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE fingerprint = ? AND state = 'done' ORDER BY id DESC LIMIT 1",
+                    (fingerprint,),
+                ).fetchone()
+                if row is not None and os.path.exists(row["output_pdf"]):
+                    return _entry(row)
+        return None
+
+    def start(self, job_id: int) -> bool:
+        # Claims a queued job, or a failed one with attempts left, for this
+        # process. False if another process got it first.
+        with self._lock, self._conn:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, pid = ?, started_at = ?,"
+                " next_attempt_at = NULL WHERE id = ? AND (state = 'queued' OR (state = 'failed' AND next_attempt_at IS NOT NULL))",
+                (os.getpid(), time.time(), job_id),
+            ).rowcount
+        return bool(claimed)
+
+    def finish(self, job_id: int, result: OCRResult, seconds: float) -> Optional[JournalEntry]:
+        # Records the outcome of a run. A failed job with attempts left is
+        # scheduled for a retry, later by every failed attempt.
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            next_attempt_at = None
+            if result.success:
+                state = "done"
+            else:
+                state = "failed"
+                if row["attempts"] < row["max_attempts"]:
+                    next_attempt_at = now + retry_delay(row["attempts"])
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, pid = NULL, finished_at = ?, next_attempt_at = ?, seconds = ?, message = ?,"
+                " output_pdf = COALESCE(NULLIF(?, ''), output_pdf) WHERE id = ?",
+                (state, now, next_attempt_at, round(seconds, 2), result.message, result.output_pdf, job_id),
+            )
+            return _entry(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def requeue(self, job_id: int) -> None:
+        # A run that was interrupted rather than failed: back in the queue,
+        # without using up an attempt.
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = MAX(0, attempts - 1), pid = NULL WHERE id = ? AND state = 'running'",
+                (job_id,),
+            )
+
+    def abandon(self, job_id: int, message: str) -> None:
+        # Failed for good, e.g. cancelled by the user or no longer convertible.
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'failed', pid = NULL, finished_at = ?, next_attempt_at = NULL, message = ? WHERE id = ?",
+                (time.time(), message, job_id),
+            )
+
+    def recover(self) -> int:
+        # Jobs left running by processes that no longer exist (crash, kill,
+        # reboot) go back to the queue. Returns how many.
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT id, pid FROM jobs WHERE state = 'running'").fetchall()
+            orphaned = [(row["id"],) for row in rows if row["pid"] is None or not pid_alive(row["pid"])]
+            self._conn.executemany(
+                "UPDATE jobs SET state = 'queued', attempts = MAX(0, attempts - 1), pid = NULL WHERE id = ?", orphaned
+            )
+        if orphaned:
+            logger.info("Recovered %d interrupted job(s) from the journal", len(orphaned))
+        return len(orphaned)
+
+    def pending(self, batch: Optional[str] = None) -> list[JournalEntry]:
+        # Queued jobs and failed jobs waiting for a retry, oldest first.
+        query = "SELECT * FROM jobs WHERE (state = 'queued' OR (state = 'failed' AND next_attempt_at IS NOT NULL))"
+        params: tuple = ()
+        if batch is not None:
+            query += " AND batch = ?"
+            params = (batch,)
+        with self._lock:
+            return [_entry(row) for row in self._conn.execute(query + " ORDER BY id", params)]
+
+    def counts(self, batch: Optional[str] = None) -> dict[str, int]:
+        query = "SELECT state, COUNT(*) FROM jobs"
+        params: tuple = ()
+        if batch is not None:
+            query += " WHERE batch = ?"
+            params = (batch,)
+        with self._lock:
+            return {state: count for state, count in self._conn.execute(query + " GROUP BY state", params)}
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+def _dump_task(task: OCRTask) -> str:
+    options = {
+        field.name: getattr(task, field.name)
+        for field in dataclasses.fields(task)
+        if field.name not in _TRANSIENT_FIELDS
+    }
+    for name in _PATH_FIELDS:
+        if options[name]:
+            options[name] = os.path.abspath(options[name])
+    return json.dumps(options)
+
+
+def _load_task(data: str) -> OCRTask:
+    # Fields this version does not know are dropped, missing ones default.
+    names = {field.name for field in dataclasses.fields(OCRTask)} - set(_TRANSIENT_FIELDS)
+    options = {key: value for key, value in json.loads(data).items() if key in names}
+    if "word_formats" in options:
+        options["word_formats"] = tuple(options["word_formats"])
+    return OCRTask(**options)
+
+
+def _entry(row: sqlite3.Row) -> JournalEntry:
+    return JournalEntry(
+        job_id=row["id"],
+        batch=row["batch"],
+        fingerprint=row["fingerprint"],
+        task=_load_task(row["task"]),
+        state=row["state"],
+        attempts=row["attempts"],
+        max_attempts=row["max_attempts"],
+        pid=row["pid"],
+        queued_at=row["queued_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+        next_attempt_at=row["next_attempt_at"],
+        predicted_seconds=row["predicted_seconds"],
+        seconds=row["seconds"],
+        message=row["message"],
+    )
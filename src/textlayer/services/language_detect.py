@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import os
+import re
+import subprocess
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from textlayer.services.input_source import InputSource
+from textlayer.services.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+
+AUTO_LANG = "auto"
+# Tesseract OSD script names -> language models, in order of preference.
+SCRIPT_LANGUAGES = {
+    "Latin": ("eng",),
+    "Japanese": ("jpn",),
+    "Katakana": ("jpn",),
+    "Hiragana": ("jpn",),
+    "Han": ("chi_sim", "chi_tra", "jpn"),
+    "HanS": ("chi_sim",),
+    "HanT": ("chi_tra",),
+    "Hangul": ("kor",),
+    "Korean": ("kor",),
+    "Cyrillic": ("rus",),
+    "Greek": ("ell",),
+    "Arabic": ("ara",),
+    "Hebrew": ("heb",),
+    "Thai": ("tha",),
+    "Devanagari": ("hin",),
+}
+_SAMPLE_PAGES = 4
+# Low resolution keeps the probe cheap; OSD only needs glyph shapes.
+_SAMPLE_DPI = 150
+_MIN_SCRIPT_CONFIDENCE = 1.0
+_SCRIPT_RE = re.compile(r"^Script:\s*(\S+)", re.MULTILINE)
+_SCRIPT_CONF_RE = re.compile(r"^Script confidence:\s*([\d.]+)", re.MULTILINE)
+
+
+@dataclass
+class LanguageChoice:
+    lang: str
+    # Pages (zero-based) sampled and the script OSD reported for each.
+    scripts: dict[int, str] = field(default_factory=dict)
+    detected: bool = True
+
+
+def detect_languages(
+    path: str,
+    tesseract_bin: str,
+    installed: set[str],
+    env: Optional[dict] = None,
+    source: Optional[InputSource] = None,
+) -> LanguageChoice:
+    # Run OSD on a few low-resolution page samples and keep only the
+    # language models for scripts that actually occur.
+    fallback = LanguageChoice(_fallback_lang(installed), detected=False)
+    if "osd" not in installed:
+        logger.info("Tesseract OSD data not installed; using %s", fallback.lang)
+        return fallback
+    try:
+        import fitz
+    except Exception:
+        return fallback
+
+    with tempfile.TemporaryDirectory(prefix="textlayer-osd-", dir=get_workspace().root) as tmp:
+        try:
+            doc = source.open_fitz() if source else fitz.open(path)
+        except Exception as exc:
+            logger.warning("Language detection could not open %s: %s", path, exc)
+            return fallback
+        try:
+            images = {}
+            for page_index in _sample_pages(doc.page_count):
+                pix = doc.load_page(page_index).get_pixmap(dpi=_SAMPLE_DPI, colorspace=fitz.csGRAY)
+                image_path = os.path.join(tmp, f"{page_index:06d}.png")
+                pix.save(image_path)
+                images[page_index] = image_path
+        finally:
+            doc.close()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(4, len(images)))) as pool:
+            scripts = dict(zip(images, pool.map(lambda image: _osd_script(tesseract_bin, image, env), images.values())))
+
+    scripts = {page: script for page, script in scripts.items() if script}
+    langs = _languages_for(scripts.values(), installed)
+    if not langs:
+        return fallback
+    choice = LanguageChoice("+".join(langs), scripts)
+    logger.info("Detected scripts %s -> -l %s", scripts, choice.lang)
+    return choice
+
+
+def installed_languages(tesseract_bin: str, env: Optional[dict] = None) -> set[str]:
+    try:
+        result = subprocess.run(
+            [tesseract_bin, "--list-langs"],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False,
+        )
+    except Exception:
+        return set()
+    output = (result.stdout or "") + (result.stderr or "")
+    # The first line is a "List of available languages" header.
+    return {line.strip() for line in output.splitlines()[1:] if line.strip()}
+
+
+def describe_range_languages(ranges: list, langs: dict[str, str], default: str) -> str:
+    # One language set for the whole document, or "1-10: jpn; 11-20: eng"
+    # when page ranges were detected differently.
+    chosen = [langs.get(str(index)) or default for index in range(len(ranges))]
+    if len(set(chosen)) <= 1:
+        return chosen[0] if chosen else default
+    return "; ".join(f"{start + 1}-{end}: {lang}" for (start, end), lang in zip(ranges, chosen))
+
+
+def _sample_pages(page_count: int) -> list[int]:
+    # Evenly spread samples; checkpointed and distributed jobs call this per
+    # page range, so each range gets its own choice.
+    if page_count <= _SAMPLE_PAGES:
+        return list(range(page_count))
+    step = page_count / _SAMPLE_PAGES
+    return sorted({int(step * index + step / 2) for index in range(_SAMPLE_PAGES)})
+
+
+def _osd_script(tesseract_bin: str, image_path: str, env: Optional[dict]) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            [tesseract_bin, image_path, "stdout", "--psm", "0"],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False,
+            timeout=60,
+        )
+    except Exception as exc:
+        logger.debug("OSD failed for %s: %s", image_path, exc)
+        return None
+    # Pages with too little text make OSD fail; they do not vote. Some
+    # Tesseract builds print the OSD report on stderr.
+    output = (result.stdout or "") + (result.stderr or "")
+    script = _SCRIPT_RE.search(output)
+    confidence = _SCRIPT_CONF_RE.search(output)
+    if not script or (confidence and float(confidence.group(1)) < _MIN_SCRIPT_CONFIDENCE):
+        return None
+    return script.group(1)
+
+
+def _languages_for(scripts, installed: set[str]) -> list[str]:
+    # Most frequent script first: Tesseract treats the first model as primary.
+    langs: list[str] = []
+    for script, _ in Counter(scripts).most_common():
+        for lang in SCRIPT_LANGUAGES.get(script, ()):
+            if lang in installed:
+                if lang not in langs:
+                    langs.append(lang)
+                break
+    return langs
+
+
+def _fallback_lang(installed: set[str]) -> str:
+    # Without a usable detection, keep the old safe behavior: every common
+    # model that is installed.
+    langs = [lang for lang in ("eng", "jpn", "chi_sim", "chi_tra", "kor") if lang in installed]
+    return "+".join(langs) or "eng"
@@ -1,14 +1,45 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
+import functools
 import logging
 import os
 import re
 import shutil
 import subprocess
-from dataclasses import dataclass
-from typing import Optional
-
-from PySide6.QtCore import QObject, Signal
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import pikepdf
+
+from textlayer.services.confidence import (
+    DEFAULT_REFINE_THRESHOLD,
+    FAST_PASS_DPI,
+    REFINE_DPI,
+    ConfidenceSummary,
+    page_confidence,
+    sparse_pages,
+)
+from textlayer.services.detection import DEFAULT_BLANK_MODE, blank_pages_among, find_blank_pages, is_pdf_grayscale
+from textlayer.services.estimator import EtaTracker, JobFeatures, extract_features, get_estimator
+from textlayer.services.incremental import place_output
+from textlayer.services.input_source import InputSource
+from textlayer.services.language_detect import AUTO_LANG, detect_languages, installed_languages
+from textlayer.services.optimize import get_preset, repack_pdf
+from textlayer.services.pdf_split import clear_sidecar_pages, replace_sidecar_pages, save_without_pages
+from textlayer.services.pdfa import finalize_pdfa
+from textlayer.services.rasterize import DEFAULT_RASTERIZER
+from textlayer.services.profile import DocumentProfile
+from textlayer.services.resource_governor import CoreLease, get_governor
+from textlayer.services.supervisor import ProcessLimits, ProcessSupervisor, ProcessUsage
+from textlayer.services.tesseract_pool import AUTHKEY_ENV, DEFAULT_ENGINE, TesseractLibraryError, get_pool_server
+from textlayer.services.words import WORD_FORMATS, collect_words, page_hocr_path, write_word_outputs
+from textlayer.services.workspace import WorkspaceBudgetError, WorkspaceLease, estimate_job_bytes, get_workspace
+from textlayer.utils import format_duration
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +51,14 @@ _PROGRESS_PATTERNS = [
     re.compile(r"(\d+)\s*/\s*(\d+)")
 ]
 
+_PLUGIN_MODULE = "textlayer.services.ocrmypdf_plugin"
+DEFAULT_STALL_SECONDS = 600.0
+# Automatic time limits allow this multiple of the predicted duration, and
+# never less than the minimum.
+_TIMEOUT_FACTOR = 10.0
+_MIN_TIMEOUT_SECONDS = 1800.0
+_COLOR_RETRY_MARKERS = ("ColorConversionNeededError", "--color-conversion-strategy")
+
 
 @dataclass
 class OCRTask:
@@ -31,87 +70,529 @@ class OCRTask:
     redo_ocr: bool
     output_type: str
     color_strategy: str
+    preprocess: str = "none"
+    preprocess_target_dpi: int = 300
+    optimize: str = "fast"
+    page_count: int = 0
+    # Pages per checkpointed range; 0 runs the whole document in one pass.
+    checkpoint_pages: int = 0
+    # Prefix for word-level output (<prefix>.words.npz, .hocr, .alto.xml).
+    output_words: Optional[str] = None
+    word_formats: tuple[str, ...] = WORD_FORMATS
+    # "cli" or "persistent" (long-lived Tesseract workers, see tesseract_pool).
+    ocr_engine: str = DEFAULT_ENGINE
+    # One of RASTERIZERS: how OCRmyPDF renders pages for OCR.
+    rasterizer: str = DEFAULT_RASTERIZER
+    # Process supervision; 0 disables a limit. A zero timeout is derived
+    # from the predicted duration instead.
+    timeout_seconds: float = 0.0
+    stall_seconds: float = DEFAULT_STALL_SECONDS
+    memory_limit_mb: int = 0
+    # Two-pass OCR: a reduced-resolution pass over every page, then a
+    # full-resolution pass over pages whose mean word confidence is below
+    # the threshold.
+    adaptive: bool = False
+    refine_threshold: float = DEFAULT_REFINE_THRESHOLD
+    # One of BLANK_PAGE_MODES: OCR blank pages ("off"), skip them, or drop
+    # them from the output.
+    blank_pages: str = DEFAULT_BLANK_MODE
+    # Write a plain PDF output as the input file plus an incremental update
+    # with the text layer, instead of rewriting it (see incremental_output).
+    incremental: bool = False
+    # Already-open input shared with detection; never pickled or copied.
+    input_source: Optional[InputSource] = field(default=None, repr=False, compare=False)
+    # Detection's analysis of input_pdf (page for page), so no later stage
+    # reads the document again.
+    profile: Optional[DocumentProfile] = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class OCRReport:
+    input_bytes: int = 0
+    output_bytes: int = 0
+    elapsed_seconds: float = 0.0
+    optimize: str = "fast"
+    repack_seconds: float = 0.0
+    # Tesseract languages used; differs from the task when it asked for "auto".
+    lang: str = ""
+    # Summed over OCRmyPDF runs; CPU time includes every child process.
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    # Per-page word confidence; set for adaptive OCR.
+    confidence: Optional[ConfidenceSummary] = None
+    # Zero-based input pages found blank; skipped, or removed from the
+    # output when blank_removed is set.
+    blank_pages: list[int] = field(default_factory=list)
+    blank_removed: bool = False
+    # The output is the input with the text layer appended.
+    incremental: bool = False
+
 
+@dataclass
+class OCRResult:
+    success: bool
+    message: str
+    output_pdf: str = ""
+    output_txt: str = ""
+    report: Optional[OCRReport] = None
+
+
+# Receives (percent, line); percent is -1 for plain log lines.
+ProgressCallback = Callable[[int, str], None]
+
+
+async def run_job_async(task: OCRTask, progress: ProgressCallback) -> OCRResult:
+    # One conversion as the job engine and the GUI run it: progress lines
+    # carry an ETA, and long documents go through checkpointed ranges.
+    features = await asyncio.to_thread(_job_features, task)
+    if features is not None:
+        jobs = get_governor().total_cores
+        progress = _with_eta(progress, EtaTracker(get_estimator().predict(features, jobs)))
+    if task.checkpoint_pages > 0:
+        from textlayer.services.checkpoint import run_checkpointed_task_async
+
+        return await run_checkpointed_task_async(task, progress, task.checkpoint_pages)
+    return await run_ocr_task_async(task, progress)
+
+
+def run_ocr_task(task: OCRTask, progress: ProgressCallback) -> OCRResult:
+    # Blocking form for the CLI, checkpoint ranges and distributed workers.
+    return asyncio.run(run_ocr_task_async(task, progress))
+
+
+async def run_ocr_task_async(task: OCRTask, progress: ProgressCallback) -> OCRResult:
+    # OCRmyPDF output is streamed on the event loop and blocking PDF work
+    # runs in worker threads, so one loop drives many conversions. progress
+    # is called on the loop thread. Cancelling the task kills the OCRmyPDF
+    # process tree and removes the job's temp space.
+    input_pdf = task.input_pdf
+    output_pdf = task.output_pdf
+    output_txt = task.output_txt
+
+    # Verify external dependencies early to produce actionable UI errors.
+    ocrmypdf_bin = shutil.which("ocrmypdf")
+    if not ocrmypdf_bin:
+        return OCRResult(False, "Missing dependency: ocrmypdf not found.")
+
+    tesseract_bin = task.tesseract_path or shutil.which("tesseract")
+    if not tesseract_bin:
+        return OCRResult(False, "Missing dependency: tesseract not found.")
+
+    # Inject Tesseract path into PATH for OCRmyPDF if user configured it.
+    env = os.environ.copy()
+    if task.tesseract_path:
+        tesseract_dir = os.path.dirname(task.tesseract_path)
+        env["PATH"] = tesseract_dir + os.pathsep + env.get("PATH", "")
+        env["TESSERACT_CMD"] = task.tesseract_path
+    # Make the TextLayer ocrmypdf plugin importable in the ocrmypdf process.
+    env["PYTHONPATH"] = _package_root() + os.pathsep + env.get("PYTHONPATH", "")
+
+    installed = await asyncio.to_thread(installed_languages, tesseract_bin, env)
+    if task.lang == AUTO_LANG:
+        progress(-1, "Detecting document languages...")
+        choice = await asyncio.to_thread(
+            detect_languages, input_pdf, tesseract_bin, installed, env, source=task.input_source
+        )
+        progress(-1, f"OCR language: {choice.lang}")
+        task = dataclasses.replace(task, lang=choice.lang)
+    if not _tesseract_has_lang(installed, task.lang):
+        return OCRResult(False, f"Tesseract language '{task.lang}' not installed.")
+
+    blank_pages: list[int] = []
+    ocr_pages: Optional[list[int]] = None
+    if task.blank_pages != "off":
+        progress(-1, "Checking for blank pages...")
+        blank_pages, page_count = await asyncio.to_thread(_find_blank_pages, task)
+        if blank_pages and task.blank_pages == "skip":
+            blank = set(blank_pages)
+            ocr_pages = [page for page in range(page_count) if page not in blank]
+
+    features = await asyncio.to_thread(_job_features, task)
+    if ocr_pages is not None and features is not None:
+        # Only OCRed pages take time; keeps the duration model honest.
+        features = _scale_features(features, len(ocr_pages), page_count)
+    # Intermediates go to the configured temp root; the job is held while
+    # its estimated size does not fit the temp space budget.
+    workspace = get_workspace()
+    space = await workspace.acquire_async(_estimate_temp_bytes(task, features), lambda line: progress(-1, line))
+    workspace.apply_env(space, env)
+    # Share the CPU with other running conversions instead of letting
+    # each one assume it owns every core.
+    governor = get_governor()
+    lease = governor.acquire(task.page_count)
+    governor.apply_env(lease, env)
+    preset = get_preset(task.optimize)
+    usage = OCRReport()
+    started = time.monotonic()
 
-class OCRWorker(QObject):
-    progress = Signal(int, str)
-    finished = Signal(bool, str, str, str)
-
-    def __init__(self, task: OCRTask) -> None:
-        super().__init__()
-        self._task = task
-
-    def run(self) -> None:
-        input_pdf = self._task.input_pdf
-        output_pdf = self._task.output_pdf
-        lang = self._task.lang
-        output_txt = self._task.output_txt
-        output_type = self._task.output_type
-        color_strategy = self._task.color_strategy
-
-        # Verify external dependencies early to produce actionable UI errors.
-        ocrmypdf_bin = shutil.which("ocrmypdf")
-        if not ocrmypdf_bin:
-            self.finished.emit(False, "Missing dependency: ocrmypdf not found.", "", "")
-            return
-
-        tesseract_bin = self._task.tesseract_path or shutil.which("tesseract")
-        if not tesseract_bin:
-            self.finished.emit(False, "Missing dependency: tesseract not found.", "", "")
-            return
-
-        # Inject Tesseract path into PATH for OCRmyPDF if user configured it.
-        env = os.environ.copy()
-        if self._task.tesseract_path:
-            tesseract_dir = os.path.dirname(self._task.tesseract_path)
-            env["PATH"] = tesseract_dir + os.pathsep + env.get("PATH", "")
-            env["TESSERACT_CMD"] = self._task.tesseract_path
-
-        if not _tesseract_has_lang(tesseract_bin, lang, env):
-            self.finished.emit(False, f"Tesseract language '{lang}' not installed.", "", "")
-            return
-
-        cmd = [
-            ocrmypdf_bin,
-            "-l",
-            lang,
-        ]
-        if self._task.redo_ocr:
-            cmd.append("--redo-ocr")
-        if output_type == "pdf":
-            cmd.extend(["--output-type", "pdf"])
-        resolved_color = _resolve_color_strategy(
-            input_pdf=input_pdf,
-            output_type=output_type,
-            color_strategy=color_strategy,
+    try:
+        if blank_pages and task.blank_pages == "drop":
+            progress(-1, f"Removing {len(blank_pages)} blank page(s)...")
+            task = await asyncio.to_thread(_without_pages, task, blank_pages, space.path)
+            features = await asyncio.to_thread(_job_features, task)
+        elif blank_pages:
+            progress(-1, f"Skipping OCR on {len(blank_pages)} blank page(s)")
+        incremental = incremental_output(task)
+        if incremental:
+            # OCRmyPDF writes its full output to temp space; only the text
+            # layer goes to output_pdf. Its images are never used, so it
+            # need not optimize them.
+            task = dataclasses.replace(task, output_pdf=os.path.join(space.path, "ocr-output.pdf"), optimize="none")
+        limits = _process_limits(task, features, lease.jobs)
+        # The plugin drops one hOCR file per page here while OCR runs;
+        # adaptive OCR reads the word confidences from it.
+        words_dir = None
+        if task.output_words or task.adaptive:
+            words_dir = tempfile.mkdtemp(prefix="words-", dir=space.path)
+        pool_address = _start_engine_pool(task, env, progress)
+        first_pass = _fast_pass_task(task) if task.adaptive else task
+        cmd = _build_ocr_command(
+            ocrmypdf_bin, first_pass, task.output_type, lease.jobs, words_dir, pool_address, pages=ocr_pages
         )
-        if resolved_color:
-            cmd.extend(["--color-conversion-strategy", resolved_color])
-        if output_txt:
-            cmd.extend(["--sidecar", output_txt])
-        cmd.extend([input_pdf, output_pdf])
 
         logger.info("Running OCR: %s", " ".join(cmd))
-        self.progress.emit(0, "Starting OCR...")
+        progress(0, "Starting OCR...")
+        failure = await _run_with_color_retry(cmd, env, progress, lease, space, limits, usage)
+        if failure:
+            return OCRResult(False, failure)
+
+        if task.output_type == "pdfa_fast":
+            progress(-1, "Writing PDF/A metadata...")
+            problems = await asyncio.to_thread(finalize_pdfa, output_pdf)
+            if problems:
+                # Fall back to the regular Ghostscript PDF/A conversion.
+                for problem in problems:
+                    logger.warning("Fast PDF/A validation: %s", problem)
+                progress(-1, "Fast PDF/A validation failed; converting with Ghostscript...")
+                cmd = _build_ocr_command(
+                    ocrmypdf_bin, first_pass, "pdfa", lease.jobs, words_dir, pool_address, pages=ocr_pages
+                )
+                failure = await _run_with_color_retry(cmd, env, progress, lease, space, limits, usage)
+                if failure:
+                    return OCRResult(False, failure)
+
+        confidence = None
+        if task.adaptive:
+            run = functools.partial(
+                _run_with_color_retry, env=env, progress=progress, lease=lease, space=space, limits=limits, report=usage
+            )
+            confidence = await _refine_low_confidence(
+                ocrmypdf_bin, task, words_dir, space.path, lease.jobs, pool_address, run, progress
+            )
+
+        if ocr_pages is not None and output_txt:
+            await asyncio.to_thread(clear_sidecar_pages, output_txt, blank_pages)
+
+        if task.output_words:
+            progress(-1, "Writing word data...")
+            await asyncio.to_thread(_write_words, task, words_dir)
+
+        report = OCRReport(
+            input_bytes=os.path.getsize(input_pdf),
+            optimize=preset.name,
+            lang=task.lang,
+            cpu_seconds=usage.cpu_seconds,
+            peak_rss_bytes=usage.peak_rss_bytes,
+            confidence=confidence,
+            blank_pages=blank_pages,
+            blank_removed=bool(blank_pages) and task.blank_pages == "drop",
+        )
+        if incremental:
+            progress(-1, "Appending text layer to the input...")
+            original = task.input_source.local_path if task.input_source else task.input_pdf
+            report.incremental = await asyncio.to_thread(place_output, original, task.output_pdf, output_pdf)
+        if preset.repack and not report.incremental:
+            progress(-1, "Repacking output...")
+            report.repack_seconds = await asyncio.to_thread(repack_pdf, output_pdf)
+        report.output_bytes = os.path.getsize(output_pdf)
+        report.elapsed_seconds = time.monotonic() - started
+        logger.info(
+            "Output size %d -> %d bytes (preset %s) in %.1fs",
+            report.input_bytes,
+            report.output_bytes,
+            report.optimize,
+            report.elapsed_seconds,
+        )
+        if features is not None:
+            # Calibrate the duration model with this machine's real timings.
+            get_estimator().record(features, report.elapsed_seconds, lease.jobs)
+
+        progress(100, "Finished")
+        return OCRResult(True, "Conversion finished.", output_pdf, output_txt or "", report)
+    except Exception as exc:
+        logger.exception("OCR process failed")
+        return OCRResult(False, f"Conversion failed: {exc}")
+    finally:
+        governor.release(lease)
+        # Also removes the word hOCR files and anything ocrmypdf left behind.
+        workspace.release(space)
+
+
+def incremental_output(task: OCRTask) -> bool:
+    # An incremental update keeps every byte of the input, so it only fits
+    # a plain PDF output with the input's pages and content.
+    return task.incremental and task.output_type == "pdf" and not task.redo_ocr and task.blank_pages != "drop"
+
+
+def _write_words(task: OCRTask, words_dir: str) -> None:
+    write_word_outputs(collect_words(words_dir, _page_count(task)), task.output_words, task.word_formats)
+
+
+def _find_blank_pages(task: OCRTask) -> tuple[list[int], int]:
+    blank, page_count = find_blank_pages(task.input_pdf, task.input_source, task.profile)
+    if blank and len(blank) == page_count:
+        # Nothing left to OCR would leave nothing to write; an all-blank
+        # document is more likely a very faint scan than truly empty.
+        logger.warning("Every page of %s looks blank; OCRing all of them", task.input_pdf)
+        return [], page_count
+    if blank:
+        logger.info("Blank pages in %s: %s", task.input_pdf, _page_spec(blank))
+    return blank, page_count
+
+
+def _without_pages(task: OCRTask, pages: list[int], work_dir: str) -> OCRTask:
+    # OCR a copy without the given pages; outputs then match the copy.
+    path = os.path.join(work_dir, "input-kept.pdf")
+    with (task.input_source.open_pikepdf() if task.input_source else pikepdf.open(task.input_pdf)) as pdf:
+        page_count = len(pdf.pages)
+        save_without_pages(pdf, pages, path)
+    profile = None
+    if task.profile is not None:
+        dropped = set(pages)
+        profile = task.profile.subset(page for page in range(page_count) if page not in dropped)
+    return dataclasses.replace(
+        task, input_pdf=path, input_source=None, page_count=page_count - len(pages), profile=profile
+    )
 
-        try:
-            return_code, lines = _run_ocr_process(cmd, env, self.progress)
-            if return_code != 0:
-                if _needs_color_conversion_retry(lines):
-                    retry_cmd = cmd[:]
-                    retry_cmd.insert(1, "--output-type")
-                    retry_cmd.insert(2, "pdf")
-                    logger.info("Retrying OCR with --output-type pdf due to color space issue")
-                    return_code, lines = _run_ocr_process(retry_cmd, env, self.progress)
-                if return_code != 0:
-                    self.finished.emit(False, f"OCRmyPDF failed with code {return_code}", "", "")
-                    return
-
-            self.progress.emit(100, "Finished")
-            self.finished.emit(True, "Conversion finished.", output_pdf, output_txt or "")
-        except Exception as exc:
-            logger.exception("OCR process failed")
-            self.finished.emit(False, f"Conversion failed: {exc}", "", "")
+
+def _scale_features(features: JobFeatures, pages: int, page_count: int) -> JobFeatures:
+    share = pages / page_count if page_count else 1.0
+    return dataclasses.replace(features, pages=pages, megapixels=features.megapixels * share)
+
+
+def _fast_pass_task(task: OCRTask) -> OCRTask:
+    # First adaptive pass: same options, OCR image capped at FAST_PASS_DPI.
+    return dataclasses.replace(
+        task,
+        preprocess=task.preprocess if task.preprocess != "none" else "downsample",
+        preprocess_target_dpi=min(task.preprocess_target_dpi or FAST_PASS_DPI, FAST_PASS_DPI),
+    )
+
+
+async def _refine_low_confidence(
+    ocrmypdf_bin: str,
+    task: OCRTask,
+    words_dir: str,
+    work_dir: str,
+    jobs: int,
+    pool_address: Optional[str],
+    run: Callable[[list[str]], Awaitable[Optional[str]]],
+    progress: ProgressCallback,
+) -> ConfidenceSummary:
+    # Second adaptive pass. Best effort: when it fails, the first-pass
+    # output is kept and the low pages are reported as such.
+    page_count = await asyncio.to_thread(_page_count, task)
+    means = await asyncio.to_thread(_page_means, words_dir, page_count, task.output_pdf)
+    summary = ConfidenceSummary(task.refine_threshold, means)
+    pages = summary.low_pages
+    if not pages:
+        return summary
+    progress(-1, f"Re-running OCR on {len(pages)} low-confidence page(s)...")
+    refined_pdf = os.path.join(work_dir, "refined.pdf")
+    refined_txt = os.path.join(work_dir, "refined.txt") if task.output_txt else None
+    # --redo-ocr replaces only the OCR text of the listed pages and keeps
+    # their images; no downsampling this time.
+    refine_task = dataclasses.replace(
+        task,
+        input_pdf=task.output_pdf,
+        input_source=None,
+        output_pdf=refined_pdf,
+        output_txt=refined_txt,
+        redo_ocr=True,
+        preprocess_target_dpi=0,
+    )
+    cmd = _build_ocr_command(
+        ocrmypdf_bin, refine_task, task.output_type, jobs, words_dir, pool_address, pages=pages, oversample=REFINE_DPI
+    )
+    # The second pass overwrites the hOCR of the pages it reads.
+    first_pass_hocr = await asyncio.to_thread(_stash_page_hocr, words_dir, pages, work_dir)
+    failure = await run(cmd)
+    if not failure and task.output_type == "pdfa_fast" and await asyncio.to_thread(finalize_pdfa, refined_pdf):
+        failure = "fast PDF/A validation failed"
+    if not failure and refined_txt:
+        # PDF, text and words must all come from the same pass.
+        if not await asyncio.to_thread(replace_sidecar_pages, task.output_txt, refined_txt, pages):
+            failure = "sidecar pages do not line up"
+    if failure:
+        await asyncio.to_thread(_restore_page_hocr, first_pass_hocr, words_dir)
+        logger.warning("Second OCR pass failed (%s); keeping first-pass text", failure)
+        progress(-1, "Second OCR pass failed; keeping first-pass text")
+        return summary
+
+    await asyncio.to_thread(shutil.move, refined_pdf, task.output_pdf)
+    # The second pass rewrote the hOCR of the refined pages.
+    means = await asyncio.to_thread(_page_means, words_dir, page_count, task.output_pdf)
+    summary.page_means.update({page: mean for page, mean in means.items() if page in pages})
+    summary.refined = pages
+    return summary
+
+
+def _stash_page_hocr(words_dir: str, pages: list[int], work_dir: str) -> str:
+    stash = tempfile.mkdtemp(prefix="first-pass-", dir=work_dir)
+    for page in pages:
+        path = page_hocr_path(words_dir, page + 1)
+        if os.path.exists(path):
+            shutil.copyfile(path, page_hocr_path(stash, page + 1))
+    return stash
+
+
+def _restore_page_hocr(stash: str, words_dir: str) -> None:
+    for name in os.listdir(stash):
+        os.replace(os.path.join(stash, name), os.path.join(words_dir, name))
+
+
+def _page_means(words_dir: str, page_count: int, pdf_path: str) -> dict[int, float]:
+    # Pages with (almost) no words are only worth a second pass if they are
+    # not blank; blank pages skipped by the first pass have no words either.
+    table = collect_words(words_dir, page_count)
+    return page_confidence(table, blank_pages_among(pdf_path, sparse_pages(table)))
+
+
+def _start_engine_pool(task: OCRTask, env: dict, progress: ProgressCallback) -> Optional[str]:
+    # Returns the pool address for the plugin, or None to run the tesseract
+    # command per page as usual.
+    if task.ocr_engine != "persistent":
+        return None
+    try:
+        server = get_pool_server(task.tesseract_path)
+    except TesseractLibraryError as exc:
+        progress(-1, f"Persistent Tesseract unavailable ({exc}); using the tesseract command")
+        return None
+    env[AUTHKEY_ENV] = server.authkey.hex()
+    return f"{server.address[0]}:{server.address[1]}"
+
+
+def _process_limits(task: OCRTask, features: Optional[JobFeatures], jobs: int) -> ProcessLimits:
+    timeout = task.timeout_seconds
+    if not timeout and features is not None:
+        predicted = get_estimator().predict(features, jobs)
+        timeout = max(_MIN_TIMEOUT_SECONDS, predicted * _TIMEOUT_FACTOR)
+    return ProcessLimits(wall_seconds=timeout, stall_seconds=task.stall_seconds, memory_mb=task.memory_limit_mb)
+
+
+def _estimate_temp_bytes(task: OCRTask, features: Optional[JobFeatures]) -> int:
+    try:
+        input_bytes = os.path.getsize(task.input_pdf)
+    except OSError:
+        input_bytes = 0
+    if features is None:
+        return estimate_job_bytes(input_bytes, _page_count(task))
+    return estimate_job_bytes(input_bytes, features.pages, features.megapixels, features.color)
+
+
+def _job_features(task: OCRTask) -> Optional[JobFeatures]:
+    try:
+        return extract_features(
+            task.input_pdf, task.page_count, task.lang, task.output_type, task.input_source, profile=task.profile
+        )
+    except Exception:
+        logger.debug("Could not extract job features", exc_info=True)
+        return None
+
+
+def _with_eta(progress: ProgressCallback, eta: EtaTracker) -> ProgressCallback:
+    def report(percent: int, line: str) -> None:
+        if 0 <= percent < 100:
+            line = f"{line} (ETA {format_duration(eta.remaining(percent))})"
+        progress(percent, line)
+
+    return report
+
+
+def _build_ocr_command(
+    ocrmypdf_bin: str,
+    task: OCRTask,
+    output_type: str,
+    jobs: int,
+    words_dir: Optional[str] = None,
+    pool_address: Optional[str] = None,
+    pages: Optional[list[int]] = None,
+    oversample: int = 0,
+) -> list[str]:
+    cmd = [
+        ocrmypdf_bin,
+        "-l",
+        task.lang,
+    ]
+    if task.redo_ocr:
+        cmd.append("--redo-ocr")
+    # The fast PDF/A path skips Ghostscript and adds PDF/A parts afterwards.
+    if output_type in ("pdf", "pdfa_fast"):
+        cmd.extend(["--output-type", "pdf"])
+    resolved_color = _resolve_color_strategy(
+        input_pdf=task.input_pdf,
+        output_type=output_type,
+        color_strategy=task.color_strategy,
+        source=task.input_source,
+        profile=task.profile,
+    )
+    if resolved_color:
+        cmd.extend(["--color-conversion-strategy", resolved_color])
+    cmd.extend(get_preset(task.optimize).ocrmypdf_args)
+    cmd.extend(_plugin_args(task, words_dir, pool_address))
+    if task.output_txt:
+        cmd.extend(["--sidecar", task.output_txt])
+    if pages is not None:
+        # Pages left out keep their content but get no OCR.
+        cmd.extend(["--pages", _page_spec(pages)])
+    if oversample:
+        cmd.extend(["--oversample", str(oversample)])
+    cmd.extend(["--jobs", str(jobs)])
+    # A staged local copy spares ocrmypdf another read over the network.
+    input_pdf = task.input_source.local_path if task.input_source else task.input_pdf
+    cmd.extend([input_pdf, task.output_pdf])
+    return cmd
+
+
+def _page_spec(pages: list[int]) -> str:
+    # Zero-based pages to ocrmypdf's one-based list with ranges: "1-3,7".
+    parts = []
+    start = previous = None
+    for page in sorted(pages):
+        if previous is not None and page == previous + 1:
+            previous = page
+            continue
+        if start is not None:
+            parts.append(f"{start + 1}-{previous + 1}" if previous > start else str(start + 1))
+        start = previous = page
+    if start is not None:
+        parts.append(f"{start + 1}-{previous + 1}" if previous > start else str(start + 1))
+    return ",".join(parts)
+
+
+async def _run_with_color_retry(
+    cmd: list[str],
+    env: dict,
+    progress: ProgressCallback,
+    lease: Optional[CoreLease],
+    space: Optional[WorkspaceLease] = None,
+    limits: Optional[ProcessLimits] = None,
+    report: Optional[OCRReport] = None,
+) -> Optional[str]:
+    # Returns an error message, or None on success.
+    usage = await _run_ocr_process(cmd, env, progress, lease, space, limits, report)
+    if usage.return_code != 0 and not usage.killed_reason and usage.matched:
+        # The output mentioned a color conversion problem.
+        retry_cmd = cmd[:]
+        retry_cmd.insert(1, "--output-type")
+        retry_cmd.insert(2, "pdf")
+        logger.info("Retrying OCR with --output-type pdf due to color space issue")
+        usage = await _run_ocr_process(retry_cmd, env, progress, lease, space, limits, report)
+    if usage.killed_reason:
+        return f"OCRmyPDF stopped: {usage.killed_reason}"
+    if usage.return_code != 0:
+        return f"OCRmyPDF failed with code {usage.return_code}"
+    return None
 
 
 # OCRmyPDF output varies by version; parse several patterns conservatively.
@@ -126,61 +607,108 @@ def _parse_progress(line: str) -> Optional[int]:
     return None
 
 
-def _tesseract_has_lang(tesseract_bin: str, lang: str, env: dict) -> bool:
-    try:
-        result = subprocess.run(
-            [tesseract_bin, "--list-langs"],
-            capture_output=True,
-            text=True,
-            env=env,
-            check=False,
-        )
-        output = (result.stdout or "") + (result.stderr or "")
-        langs = {line.strip() for line in output.splitlines() if line.strip()}
-        return lang in langs
-    except Exception:
+def _package_root() -> str:
+    # Directory that contains the `textlayer` package.
+    return str(Path(__file__).resolve().parents[2])
+
+
+def _plugin_args(task: OCRTask, words_dir: Optional[str] = None, pool_address: Optional[str] = None) -> list[str]:
+    # The plugin is only loaded for the features that need it, so plain
+    # conversions run OCRmyPDF exactly as installed.
+    args = []
+    if pool_address:
+        args.extend(["--textlayer-pool", pool_address])
+    if words_dir:
+        args.extend(["--textlayer-words-dir", words_dir])
+    if task.rasterizer != DEFAULT_RASTERIZER:
+        args.extend(["--textlayer-rasterizer", task.rasterizer])
+    if task.preprocess != "none":
+        args.extend([
+            "--textlayer-preprocess",
+            task.preprocess,
+            "--textlayer-target-dpi",
+            str(task.preprocess_target_dpi),
+            # The sandwich renderer scales the text layer to the page, so a
+            # downsampled OCR image still lines up with the original scan.
+            "--pdf-renderer",
+            "sandwich",
+        ])
+    return ["--plugin", _PLUGIN_MODULE, *args] if args else []
+
+
+def _page_count(task: OCRTask) -> int:
+    if task.page_count:
+        return task.page_count
+    with pikepdf.open(task.output_pdf) as pdf:
+        return len(pdf.pages)
+
+
+def _tesseract_has_lang(installed: set[str], lang: str) -> bool:
+    # An empty set means the language list could not be read; let ocrmypdf
+    # report any problem instead.
+    if not installed:
         return True
-
-
-def _run_ocr_process(cmd: list[str], env: dict, progress_signal: Signal) -> tuple[int, list[str]]:
-    lines: list[str] = []
+    return all(part in installed for part in lang.split("+"))
+
+
+async def _run_ocr_process(
+    cmd: list[str],
+    env: dict,
+    progress: ProgressCallback,
+    lease: Optional[CoreLease] = None,
+    space: Optional[WorkspaceLease] = None,
+    limits: Optional[ProcessLimits] = None,
+    report: Optional[OCRReport] = None,
+) -> ProcessUsage:
     creationflags = 0
     if os.name == "nt":
         creationflags = subprocess.CREATE_NO_WINDOW
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        env=env,
-        creationflags=creationflags,
-    )
-    if process.stdout is None:
-        raise RuntimeError("Failed to start OCR process.")
+        if lease is not None and lease.nice > 0:
+            creationflags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
 
-    for line in process.stdout:
-        line = line.strip()
-        if not line:
-            continue
-        lines.append(line)
+    def on_start(pid: int) -> None:
+        if lease is not None:
+            get_governor().attach_process(lease, pid)
+
+    def on_line(line: str) -> None:
         logger.info("OCR: %s", line)
         percent = _parse_progress(line)
         if percent is not None:
             # Emit progress updates when possible.
-            progress_signal.emit(percent, line)
+            progress(percent, line)
         else:
-            progress_signal.emit(-1, line)
-
-    return_code = process.wait()
-    return return_code, lines
-
-
-def _needs_color_conversion_retry(lines: list[str]) -> bool:
-    joined = " ".join(lines)
-    return "ColorConversionNeededError" in joined or "--color-conversion-strategy" in joined
+            progress(-1, line)
 
+    async def on_tick() -> Optional[str]:
+        # Checked on the supervisor's clock, so a job that writes temp
+        # files without printing anything is still held to its budget.
+        if space is None:
+            return None
+        try:
+            await get_workspace().check_async(space)
+        except WorkspaceBudgetError as exc:
+            return str(exc)
+        return None
 
-def _resolve_color_strategy(input_pdf: str, output_type: str, color_strategy: str) -> Optional[str]:
+    supervisor = ProcessSupervisor(limits, markers=_COLOR_RETRY_MARKERS)
+    usage = await supervisor.run_async(cmd, env, on_line, on_start, creationflags, on_tick)
+    if report is not None:
+        report.cpu_seconds += usage.cpu_seconds or 0.0
+        report.peak_rss_bytes = max(report.peak_rss_bytes, usage.peak_rss_bytes)
+    return usage
+
+
+def _resolve_color_strategy(
+    input_pdf: str,
+    output_type: str,
+    color_strategy: str,
+    source: Optional[InputSource] = None,
+    profile: Optional[DocumentProfile] = None,
+) -> Optional[str]:
+    # Color conversion only applies to Ghostscript, which the fast PDF/A
+    # path does not use.
+    if output_type == "pdfa_fast":
+        return None
     # ocrmypdf expects specific, case-sensitive strategy names.
     if color_strategy == "rgb":
         return "RGB"
@@ -191,36 +719,11 @@ def _resolve_color_strategy(input_pdf: str, output_type: str, color_strategy: st
     if output_type == "pdfa":
         return "Gray"
     # - If input is color, use RGB; if B/W, use Gray
-    is_gray = _is_pdf_grayscale(input_pdf)
-    if is_gray is None:
-        return None
-    return "Gray" if is_gray else "RGB"
-
-
-def _is_pdf_grayscale(path: str) -> Optional[bool]:
-    try:
-        import fitz
-    except Exception:
-        return None
-    try:
-        doc = fitz.open(path)
-        page_limit = min(3, doc.page_count)
-        for i in range(page_limit):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.2, 0.2), colorspace=fitz.csRGB, alpha=False)
-            # If pixel buffer has no color channels, treat as grayscale.
-            if pix.n == 1:
-                continue
-            samples = pix.samples
-            step = max(3, (pix.width * pix.height * pix.n) // 5000)
-            for idx in range(0, len(samples) - 2, step):
-                r = samples[idx]
-                g = samples[idx + 1]
-                b = samples[idx + 2]
-                if r != g or g != b:
-                    doc.close()
-                    return False
-        doc.close()
-        return True
-    except Exception:
+    if profile is not None:
+        color = profile.color
+    else:
+        is_gray = is_pdf_grayscale(input_pdf, source)
+        color = "unknown" if is_gray is None else ("gray" if is_gray else "color")
+    if color == "unknown":
         return None
+    return "Gray" if color == "gray" else "RGB"
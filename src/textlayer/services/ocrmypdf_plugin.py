@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+
+from ocrmypdf import hookimpl
+from ocrmypdf._exec import tesseract
+from ocrmypdf._exec.tesseract import ThresholdingMethod
+from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine
+
+from textlayer.services.preprocess import DEFAULT_TARGET_DPI, options_for_mode, preprocess_image
+from textlayer.services.rasterize import DEFAULT_RASTERIZER, RASTERIZERS, extract_page_image, rasterize_page
+from textlayer.services.tesseract_pool import AUTHKEY_ENV, RecognitionRequest, connect_pool
+from textlayer.services.words import page_hocr_path
+
+# Loaded by ocrmypdf via `--plugin textlayer.services.ocrmypdf_plugin`; runs
+# inside the ocrmypdf process (and its page workers), not in the GUI.
+logger = logging.getLogger(__name__)
+
+
+@hookimpl
+def add_options(parser):
+    group = parser.add_argument_group("TextLayer", "Options added by the TextLayer plugin")
+    group.add_argument(
+        "--textlayer-preprocess",
+        choices=["none", "auto", "binarize", "downsample"],
+        default="none",
+        help="Preprocess the image sent to OCR (DPI normalization, border cleanup, binarization).",
+    )
+    group.add_argument(
+        "--textlayer-target-dpi",
+        type=int,
+        default=DEFAULT_TARGET_DPI,
+        help="Downsample oversized scans to this resolution before OCR.",
+    )
+    group.add_argument(
+        "--textlayer-pool",
+        default="",
+        help="host:port of a TextLayer persistent Tesseract pool to recognize pages with.",
+    )
+    group.add_argument(
+        "--textlayer-words-dir",
+        default="",
+        help="Save each page's hOCR (word boxes and confidences) into this directory.",
+    )
+    group.add_argument(
+        "--textlayer-rasterizer",
+        choices=list(RASTERIZERS),
+        default=DEFAULT_RASTERIZER,
+        help="Render pages for OCR with PyMuPDF, or use the embedded scan image of single-image pages.",
+    )
+
+
+@hookimpl(tryfirst=True)
+def rasterize_pdf_page(
+    input_file,
+    output_file,
+    raster_device,
+    raster_dpi,
+    pageno,
+    page_dpi,
+    rotation,
+    filter_vector,
+    stop_on_soft_error,
+    options,
+    use_cropbox,
+):
+    # Returning None hands the page to OCRmyPDF's own rasterizers.
+    rasterizer = getattr(options, "textlayer_rasterizer", DEFAULT_RASTERIZER) if options is not None else None
+    if rasterizer not in ("pymupdf", "embedded"):
+        return None
+    args = (
+        str(input_file),
+        str(output_file),
+        str(raster_device),
+        (float(raster_dpi.x), float(raster_dpi.y)),
+        pageno,
+        (float(page_dpi.x), float(page_dpi.y)) if page_dpi else None,
+        rotation,
+        use_cropbox,
+        # Without lossless reconstruction OCRmyPDF rebuilds the visible
+        # page from this image; otherwise only OCR reads it.
+        bool(getattr(options, "lossless_reconstruction", False)),
+    )
+    if rasterizer == "embedded" and extract_page_image(*args):
+        # Such a page has no vector graphics, so --remove-vectors is moot.
+        return output_file
+    if filter_vector:
+        # PyMuPDF cannot leave out vector graphics (--remove-vectors).
+        return None
+    rasterize_page(*args)
+    return output_file
+
+
+@hookimpl
+def filter_ocr_image(page, image):
+    # Only affects the image Tesseract sees; the output PDF keeps the original.
+    options = page.options
+    preprocess = options_for_mode(
+        getattr(options, "textlayer_preprocess", "none"),
+        getattr(options, "textlayer_target_dpi", DEFAULT_TARGET_DPI),
+    )
+    if preprocess is None:
+        return image
+    return preprocess_image(image, preprocess)
+
+
+@hookimpl
+def get_ocr_engine(options):
+    # Only take over from the built-in engine when a TextLayer feature needs it.
+    if options is None:
+        return None
+    if not getattr(options, "textlayer_words_dir", "") and not getattr(options, "textlayer_pool", ""):
+        return None
+    return TextLayerEngine()
+
+
+class TextLayerEngine(TesseractOcrEngine):
+    # Tesseract with two additions: pages can be recognized by the persistent
+    # worker pool instead of a new tesseract process, and each page's hOCR can
+    # be kept for word-level output, all from the same OCR pass.
+
+    @staticmethod
+    def generate_hocr(input_file, output_hocr, output_text, options):
+        outputs = {"hocr": str(output_hocr), "txt": str(output_text)}
+        if not _recognize_in_pool(input_file, outputs, options):
+            TesseractOcrEngine.generate_hocr(input_file, output_hocr, output_text, options)
+        if getattr(options, "textlayer_words_dir", ""):
+            _save_page_hocr(Path(output_hocr), input_file, options)
+
+    @staticmethod
+    def generate_pdf(input_file, output_pdf, output_text, options):
+        words = bool(getattr(options, "textlayer_words_dir", ""))
+        hocr_path = Path(output_pdf).with_suffix(".hocr")
+        outputs = {"pdf": str(output_pdf), "txt": str(output_text)}
+        if words:
+            outputs["hocr"] = str(hocr_path)
+        if not _recognize_in_pool(input_file, outputs, options):
+            # The sandwich renderer asks Tesseract for a PDF; the extra "hocr"
+            # config makes the same run write <prefix>.hocr next to it.
+            tesseract.generate_pdf(
+                input_file=input_file,
+                output_pdf=output_pdf,
+                output_text=output_text,
+                languages=options.languages,
+                engine_mode=options.tesseract.oem,
+                tessconfig=[*options.tesseract.config, "hocr"] if words else options.tesseract.config,
+                timeout=options.tesseract.timeout,
+                pagesegmode=options.tesseract.pagesegmode,
+                thresholding=options.tesseract.thresholding,
+                user_words=options.tesseract.user_words,
+                user_patterns=options.tesseract.user_patterns,
+                omp_thread_limit=options.tesseract.omp_thread_limit,
+            )
+        if words:
+            _save_page_hocr(hocr_path, input_file, options)
+
+
+def _recognize_in_pool(input_file, outputs: dict[str, str], options) -> bool:
+    # Returns False when the page should go to the tesseract command instead.
+    address = getattr(options, "textlayer_pool", "")
+    if not address:
+        return False
+    tess = options.tesseract
+    if tess.user_words or tess.user_patterns or not tess.timeout:
+        # Word lists are only honored at engine initialization by the CLI, and
+        # a zero timeout is ocrmypdf's way of skipping OCR for the page.
+        return False
+    variables = {}
+    if tess.thresholding != ThresholdingMethod.AUTO:
+        variables["thresholding_method"] = str(int(tess.thresholding))
+    request = RecognitionRequest(
+        image_path=str(input_file),
+        lang="+".join(options.languages),
+        oem=tess.oem if tess.oem is not None else 3,
+        psm=tess.pagesegmode,
+        config_files=tuple(tess.config or ()),
+        variables=variables,
+        outputs=outputs,
+    )
+    try:
+        host, _, port = address.rpartition(":")
+        pool = connect_pool((host, int(port)), bytes.fromhex(os.environ.get(AUTHKEY_ENV, "")))
+        pool.recognize(request, tess.timeout)
+        return True
+    except Exception as exc:
+        logger.warning("Persistent Tesseract failed for %s (%s); using the tesseract command", input_file, exc)
+        return False
+
+
+def _save_page_hocr(hocr_path: Path, input_file, options) -> None:
+    # ocrmypdf names page work files with a 1-based, zero-padded page number.
+    match = re.match(r"(\d+)_", Path(input_file).name)
+    if not match or not hocr_path.exists():
+        logger.warning("No hOCR for %s; its words are not recorded", input_file)
+        return
+    shutil.copyfile(hocr_path, page_hocr_path(options.textlayer_words_dir, int(match.group(1))))
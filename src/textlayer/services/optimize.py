@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import pikepdf
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OptimizePreset:
+    name: str
+    ocrmypdf_args: tuple[str, ...]
+    # Re-save with object streams after ocrmypdf finishes.
+    repack: bool
+
+
+# Presets trade output size against time and (for balanced/max) image fidelity.
+PRESETS = {
+    "none": OptimizePreset("none", ("--optimize", "0"), repack=False),
+    "fast": OptimizePreset("fast", ("--optimize", "1"), repack=False),
+    "balanced": OptimizePreset(
+        "balanced",
+        ("--optimize", "2", "--jpeg-quality", "85", "--png-quality", "70"),
+        repack=True,
+    ),
+    "max": OptimizePreset(
+        "max",
+        ("--optimize", "3", "--jpeg-quality", "75", "--png-quality", "60", "--jbig2-lossy"),
+        repack=True,
+    ),
+}
+
+DEFAULT_PRESET = "fast"
+
+
+def get_preset(name: str) -> OptimizePreset:
+    return PRESETS.get(name, PRESETS[DEFAULT_PRESET])
+
+
+def repack_pdf(path: str) -> float:
+    # Rewrite with compressed object streams; keep the result only if smaller.
+    # Returns the seconds spent so callers can report the trade-off.
+    started = time.monotonic()
+    tmp_path = path + ".repack"
+    try:
+        with pikepdf.open(path) as pdf:
+            pdf.save(
+                tmp_path,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                compress_streams=True,
+                recompress_flate=True,
+            )
+        if os.path.getsize(tmp_path) < os.path.getsize(path):
+            os.replace(tmp_path, path)
+    except Exception:
+        logger.exception("Failed to repack %s", path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return time.monotonic() - started
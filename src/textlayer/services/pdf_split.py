@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import logging
+import re
+
+import pikepdf
+
+logger = logging.getLogger(__name__)
+
+
+# ocrmypdf separates pages in the sidecar text with a form feed.
+SIDECAR_PAGE_BREAK = "\f"
+# ocrmypdf writes one note for a run of consecutive pages left out with
+# --pages: "[OCR skipped on page(s) 3-4]".
+_SKIPPED_PAGES = re.compile(r"\[OCR skipped on page\(s\) (\d+)(?:-(\d+))?\]")
+
+
+def page_ranges(page_count: int, chunk_pages: int) -> list[tuple[int, int]]:
+    # Half-open, zero-based [start, end) ranges covering every page.
+    chunk_pages = max(1, chunk_pages)
+    return [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+def output_starts(ranges: list[tuple[int, int]], removed: dict[str, list[int]], dropped: bool) -> list[int]:
+    # First output page of each range once the pages in removed (keyed by
+    # range index) were dropped from the merged output.
+    starts = []
+    shift = 0
+    for index, (start, _end) in enumerate(ranges):
+        starts.append(start - shift)
+        if dropped:
+            shift += len(removed.get(str(index), []))
+    return starts
+
+
+def extract_pages(pdf: pikepdf.Pdf, start: int, end: int) -> bytes:
+    part = pikepdf.new()
+    part.pages.extend(pdf.pages[start:end])
+    buffer = io.BytesIO()
+    part.save(buffer)
+    return buffer.getvalue()
+
+
+def split_pdf(input_pdf: str, ranges: list[tuple[int, int]]) -> list[bytes]:
+    with pikepdf.open(input_pdf) as pdf:
+        return [extract_pages(pdf, start, end) for start, end in ranges]
+
+
+def merge_pdfs(parts: list[str], output_pdf: str) -> None:
+    if not parts:
+        raise ValueError("No parts to merge.")
+    # The first part is the base so its metadata and OutputIntents (PDF/A)
+    # carry over. Sources must stay open until save: pikepdf copies lazily.
+    with contextlib.ExitStack() as stack:
+        base = stack.enter_context(pikepdf.open(parts[0]))
+        for path in parts[1:]:
+            other = stack.enter_context(pikepdf.open(path))
+            base.pages.extend(other.pages)
+        base.save(output_pdf)
+
+
+def read_sidecar(path: str) -> list[str]:
+    # The text of each page. ocrmypdf puts a break between pages, not after
+    # the last one, so a trailing break is an empty last page. A note for
+    # a run of skipped pages becomes one note per page.
+    with open(path, encoding="utf-8") as handle:
+        segments = handle.read().split(SIDECAR_PAGE_BREAK)
+    pages = []
+    for segment in segments:
+        match = _SKIPPED_PAGES.fullmatch(segment.strip())
+        if match is None:
+            pages.append(segment)
+            continue
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        pages.extend(f"[OCR skipped on page(s) {page}]" for page in range(first, last + 1))
+    return pages
+
+
+def write_sidecar(path: str, pages: list[str]) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(SIDECAR_PAGE_BREAK.join(pages))
+
+
+def merge_sidecars(parts: list[str], output_txt: str) -> None:
+    pages = []
+    for path in parts:
+        pages.extend(read_sidecar(path))
+    write_sidecar(output_txt, pages)
+
+
+def replace_sidecar_pages(base_txt: str, refined_txt: str, pages: list[int]) -> bool:
+    # Copy the text of the given zero-based pages from a sidecar written by
+    # a partial (--pages) run into the full one. Returns False, leaving the
+    # base untouched, when the two do not line up page for page.
+    base = read_sidecar(base_txt)
+    refined = read_sidecar(refined_txt)
+    if len(base) != len(refined) or any(page >= len(base) for page in pages):
+        logger.warning("Sidecar page counts differ (%d vs %d); keeping first-pass text", len(base), len(refined))
+        return False
+    for page in pages:
+        base[page] = refined[page]
+    write_sidecar(base_txt, base)
+    return True
+
+
+def save_without_pages(pdf: pikepdf.Pdf, pages: list[int], output_pdf: str) -> None:
+    # Deletes in place rather than copying pages to a new PDF, so the
+    # document metadata and outline survive.
+    for index in sorted(pages, reverse=True):
+        del pdf.pages[index]
+    pdf.save(output_pdf)
+
+
+def clear_sidecar_pages(txt_path: str, pages: list[int]) -> None:
+    # ocrmypdf writes an "[OCR skipped on page(s) ...]" note for the pages
+    # left out with --pages; blank pages should have no text instead.
+    texts = read_sidecar(txt_path)
+    for page in pages:
+        if page < len(texts):
+            texts[page] = ""
+    write_sidecar(txt_path, texts)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+from importlib import resources
+
+import pikepdf
+
+logger = logging.getLogger(__name__)
+
+
+# PDF/A-2B: allows JPEG2000, transparency and object streams, so original
+# image streams can be kept as they are.
+PDFA_PART = "2"
+PDFA_CONFORMANCE = "B"
+PDFA_VERSION = "1.7"
+_ICC_NAME = "sRGB IEC61966-2.1"
+_FORBIDDEN_FILTERS = {"/LZWDecode"}
+
+
+def finalize_pdfa(path: str) -> list[str]:
+    # Turn an ocrmypdf `--output-type pdf` result into PDF/A-2B in place,
+    # without re-rendering pages. Returns validation problems (empty = OK).
+    tmp_path = path + ".pdfa"
+    try:
+        with pikepdf.open(path) as pdf:
+            _add_output_intent(pdf)
+            _strip_forbidden(pdf)
+            with pdf.open_metadata() as meta:
+                meta["pdfaid:part"] = PDFA_PART
+                meta["pdfaid:conformance"] = PDFA_CONFORMANCE
+            # Leave all content streams byte-for-byte as ocrmypdf wrote them.
+            pdf.save(
+                tmp_path,
+                force_version=PDFA_VERSION,
+                stream_decode_level=pikepdf.StreamDecodeLevel.none,
+                fix_metadata_version=True,
+            )
+        problems = validate_pdfa(tmp_path)
+        if not problems:
+            os.replace(tmp_path, path)
+        return problems
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def validate_pdfa(path: str) -> list[str]:
+    problems: list[str] = []
+    try:
+        with pikepdf.open(path) as pdf:
+            if pdf.is_encrypted:
+                problems.append("File is encrypted.")
+            if pdf.pdf_version < PDFA_VERSION:
+                problems.append(f"PDF version {pdf.pdf_version} is older than {PDFA_VERSION}.")
+            meta = pdf.open_metadata()
+            if meta.get("pdfaid:part") != PDFA_PART:
+                problems.append("XMP metadata does not declare PDF/A.")
+            if "/OutputIntents" not in pdf.Root:
+                problems.append("Missing OutputIntent.")
+            if "/Names" in pdf.Root and "/JavaScript" in pdf.Root.Names:
+                problems.append("Document contains JavaScript.")
+            for index, page in enumerate(pdf.pages, start=1):
+                problems.extend(_check_page(page, index))
+    except Exception as exc:
+        problems.append(f"Could not read output: {exc}")
+        return problems
+
+    # Use veraPDF when it is installed for a full conformance check.
+    verapdf = shutil.which("verapdf")
+    if verapdf and not problems:
+        problems.extend(_run_verapdf(verapdf, path))
+    return problems
+
+
+def _add_output_intent(pdf: pikepdf.Pdf) -> None:
+    icc_data = resources.files("ocrmypdf.data").joinpath("sRGB.icc").read_bytes()
+    icc = pikepdf.Stream(pdf, icc_data)
+    icc.N = 3
+    intent = pikepdf.Dictionary(
+        Type=pikepdf.Name.OutputIntent,
+        S=pikepdf.Name.GTS_PDFA1,
+        OutputConditionIdentifier=pikepdf.String(_ICC_NAME),
+        Info=pikepdf.String(_ICC_NAME),
+        DestOutputProfile=icc,
+    )
+    pdf.Root.OutputIntents = pikepdf.Array([pdf.make_indirect(intent)])
+
+
+def _strip_forbidden(pdf: pikepdf.Pdf) -> None:
+    if "/Names" in pdf.Root:
+        for key in ("/JavaScript", "/EmbeddedFiles"):
+            if key in pdf.Root.Names:
+                del pdf.Root.Names[key]
+    if "/OpenAction" in pdf.Root:
+        action = pdf.Root.OpenAction
+        if isinstance(action, pikepdf.Dictionary) and action.get("/S") == pikepdf.Name.JavaScript:
+            del pdf.Root["/OpenAction"]
+
+
+def _check_page(page: pikepdf.Page, index: int) -> list[str]:
+    problems = []
+    resources_dict = page.obj.get("/Resources", pikepdf.Dictionary())
+    for name, font in resources_dict.get("/Font", pikepdf.Dictionary()).items():
+        if not _font_is_embedded(font):
+            problems.append(f"Page {index}: font {name} is not embedded.")
+    for name, xobject in resources_dict.get("/XObject", pikepdf.Dictionary()).items():
+        if xobject.get("/Subtype") != pikepdf.Name.Image:
+            continue
+        if xobject.get("/ColorSpace") == pikepdf.Name.DeviceCMYK:
+            problems.append(f"Page {index}: image {name} is DeviceCMYK; needs an RGB conversion.")
+        filters = xobject.get("/Filter")
+        if filters is not None:
+            names = filters if isinstance(filters, pikepdf.Array) else [filters]
+            if any(str(item) in _FORBIDDEN_FILTERS for item in names):
+                problems.append(f"Page {index}: image {name} uses LZW compression.")
+    return problems
+
+
+def _font_is_embedded(font: pikepdf.Object) -> bool:
+    if font.get("/Subtype") == pikepdf.Name.Type3:
+        return True
+    if font.get("/Subtype") == pikepdf.Name.Type0:
+        descendants = font.get("/DescendantFonts", pikepdf.Array())
+        return all(_font_is_embedded(child) for child in descendants)
+    descriptor = font.get("/FontDescriptor")
+    if descriptor is None:
+        return False
+    return any(key in descriptor for key in ("/FontFile", "/FontFile2", "/FontFile3"))
+
+
+def _run_verapdf(verapdf: str, path: str) -> list[str]:
+    try:
+        result = subprocess.run(
+            [verapdf, "--flavour", PDFA_PART + PDFA_CONFORMANCE.lower(), "--format", "text", path],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=300,
+        )
+    except Exception as exc:
+        logger.warning("veraPDF could not run: %s", exc)
+        return []
+    if result.stdout.startswith("PASS"):
+        return []
+    return [line for line in result.stdout.splitlines() if line.strip()] or ["veraPDF validation failed."]
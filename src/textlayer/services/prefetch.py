@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import os
+import shutil
+from typing import Optional
+
+from textlayer.services.input_source import InputSource, is_remote_path
+from textlayer.services.job_queue import JobQueue, QueuedJob
+from textlayer.services.ocr_service import OCRTask
+from textlayer.services.words import word_output_paths
+from textlayer.services.workspace import get_workspace
+
+logger = logging.getLogger(__name__)
+
+
+# Inputs staged ahead of the running jobs.
+DEFAULT_PREFETCH_DEPTH = 2
+# Local space all staged inputs waiting for their job may take together.
+DEFAULT_PREFETCH_BUDGET_MB = 2048
+_MB = 1024 * 1024
+
+
+class Prefetcher:
+    # Copies the inputs of the next queued jobs from network shares to
+    # local staging while the current jobs OCR, so a job starts on a local
+    # copy instead of paying the network read first. Runs on the event loop
+    # of the batch; the copies run in worker threads.
+    def __init__(
+        self,
+        queue: JobQueue,
+        depth: int = DEFAULT_PREFETCH_DEPTH,
+        budget_mb: int = DEFAULT_PREFETCH_BUDGET_MB,
+    ) -> None:
+        self._queue = queue
+        self._depth = max(0, depth)
+        self._budget = max(0, budget_mb) * _MB
+        # By QueuedJob.sequence: the staging task and the bytes it holds.
+        self._staging: dict[int, asyncio.Task] = {}
+        self._sizes: dict[int, int] = {}
+
+    def fill(self) -> None:
+        # Starts staging for the next jobs in queue order. Stops at the
+        # first job that does not fit the budget, so space goes to the
+        # jobs that run first; one input is always allowed.
+        if not self._depth:
+            return
+        for job in self._queue.peek(self._depth):
+            if job.sequence in self._staging or not is_remote_path(job.task.input_pdf):
+                continue
+            size = _input_size(job.task)
+            if self._staging and sum(self._sizes.values()) + size > self._budget:
+                return
+            self._sizes[job.sequence] = size
+            self._staging[job.sequence] = asyncio.create_task(asyncio.to_thread(_stage, job.task.input_pdf))
+
+    async def take(self, job: QueuedJob) -> Optional[InputSource]:
+        # The staged copy of the job's input, or None to read it in place.
+        # The copy is dropped if the original changed since it was staged.
+        staging = self._staging.pop(job.sequence, None)
+        self._sizes.pop(job.sequence, None)
+        self.fill()
+        if staging is None:
+            return None
+        source = await staging
+        if source is not None and source.is_stale():
+            logger.info("Prefetched copy of %s is out of date; reading it in place", job.task.input_pdf)
+            source.close()
+            return None
+        return source
+
+    async def close(self) -> None:
+        staging = list(self._staging.values())
+        self._staging.clear()
+        self._sizes.clear()
+        for source in await asyncio.gather(*staging, return_exceptions=True):
+            if isinstance(source, InputSource):
+                source.close()
+
+
+def _stage(path: str) -> Optional[InputSource]:
+    source = InputSource(path)
+    try:
+        source.open()
+    except OSError as exc:
+        logger.warning("Could not prefetch %s: %s", path, exc)
+        source.close()
+        return None
+    logger.info("Prefetched %s (%d MB)", path, source.size // _MB)
+    return source
+
+
+def _input_size(task: OCRTask) -> int:
+    if task.profile is not None:
+        return task.profile.size
+    try:
+        return os.path.getsize(task.input_pdf)
+    except OSError:
+        return 0
+
+
+def local_outputs(task: OCRTask, directory: str) -> OCRTask:
+    # The task with its outputs in a local directory, for write_back().
+    def local(path: Optional[str]) -> Optional[str]:
+        return os.path.join(directory, os.path.basename(path)) if path else path
+
+    return dataclasses.replace(
+        task,
+        output_pdf=local(task.output_pdf),
+        output_txt=local(task.output_txt),
+        output_words=local(task.output_words),
+    )
+
+
+def write_back(local_task: OCRTask, task: OCRTask) -> None:
+    # Copies the outputs of local_task to where task wants them. Each file
+    # appears under its final name only once it is complete.
+    pairs = [(local_task.output_pdf, task.output_pdf)]
+    if task.output_txt:
+        pairs.append((local_task.output_txt, task.output_txt))
+    if task.output_words:
+        local_words = word_output_paths(local_task.output_words, task.word_formats)
+        final_words = word_output_paths(task.output_words, task.word_formats)
+        pairs.extend((local_words[fmt], final_words[fmt]) for fmt in task.word_formats)
+    for source, target in pairs:
+        partial = target + ".part"
+        shutil.copyfile(source, partial)
+        os.replace(partial, target)
+
+
+def output_staging_dir() -> str:
+    return get_workspace().temp_dir("textlayer-out-")
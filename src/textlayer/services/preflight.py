@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import concurrent.futures
+import csv
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from textlayer.services.detection import detect_file
+from textlayer.services.estimator import extract_features, get_estimator
+from textlayer.services.input_source import InputSource
+from textlayer.utils import is_pdf_path
+
+logger = logging.getLogger(__name__)
+
+
+PREFLIGHT_FIELDS = (
+    "path",
+    "size",
+    "page_count",
+    "decision",
+    "encrypted",
+    "signed",
+    "color",
+    "est_seconds",
+    "error",
+)
+# Files per pool submission; keeps IPC overhead small on huge trees.
+_BATCH_SIZE = 32
+_LOG_EVERY = 1000
+_OCR_DECISIONS = ("ocr", "ask_reocr")
+# Paths are bytes on POSIX; names that are not valid UTF-8 are written
+# back as the same bytes instead of failing the scan.
+_PATH_ERRORS = "surrogateescape"
+
+
+@dataclass(slots=True, frozen=True)
+class PreflightRecord:
+    path: str
+    size: int
+    page_count: int
+    decision: str
+    encrypted: bool
+    signed: bool
+    color: str
+    est_seconds: float
+    error: Optional[str] = None
+
+    def as_row(self) -> list:
+        return [getattr(self, name) for name in PREFLIGHT_FIELDS]
+
+
+@dataclass
+class PreflightSummary:
+    files: int = 0
+    resumed: int = 0
+    pages: int = 0
+    est_seconds: float = 0.0
+    decisions: dict[str, int] = field(default_factory=dict)
+
+
+def inspect_file(path: str, lang: str = "eng", output_type: str = "pdfa") -> PreflightRecord:
+    try:
+        with InputSource(path, stage_remote=False) as source:
+            result = detect_file(path, source)
+            color = "unknown"
+            est_seconds = 0.0
+            if result.decision in _OCR_DECISIONS and result.profile is not None:
+                color = result.profile.color
+                # Single-core seconds from the locally calibrated model.
+                features = extract_features(path, result.page_count, lang, output_type, profile=result.profile)
+                est_seconds = round(get_estimator().predict(features, jobs=1), 1)
+    except Exception as exc:
+        return _error_record(path, str(exc))
+    return PreflightRecord(
+        path=path,
+        size=result.file_info.size if result.file_info else 0,
+        page_count=result.page_count,
+        decision=result.decision,
+        encrypted=result.is_encrypted,
+        signed=result.is_signed,
+        color=color,
+        est_seconds=est_seconds,
+        error=result.error,
+    )
+
+
+def _error_record(path: str, error: str) -> PreflightRecord:
+    return PreflightRecord(path, 0, 0, "reject_error", False, False, "unknown", 0.0, error)
+
+
+def walk_files(root: str, all_files: bool = False) -> Iterator[str]:
+    # Iterative scandir walk: constant stack depth and no per-file stat for
+    # entries we skip. Symlinked directories are not followed to avoid loops.
+    stack = [os.path.abspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError as exc:
+            logger.warning("Cannot list %s: %s", directory, exc)
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file() and (all_files or is_pdf_path(entry.name)):
+                    yield entry.path
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+def run_preflight(
+    root: str,
+    output: str,
+    fmt: str = "jsonl",
+    workers: int = 0,
+    all_files: bool = False,
+    lang: str = "eng",
+    output_type: str = "pdfa",
+) -> PreflightSummary:
+    # Results are appended as they arrive, so an interrupted scan resumes by
+    # skipping every path already present in the report.
+    summary = PreflightSummary()
+    done = _load_done_keys(output, fmt)
+    summary.resumed = len(done)
+    if done:
+        logger.info("Resuming preflight: %d files already in %s", len(done), output)
+    workers = workers or os.cpu_count() or 1
+
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, "a", encoding="utf-8", errors=_PATH_ERRORS, newline="") as handle:
+        writer = _make_writer(handle, fmt)
+        if new_file and fmt == "csv":
+            writer(PREFLIGHT_FIELDS)
+        pool = _InspectPool(workers, lang, output_type)
+        try:
+            for batch in _batches(path for path in walk_files(root, all_files) if _path_key(path) not in done):
+                # Bound the number of in-flight batches so the walk never runs
+                # far ahead of detection.
+                if len(pool.pending) >= workers * 2:
+                    _write_results(pool.wait(), writer, handle, summary)
+                pool.submit(batch)
+            while pool.pending:
+                _write_results(pool.wait(), writer, handle, summary)
+        finally:
+            pool.shutdown()
+    return summary
+
+
+class _InspectPool:
+    # Process pool for inspection batches. A worker that dies, e.g. in a
+    # crash inside a PDF library, breaks the whole pool and every batch in
+    # flight with it: the pool is recreated and the files of those batches
+    # are inspected again one at a time in a separate one-worker pool, so
+    # only a file that crashes a worker on its own is recorded as an error.
+    def __init__(self, workers: int, lang: str, output_type: str) -> None:
+        self._workers = workers
+        self._lang = lang
+        self._output_type = output_type
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self._isolated: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._suspects: list[str] = []
+        # Future -> its paths, and whether it runs in the one-worker pool.
+        self.pending: dict[concurrent.futures.Future, tuple[list[str], bool]] = {}
+
+    def submit(self, paths: list[str]) -> None:
+        future = self._executor.submit(_inspect_batch, paths, self._lang, self._output_type)
+        self.pending[future] = (paths, False)
+
+    def wait(self) -> list[PreflightRecord]:
+        # Records of the batches that finished first.
+        finished, _ = concurrent.futures.wait(self.pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        records: list[PreflightRecord] = []
+        broken = False
+        while finished:
+            for future in finished:
+                paths, isolated = self.pending.pop(future)
+                try:
+                    records.extend(future.result())
+                except BrokenProcessPool:
+                    if isolated:
+                        logger.warning("Preflight worker crashed on %s", paths[0])
+                        records.append(_error_record(paths[0], "worker crashed"))
+                        self._isolated.shutdown(wait=True)
+                        self._isolated = None
+                    else:
+                        broken = True
+                        self._suspects.extend(paths)
+            # Every other batch of a broken pool fails right away.
+            others = [future for future, (_, isolated) in self.pending.items() if not isolated]
+            finished = set(concurrent.futures.wait(others)[0]) if broken else set()
+        if broken:
+            self._executor.shutdown(wait=True)
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._workers)
+        if self._suspects and not any(isolated for _, isolated in self.pending.values()):
+            if self._isolated is None:
+                self._isolated = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+            path = self._suspects.pop(0)
+            future = self._isolated.submit(_inspect_batch, [path], self._lang, self._output_type)
+            self.pending[future] = ([path], True)
+        return records
+
+    def shutdown(self) -> None:
+        for executor in (self._executor, self._isolated):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _inspect_batch(paths: list[str], lang: str, output_type: str) -> list[PreflightRecord]:
+    return [inspect_file(path, lang, output_type) for path in paths]
+
+
+def _batches(paths: Iterator[str]) -> Iterator[list[str]]:
+    batch: list[str] = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= _BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_results(records: list[PreflightRecord], writer, handle, summary: PreflightSummary) -> None:
+    for record in records:
+        writer(record.as_row())
+        summary.files += 1
+        summary.pages += record.page_count
+        summary.est_seconds += record.est_seconds
+        summary.decisions[record.decision] = summary.decisions.get(record.decision, 0) + 1
+        if summary.files % _LOG_EVERY == 0:
+            logger.info("Preflight: %d files inspected", summary.files)
+    handle.flush()
+
+
+def _make_writer(handle, fmt: str):
+    if fmt == "csv":
+        return csv.writer(handle).writerow
+
+    def write_jsonl(row) -> None:
+        handle.write(json.dumps(dict(zip(PREFLIGHT_FIELDS, row)), ensure_ascii=False) + "\n")
+
+    return write_jsonl
+
+
+def _path_key(path: str) -> bytes:
+    # 8-byte digests keep the resume set small for millions of paths.
+    return hashlib.blake2b(path.encode("utf-8", _PATH_ERRORS), digest_size=8).digest()
+
+
+def _load_done_keys(output: str, fmt: str) -> set[bytes]:
+    done: set[bytes] = set()
+    if not os.path.exists(output):
+        return done
+    _drop_partial_line(output)
+    with open(output, encoding="utf-8", errors=_PATH_ERRORS, newline="") as handle:
+        if fmt == "csv":
+            for row in csv.reader(handle):
+                if row and row[0] != PREFLIGHT_FIELDS[0]:
+                    done.add(_path_key(row[0]))
+        else:
+            for line in handle:
+                try:
+                    done.add(_path_key(json.loads(line)["path"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+    return done
+
+
+def _drop_partial_line(output: str) -> None:
+    # A scan killed mid-write can leave a truncated last record; cut it so the
+    # next append starts on a fresh line.
+    with open(output, "rb+") as handle:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        if size == 0:
+            return
+        handle.seek(size - 1)
+        if handle.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            step = min(64 * 1024, position)
+            position -= step
+            handle.seek(position)
+            index = handle.read(step).rfind(b"\n")
+            if index >= 0:
+                handle.truncate(position + index + 1)
+                return
+        handle.truncate(0)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+from dataclasses import dataclass, field
+from typing import Iterable
+
+# Pages rendered to tell grayscale documents from color ones.
+_COLOR_SAMPLE_PAGES = 3
+_COLOR_SAMPLE_ZOOM = 0.2
+# Pixels compared per sampled page.
+_COLOR_SAMPLE_PIXELS = 5000
+
+
+@dataclass(slots=True)
+class PageProfile:
+    width_pt: float
+    height_pt: float
+    has_text: bool
+    has_image: bool
+    # Pixel size (width, height) of each image drawn on the page.
+    image_sizes: list[tuple[int, int]] = field(default_factory=list)
+    # Resolution of the sharpest image as placed on the page; 0 without images.
+    dpi: float = 0.0
+
+    @property
+    def kind(self) -> str:
+        # Same classes as detection.classify_page.
+        if self.has_text and self.has_image:
+            return "mixed"
+        if self.has_image:
+            return "image"
+        if self.has_text:
+            return "text"
+        return "blank"
+
+
+@dataclass(slots=True)
+class DocumentProfile:
+    # What later stages need to know about an input PDF, gathered by the
+    # single pass of detect_file() and passed along with the task instead
+    # of opening the document again.
+    path: str
+    size: int
+    mtime_ns: int
+    is_encrypted: bool = False
+    is_signed: bool = False
+    pages: list[PageProfile] = field(default_factory=list)
+    # "gray", "color" or "unknown"
+    color: str = "unknown"
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def has_text(self) -> bool:
+        return any(page.has_text for page in self.pages)
+
+    @property
+    def has_image(self) -> bool:
+        return any(page.has_image for page in self.pages)
+
+    def is_current(self) -> bool:
+        # False once the file changed on disk after it was profiled.
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (self.size, self.mtime_ns)
+
+    def subset(self, pages: Iterable[int]) -> DocumentProfile:
+        # Profile of a document made of the given zero-based pages (a
+        # checkpoint range, the pages kept after dropping blank ones).
+        # File identity and color class carry over from the original.
+        return dataclasses.replace(self, pages=[self.pages[index] for index in pages])
+
+
+def profile_page(page) -> PageProfile:
+    # page is a PyMuPDF page.
+    infos = page.get_image_info()
+    dpi = 0.0
+    for info in infos:
+        x0, _, x1, _ = info["bbox"]
+        if x1 > x0 and info["width"]:
+            dpi = max(dpi, info["width"] / ((x1 - x0) / 72))
+    text = page.get_text("text")
+    return PageProfile(
+        width_pt=page.rect.width,
+        height_pt=page.rect.height,
+        has_text=bool(text and text.strip()),
+        has_image=bool(infos) or bool(page.get_images()),
+        image_sizes=[(int(info["width"]), int(info["height"])) for info in infos],
+        dpi=round(dpi, 1),
+    )
+
+
+def document_color(doc) -> str:
+    # "gray" when small renders of the first pages have no colored pixels.
+    import fitz
+
+    for index in range(min(_COLOR_SAMPLE_PAGES, doc.page_count)):
+        page = doc.load_page(index)
+        matrix = fitz.Matrix(_COLOR_SAMPLE_ZOOM, _COLOR_SAMPLE_ZOOM)
+        pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB, alpha=False)
+        # If pixel buffer has no color channels, treat as grayscale.
+        if pix.n == 1:
+            continue
+        samples = pix.samples
+        # Whole pixels only, so r, g and b below belong to the same pixel.
+        step = max(1, (pix.width * pix.height) // _COLOR_SAMPLE_PIXELS) * pix.n
+        for idx in range(0, len(samples) - 2, step):
+            r = samples[idx]
+            g = samples[idx + 1]
+            b = samples[idx + 2]
+            if r != g or g != b:
+                return "color"
+    return "gray"
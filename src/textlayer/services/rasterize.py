@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pikepdf
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# "default" leaves page rendering to OCRmyPDF (pypdfium2 when installed on
+# OCRmyPDF 17+, Ghostscript otherwise); "pymupdf" renders with PyMuPDF;
+# "embedded" uses the scan image of single-image pages as it is stored in
+# the PDF and renders the other pages with PyMuPDF.
+RASTERIZERS = ("default", "pymupdf", "embedded")
+DEFAULT_RASTERIZER = "default"
+# Anti-aliasing bits for text and graphics; fixed so renders do not depend
+# on whatever another caller set in the process.
+_AA_LEVEL = 8
+# Rendered sizes within this many pixels of the size implied by the DPI are
+# cropped or padded to it instead of resampled.
+_SIZE_TOLERANCE = 2
+# zlib level for page images that are only read by OCR: encoding a 300 dpi
+# color page at the default level takes longer than rendering it.
+_INTERMEDIATE_PNG_LEVEL = 1
+# Grayscale level at or above which a pixel is white in 1-bit output.
+_MONO_THRESHOLD = 128
+# How far, in points, an embedded image may be from covering the page
+# exactly and still stand in for a render of it.
+_PLACEMENT_TOLERANCE = 1.0
+# Content stream operators that change nothing visible on a scan page:
+# graphics state, marked content and compatibility sections.
+_NEUTRAL_OPERATORS = frozenset(
+    ("q", "Q", "cm", "gs", "w", "J", "j", "M", "d", "ri", "i", "BMC", "BDC", "EMC", "MP", "DP", "BX", "EX")
+)
+_GRAY_DEVICES = ("pngmono", "pngmonod", "pnggray", "jpeggray")
+_JPEG_DEVICES = ("jpeg", "jpeggray")
+
+# PyMuPDF documents must not be used from several threads at once; OCRmyPDF
+# runs page workers as threads when asked to.
+_render_lock = threading.Lock()
+
+
+def rasterize_page(
+    input_file: str,
+    output_file: str,
+    raster_device: str,
+    raster_dpi: tuple[float, float],
+    pageno: int,
+    page_dpi: Optional[tuple[float, float]] = None,
+    rotation: Optional[int] = None,
+    use_cropbox: bool = False,
+    intermediate: bool = False,
+) -> str:
+    # Same contract as OCRmyPDF's Ghostscript rasterizer: pageno is one-based,
+    # the MediaBox is rendered unless use_cropbox, the image is exactly
+    # round(points * dpi / 72) pixels, rotation is a clockwise angle the image
+    # is turned back by, and page_dpi (default raster_dpi) is written as the
+    # image resolution. intermediate: the image will not be placed in the
+    # output PDF, so it is compressed for speed rather than size.
+    import fitz
+
+    device = str(raster_device).lower()
+    dpi_x, dpi_y = raster_dpi
+    with _render_lock:
+        fitz.TOOLS.set_aa_level(_AA_LEVEL)
+        with fitz.open(input_file) as doc:
+            page = doc.load_page(pageno - 1)
+            if not use_cropbox:
+                # In memory only; the document is never saved.
+                page.set_cropbox(page.mediabox)
+            width = round(page.rect.width * dpi_x / 72)
+            height = round(page.rect.height * dpi_y / 72)
+            pix = page.get_pixmap(
+                matrix=fitz.Matrix(dpi_x / 72, dpi_y / 72),
+                colorspace=fitz.csGRAY if device in _GRAY_DEVICES else fitz.csRGB,
+                alpha=device == "pngalpha",
+                annots=True,
+            )
+            mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+            # frombytes copies, so the image outlives the pixmap.
+            image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+    _save(image, output_file, device, (width, height), page_dpi or raster_dpi, rotation, intermediate)
+    return output_file
+
+
+def extract_page_image(
+    input_file: str,
+    output_file: str,
+    raster_device: str,
+    raster_dpi: tuple[float, float],
+    pageno: int,
+    page_dpi: Optional[tuple[float, float]] = None,
+    rotation: Optional[int] = None,
+    use_cropbox: bool = False,
+    intermediate: bool = False,
+) -> bool:
+    # Same contract as rasterize_page, for pages that are nothing but one
+    # scan image covering the page: the image is taken from the PDF instead
+    # of rendered, which skips the render and its page-sized buffers. Only
+    # used when the image already has the pixel size a render would have
+    # (OCRmyPDF rasterizes at the image's own resolution), so word
+    # coordinates map back to the page as usual. Returns False, writing
+    # nothing, for any other page.
+    device = str(raster_device).lower()
+    dpi_x, dpi_y = raster_dpi
+    with pikepdf.open(input_file) as pdf:
+        page = pdf.pages[pageno - 1]
+        box = page.cropbox if use_cropbox else page.mediabox
+        x0, y0, x1, y1 = (float(value) for value in box)
+        width = round(abs(x1 - x0) * dpi_x / 72)
+        height = round(abs(y1 - y0) * dpi_y / 72)
+        xobject = _page_scan_image(page, (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)))
+        if xobject is None or not _within_tolerance(xobject, width, height):
+            return False
+        image = _decode_image(input_file, xobject)
+    if image is None:
+        return False
+    logger.debug("Page %d: using the embedded %dx%d image", pageno, image.width, image.height)
+    _save(image, output_file, device, (width, height), page_dpi or raster_dpi, rotation, intermediate)
+    return True
+
+
+def _page_scan_image(page: pikepdf.Page, box: tuple[float, float, float, float]) -> Optional[pikepdf.Stream]:
+    # The image XObject a page consists of, or None if the page draws
+    # anything else or places the image other than upright over the whole
+    # box. Reads the content stream only; no image data is decoded.
+    if page.obj.get("/Rotate", 0) % 360 or page.obj.get("/UserUnit", 1) != 1 or page.obj.get("/Annots"):
+        return None
+    ctm = pikepdf.Matrix()
+    stack = []
+    found = None
+    try:
+        instructions = pikepdf.parse_content_stream(page)
+    except pikepdf.PdfError:
+        return None
+    for operands, operator in instructions:
+        name = str(operator)
+        if name == "q":
+            stack.append(ctm)
+        elif name == "Q":
+            if not stack:
+                return None
+            ctm = stack.pop()
+        elif name == "cm":
+            ctm = pikepdf.Matrix(*(float(value) for value in operands)) @ ctm
+        elif name == "Do" and found is None:
+            found = (operands[0], ctm)
+        elif name not in _NEUTRAL_OPERATORS:
+            # Paths, text, shadings, inline images, a second XObject.
+            return None
+    if found is None:
+        return None
+    xobject = page.resources.get("/XObject", {}).get(found[0])
+    if not isinstance(xobject, pikepdf.Stream) or xobject.get("/Subtype") != "/Image":
+        return None
+    # The unit square the image fills must land on the page box, upright.
+    a, b, c, d, e, f = found[1].shorthand
+    if b or c or a <= 0 or d <= 0:
+        return None
+    placed = (e, f, e + a, f + d)
+    if any(abs(edge - box_edge) > _PLACEMENT_TOLERANCE for edge, box_edge in zip(placed, box)):
+        return None
+    if any(key in xobject for key in ("/SMask", "/Mask", "/Decode", "/ImageMask")):
+        return None
+    if xobject.get("/BitsPerComponent") not in (1, 8) or _components(xobject.get("/ColorSpace")) is None:
+        # Unusual bit depth or a color space (CMYK, Indexed, Separation,
+        # Lab) a render converts differently.
+        return None
+    return xobject
+
+
+def _components(colorspace) -> Optional[int]:
+    # Components of a gray or RGB color space, None for any other.
+    if colorspace in ("/DeviceGray", "/CalGray"):
+        return 1
+    if colorspace in ("/DeviceRGB", "/CalRGB"):
+        return 3
+    if isinstance(colorspace, pikepdf.Array) and len(colorspace) == 2:
+        family, params = colorspace[0], colorspace[1]
+        if family in ("/CalGray", "/CalRGB"):
+            return _components(family)
+        if family == "/ICCBased" and params.get("/N") in (1, 3):
+            return int(params.get("/N"))
+    return None
+
+
+def _within_tolerance(xobject: pikepdf.Stream, width: int, height: int) -> bool:
+    # Another resolution than the render would need resampling, which is
+    # not faster than rendering.
+    return (
+        abs(int(xobject.get("/Width", 0)) - width) <= _SIZE_TOLERANCE
+        and abs(int(xobject.get("/Height", 0)) - height) <= _SIZE_TOLERANCE
+    )
+
+
+def _decode_image(input_file: str, xobject: pikepdf.Stream) -> Optional[Image.Image]:
+    filters = xobject.get("/Filter")
+    if filters == "/DCTDecode" or (isinstance(filters, pikepdf.Array) and list(filters) == ["/DCTDecode"]):
+        # JPEG, decoded once by PIL from the stored stream.
+        image = Image.open(io.BytesIO(xobject.read_raw_bytes()))
+        image.load()
+        return image
+    # CCITT, JBIG2 and Flate images, decoded by PyMuPDF straight to samples.
+    import fitz
+
+    with _render_lock:
+        with fitz.open(input_file) as doc:
+            pix = fitz.Pixmap(doc, xobject.objgen[0])
+            if pix.alpha or pix.n not in (1, 3):
+                return None
+            return Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+
+
+def _save(
+    image: Image.Image,
+    output_file: str,
+    device: str,
+    size: tuple[int, int],
+    dpi: tuple[float, float],
+    rotation: Optional[int],
+    intermediate: bool = False,
+) -> None:
+    image = _fit(_as_device_mode(image, device), *size)
+    image = _convert_for_device(image, device)
+    dpi = tuple(float(value) for value in dpi)
+    if rotation:
+        # Image.Transpose.ROTATE_* turn counterclockwise, undoing the
+        # clockwise page rotation.
+        transpose = {
+            90: Image.Transpose.ROTATE_90,
+            180: Image.Transpose.ROTATE_180,
+            270: Image.Transpose.ROTATE_270,
+        }.get(rotation % 360)
+        if transpose is not None:
+            image = image.transpose(transpose)
+        if rotation % 180 == 90:
+            dpi = (dpi[1], dpi[0])
+    if device in _JPEG_DEVICES:
+        image.save(output_file, format="JPEG", dpi=dpi)
+    elif intermediate:
+        image.save(output_file, format="PNG", dpi=dpi, compress_level=_INTERMEDIATE_PNG_LEVEL)
+    else:
+        image.save(output_file, format="PNG", dpi=dpi)
+
+
+def _fit(image: Image.Image, width: int, height: int) -> Image.Image:
+    # PyMuPDF rounds the pixmap outward, so it may be a pixel larger than
+    # the page at this DPI. Crop or pad with white rather than resample.
+    if image.size == (width, height):
+        return image
+    if abs(image.width - width) > _SIZE_TOLERANCE or abs(image.height - height) > _SIZE_TOLERANCE:
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+    canvas = Image.new(image.mode, (width, height), "white")
+    canvas.paste(image, (0, 0))
+    return canvas
+
+
+def _as_device_mode(image: Image.Image, device: str) -> Image.Image:
+    # Renders already come in the right mode; embedded images may not.
+    if device in _GRAY_DEVICES:
+        mode = "L"
+    elif device == "pngalpha":
+        mode = "RGBA"
+    else:
+        mode = "RGB"
+    return image if image.mode == mode else image.convert(mode)
+
+
+def _convert_for_device(image: Image.Image, device: str) -> Image.Image:
+    # Match the pixel format of the Ghostscript device OCRmyPDF asked for.
+    if device in ("pngmono", "pngmonod"):
+        # A fixed threshold instead of PIL's default dithering keeps glyph
+        # edges clean for OCR and the output reproducible.
+        return image.point(lambda value: 255 if value >= _MONO_THRESHOLD else 0, mode="1")
+    if device == "png256":
+        return image.quantize(colors=256)
+    return image
+
+
+@dataclass
+class RasterTiming:
+    name: str
+    available: bool
+    seconds: float = 0.0
+    pages: int = 0
+    size: tuple[int, int] = (0, 0)
+    error: str = ""
+
+    @property
+    def seconds_per_page(self) -> float:
+        return self.seconds / self.pages if self.pages else 0.0
+
+
+def benchmark_rasterizers(
+    path: str, pages: int = 5, dpi: float = 300.0, device: str = "png16m"
+) -> list[RasterTiming]:
+    # Renders the first pages of path with every rasterizer available here,
+    # one page at a time as OCRmyPDF does. size is that of the first page.
+    import fitz
+
+    with fitz.open(path) as doc:
+        count = min(pages, doc.page_count)
+    renderers = {
+        "ghostscript": _ghostscript_renderer(device, dpi),
+        "pypdfium": _pypdfium_renderer(device, dpi),
+        "pymupdf": lambda src, dst, pageno: rasterize_page(src, dst, device, (dpi, dpi), pageno),
+        "embedded": lambda src, dst, pageno: extract_page_image(src, dst, device, (dpi, dpi), pageno)
+        or rasterize_page(src, dst, device, (dpi, dpi), pageno),
+    }
+    timings = []
+    work_dir = tempfile.mkdtemp(prefix="textlayer-raster-")
+    try:
+        for name, render in renderers.items():
+            if render is None:
+                timings.append(RasterTiming(name, available=False))
+                continue
+            timing = RasterTiming(name, available=True)
+            try:
+                for pageno in range(1, count + 1):
+                    output = os.path.join(work_dir, f"{name}-{pageno}.{'jpg' if device in _JPEG_DEVICES else 'png'}")
+                    started = time.perf_counter()
+                    render(path, output, pageno)
+                    timing.seconds += time.perf_counter() - started
+                    timing.pages += 1
+                    if pageno == 1:
+                        with Image.open(output) as image:
+                            timing.size = image.size
+            except Exception as exc:
+                logger.warning("Rasterizer %s failed: %s", name, exc)
+                timing.error = str(exc)
+            timings.append(timing)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return timings
+
+
+def _ghostscript_renderer(device: str, dpi: float) -> Optional[Callable[[str, str, int], None]]:
+    if not shutil.which("gs") and not shutil.which("gswin64c"):
+        return None
+    try:
+        from ocrmypdf._exec.ghostscript import rasterize_pdf
+        from ocrmypdf.helpers import Resolution
+    except ImportError:
+        return None
+    return lambda src, dst, pageno: rasterize_pdf(
+        src, dst, raster_device=device, raster_dpi=Resolution(dpi, dpi), pageno=pageno
+    )
+
+
+def _pypdfium_renderer(device: str, dpi: float) -> Optional[Callable[[str, str, int], None]]:
+    # Built into OCRmyPDF 17+, and only usable with pypdfium2 installed.
+    try:
+        from ocrmypdf.builtin_plugins import pypdfium
+        from ocrmypdf.helpers import Resolution
+    except ImportError:
+        return None
+    if pypdfium.pdfium is None:
+        return None
+    return lambda src, dst, pageno: pypdfium.rasterize_pdf_page(
+        input_file=src,
+        output_file=dst,
+        raster_device=device,
+        raster_dpi=Resolution(dpi, dpi),
+        pageno=pageno,
+        page_dpi=None,
+        rotation=None,
+        filter_vector=False,
+        stop_on_soft_error=False,
+        options=None,
+        use_cropbox=False,
+    )
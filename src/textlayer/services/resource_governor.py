@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from textlayer.services.supervisor import tree_cpu_seconds
+
+logger = logging.getLogger(__name__)
+
+
+# Jobs at or below this many pages keep normal priority; larger jobs are
+# niced so short interactive conversions are not starved by big books.
+_SMALL_JOB_PAGES = 20
+_MAX_NICE = 10
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+# External load is measured over the time between two acquisitions; a
+# shorter gap reuses the previous measurement.
+_MIN_SAMPLE_SECONDS = 1.0
+# The queued job, if any, that the current task runs (see expect()).
+_ticket: ContextVar[Optional[int]] = ContextVar("textlayer_governor_ticket", default=None)
+
+
+@dataclass
+class CoreLease:
+    job_id: int
+    pages: int
+    jobs: int
+    omp_threads: int
+    nice: int
+    pid: Optional[int] = None
+    ticket: Optional[int] = None
+
+
+class ResourceGovernor:
+    def __init__(self, total_cores: Optional[int] = None) -> None:
+        self._total_cores = max(1, total_cores or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._active: dict[int, CoreLease] = {}
+        # ticket -> pages of jobs about to start (see expect()).
+        self._expected: dict[int, int] = {}
+        self._ids = itertools.count(1)
+        self._tickets = itertools.count(1)
+        # (monotonic time, busy CPU seconds of the system, of our own trees)
+        self._sample: Optional[tuple[float, float, float]] = None
+        self._external = 0.0
+
+    @property
+    def total_cores(self) -> int:
+        return self._total_cores
+
+    def expect(self, pages: int) -> int:
+        # Announces a job that will start soon, so the jobs acquiring before
+        # it leave it its share. Returns a ticket for bind() and forget().
+        with self._lock:
+            ticket = next(self._tickets)
+            self._expected[ticket] = max(1, pages)
+            return ticket
+
+    def bind(self, ticket: int) -> None:
+        # Leases acquired from the current asyncio task (and the threads it
+        # starts) belong to the expected job with this ticket.
+        _ticket.set(ticket)
+
+    def forget(self, ticket: int) -> None:
+        with self._lock:
+            self._expected.pop(ticket, None)
+
+    def acquire(self, pages: int) -> CoreLease:
+        pages = max(1, pages)
+        with self._lock:
+            budget = self._total_cores - int(self._external_load())
+            ticket = _ticket.get()
+            running = {lease.ticket for lease in self._active.values()}
+            waiting = sum(count for key, count in self._expected.items() if key != ticket and key not in running)
+            total_pages = pages + waiting + sum(lease.pages for lease in self._active.values())
+            # Split the budget over running and expected jobs in proportion
+            # to page counts; never hand out more workers than pages, since
+            # ocrmypdf parallelizes per page, or cores running jobs hold.
+            free = max(1, budget - sum(lease.jobs for lease in self._active.values()))
+            share = max(1, min(pages, round(budget * pages / total_pages), free))
+            lease = CoreLease(
+                job_id=next(self._ids),
+                pages=pages,
+                jobs=share,
+                # Parallel page workers already fill the cores; Tesseract's own
+                # OpenMP threads only oversubscribe them.
+                omp_threads=1 if share > 1 else min(4, free),
+                nice=0,
+                ticket=ticket,
+            )
+            self._active[lease.job_id] = lease
+            self._rebalance_locked()
+        logger.info(
+            "Governor: job %d (%d pages) gets --jobs %d, OMP_THREAD_LIMIT=%d, nice %d",
+            lease.job_id,
+            lease.pages,
+            lease.jobs,
+            lease.omp_threads,
+            lease.nice,
+        )
+        return lease
+
+    def attach_process(self, lease: CoreLease, pid: int) -> None:
+        with self._lock:
+            lease.pid = pid
+            _apply_priority(lease)
+
+    def release(self, lease: CoreLease) -> None:
+        with self._lock:
+            self._active.pop(lease.job_id, None)
+            self._rebalance_locked()
+
+    def apply_env(self, lease: CoreLease, env: dict) -> None:
+        env["OMP_THREAD_LIMIT"] = str(lease.omp_threads)
+
+    def _external_load(self) -> float:
+        # Cores kept busy by processes TextLayer did not start: system CPU
+        # time minus that of this process and the OCR process trees, since
+        # the previous sample. Our own finished jobs would still show in the
+        # load average.
+        busy = _system_busy_seconds()
+        if busy is None:
+            return self._load_average()
+        now = time.monotonic()
+        own = _own_cpu_seconds(lease.pid for lease in self._active.values() if lease.pid is not None)
+        if self._sample is None:
+            self._sample = (now, busy, own)
+        elif now - self._sample[0] >= _MIN_SAMPLE_SECONDS:
+            then, busy_then, own_then = self._sample
+            self._external = max(0.0, (busy - busy_then - (own - own_then)) / (now - then))
+            self._sample = (now, busy, own)
+        return self._external
+
+    def _load_average(self) -> float:
+        # Without /proc/stat: the load average beyond what running jobs
+        # were promised.
+        if not hasattr(os, "getloadavg"):
+            return 0.0
+        reserved = sum(lease.jobs for lease in self._active.values())
+        try:
+            return max(0.0, os.getloadavg()[0] - reserved)
+        except OSError:
+            return 0.0
+
+    def _rebalance_locked(self) -> None:
+        # Priority follows size: the larger a job relative to the others, the
+        # lower its priority. Recomputed whenever a job starts or finishes.
+        if not self._active:
+            return
+        largest = max(lease.pages for lease in self._active.values())
+        for lease in self._active.values():
+            if lease.pages <= _SMALL_JOB_PAGES or len(self._active) == 1:
+                nice = 0
+            else:
+                nice = round(_MAX_NICE * lease.pages / largest)
+            if nice != lease.nice:
+                lease.nice = nice
+                _apply_priority(lease)
+
+
+def _system_busy_seconds() -> Optional[float]:
+    # Non-idle CPU time of all cores since boot, or None without /proc.
+    try:
+        with open("/proc/stat", "rb") as handle:
+            fields = handle.readline().split()
+    except OSError:
+        return None
+    if len(fields) < 9 or fields[0] != b"cpu":
+        return None
+    # user nice system idle iowait irq softirq steal; guest time is
+    # already part of user.
+    ticks = [int(value) for value in fields[1:9]]
+    return (sum(ticks) - ticks[3] - ticks[4]) / _CLOCK_TICKS
+
+
+def _own_cpu_seconds(pgids: Iterable[int]) -> float:
+    # This process, its reaped children, and the live OCR process groups.
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system + tree_cpu_seconds(pgids)
+
+
+def _apply_priority(lease: CoreLease) -> None:
+    if lease.pid is None or not hasattr(os, "setpriority"):
+        return
+    try:
+        # OCR processes run in their own process group, so this also reaches
+        # ocrmypdf's page workers and Tesseract children.
+        os.setpriority(os.PRIO_PGRP, lease.pid, lease.nice)
+    except (OSError, ProcessLookupError):
+        # Lowering niceness needs privileges; keep the current priority.
+        logger.debug("Could not set priority %d for pid %s", lease.nice, lease.pid)
+
+
+_governor: Optional[ResourceGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> ResourceGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+        return _governor
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+_MB = 1024 * 1024
+_WATCH_INTERVAL = 1.0
+_TAIL_LINES = 50
+# Without an explicit limit the process tree may use this share of RAM.
+_DEFAULT_MEMORY_SHARE = 0.8
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+# Longest output line the asyncio reader accepts.
+_LINE_LIMIT = 1024 * 1024
+
+
+@dataclass
+class ProcessLimits:
+    # 0 disables a limit. The stall timeout fires when the process tree
+    # neither prints a line nor uses CPU for that long, so a slow page is
+    # not mistaken for a hung one.
+    wall_seconds: float = 0.0
+    stall_seconds: float = 0.0
+    # Address-space rlimit for every process in the tree (POSIX) and the
+    # summed RSS of the tree (Linux). 0 caps the tree at 80% of RAM.
+    memory_mb: int = 0
+
+
+@dataclass
+class ProcessUsage:
+    return_code: int
+    wall_seconds: float
+    cpu_seconds: Optional[float] = None
+    peak_rss_bytes: int = 0
+    # Why the supervisor stopped the process, if it did.
+    killed_reason: Optional[str] = None
+    matched: set[str] = field(default_factory=set)
+    tail: list[str] = field(default_factory=list)
+
+
+class StreamMatcher:
+    # Remembers which of a fixed set of markers appeared in the output, and
+    # the last few lines, instead of keeping the whole output in memory.
+    def __init__(self, markers: Iterable[str], tail_lines: int = _TAIL_LINES) -> None:
+        self._markers = tuple(markers)
+        self.matched: set[str] = set()
+        self.tail: deque[str] = deque(maxlen=tail_lines)
+
+    def feed(self, line: str) -> None:
+        self.tail.append(line)
+        for marker in self._markers:
+            if marker not in self.matched and marker in line:
+                self.matched.add(marker)
+
+
+class ProcessSupervisor:
+    def __init__(self, limits: Optional[ProcessLimits] = None, markers: Iterable[str] = ()) -> None:
+        self.limits = limits or ProcessLimits()
+        self._markers = tuple(markers)
+        self._memory_bytes = self.limits.memory_mb * _MB or int(_physical_memory() * _DEFAULT_MEMORY_SHARE)
+
+    async def run_async(
+        self,
+        cmd: list[str],
+        env: dict,
+        on_line: Callable[[str], None],
+        on_start: Optional[Callable[[int], None]] = None,
+        creationflags: int = 0,
+        on_tick: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+    ) -> ProcessUsage:
+        # Output is read and limits are watched on the event loop, so many
+        # processes need no thread each. on_line may raise to abort the run;
+        # on_tick is awaited with every limit check and returns a reason to
+        # stop the process tree, for limits the caller watches itself.
+        # The event loop reaps the child, so CPU time and peak RSS come from
+        # the watcher's /proc samples. Cancelling the calling task kills the
+        # process tree.
+        matcher = StreamMatcher(self._markers)
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+            creationflags=creationflags,
+            # A separate process group lets the governor re-prioritize the
+            # whole OCR process tree and the supervisor kill it.
+            start_new_session=os.name != "nt",
+            preexec_fn=self._preexec(),
+            limit=_LINE_LIMIT,
+        )
+        if process.stdout is None:
+            raise RuntimeError("Failed to start OCR process.")
+        self._limit_started(process.pid)
+        if on_start is not None:
+            on_start(process.pid)
+
+        watch = _Watch(process, self.limits, self._memory_bytes)
+        watcher = asyncio.ensure_future(watch.run_async(on_tick))
+        try:
+            async for raw in process.stdout:
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                watch.last_activity = time.monotonic()
+                matcher.feed(line)
+                on_line(line)
+            # Last sample before the exit is reaped.
+            watch.sample()
+            return_code = await process.wait()
+        except BaseException:
+            kill_process_tree(process)
+            await process.wait()
+            raise
+        finally:
+            watcher.cancel()
+
+        usage = ProcessUsage(
+            return_code=return_code,
+            wall_seconds=time.monotonic() - started,
+            cpu_seconds=watch.cpu_seconds,
+            peak_rss_bytes=watch.peak_rss,
+            killed_reason=watch.reason,
+            matched=matcher.matched,
+            tail=list(matcher.tail),
+        )
+        _log_usage(process.pid, usage)
+        return usage
+
+    def _preexec(self) -> Optional[Callable[[], None]]:
+        # The address-space rlimit is inherited by every process ocrmypdf
+        # starts. Linux sets it from outside with prlimit right after start;
+        # other POSIX systems need it between fork and exec.
+        if os.name == "nt" or not self.limits.memory_mb:
+            return None
+        import resource
+
+        if hasattr(resource, "prlimit"):
+            return None
+        limit = self.limits.memory_mb * _MB
+        return lambda: resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    def _limit_started(self, pid: int) -> None:
+        if os.name == "nt" or not self.limits.memory_mb:
+            return
+        import resource
+
+        if hasattr(resource, "prlimit"):
+            limit = self.limits.memory_mb * _MB
+            try:
+                resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not limit memory of process %d: %s", pid, exc)
+
+
+class _Watch:
+    # Watchdog state: the reader loop waits on output, so deadlines and
+    # memory are checked from here, in a task of its own.
+    def __init__(self, process, limits: ProcessLimits, memory_bytes: int) -> None:
+        self.process = process
+        self.limits = limits
+        self.memory_bytes = memory_bytes
+        self.started = time.monotonic()
+        self.last_activity = self.started
+        self.peak_rss = 0
+        self.reason: Optional[str] = None
+        self._cpu_ticks = 0
+        self._sampled = False
+
+    @property
+    def cpu_seconds(self) -> Optional[float]:
+        return self._cpu_ticks / _CLOCK_TICKS if self._sampled else None
+
+    async def run_async(self, on_tick: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> None:
+        while True:
+            await asyncio.sleep(_WATCH_INTERVAL)
+            reason = self._check(time.monotonic())
+            if not reason and on_tick is not None:
+                reason = await on_tick()
+            if reason:
+                self._stop(reason)
+                return
+
+    def _stop(self, reason: str) -> None:
+        self.reason = reason
+        logger.warning("Stopping process %d: %s", self.process.pid, reason)
+        kill_process_tree(self.process)
+
+    def sample(self) -> Optional[int]:
+        # Returns the current tree RSS, or None where /proc is unavailable.
+        tree = _tree_usage(self.process.pid)
+        if tree is None:
+            return None
+        rss, ticks = tree
+        self._sampled = True
+        self.peak_rss = max(self.peak_rss, rss)
+        if ticks > self._cpu_ticks:
+            self._cpu_ticks = ticks
+            self.last_activity = max(self.last_activity, time.monotonic())
+        return rss
+
+    def _check(self, now: float) -> Optional[str]:
+        rss = self.sample()
+        if rss is not None and rss > self.memory_bytes:
+            return f"memory limit exceeded ({rss // _MB} MB > {self.memory_bytes // _MB} MB)"
+        if self.limits.wall_seconds and now - self.started > self.limits.wall_seconds:
+            return f"time limit exceeded ({self.limits.wall_seconds:.0f}s)"
+        if self.limits.stall_seconds and now - self.last_activity > self.limits.stall_seconds:
+            return f"no progress for {self.limits.stall_seconds:.0f}s"
+        return None
+
+
+def kill_process_tree(process) -> None:
+    if process.returncode is not None:
+        return
+    if os.name == "nt":
+        process.kill()
+        return
+    try:
+        # The process leads its own group; this also stops ocrmypdf's page
+        # workers and Tesseract children.
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def _log_usage(pid: int, usage: ProcessUsage) -> None:
+    logger.info(
+        "Process %d exited %d: wall %.1fs, cpu %s, peak RSS %d MB%s",
+        pid,
+        usage.return_code,
+        usage.wall_seconds,
+        f"{usage.cpu_seconds:.1f}s" if usage.cpu_seconds is not None else "n/a",
+        usage.peak_rss_bytes // _MB,
+        f" ({usage.killed_reason})" if usage.killed_reason else "",
+    )
+
+
+def tree_cpu_seconds(pgids: Iterable[int]) -> float:
+    # CPU time used so far by the process groups pgids, including their
+    # reaped members; 0 where /proc is not available.
+    ticks = 0
+    for pgid in set(pgids):
+        usage = _tree_usage(pgid)
+        if usage is not None:
+            ticks += usage[1]
+    return ticks / _CLOCK_TICKS
+
+
+def _tree_usage(pgid: int) -> Optional[tuple[int, int]]:
+    # Summed RSS (bytes) and CPU ticks of every process in the group, from
+    # /proc. None where /proc is not available. Ticks include children
+    # already reaped inside the group, so the sum does not drop when a
+    # page worker exits.
+    if not os.path.isdir("/proc"):
+        return None
+    rss = 0
+    ticks = 0
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for name in entries:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as handle:
+                stat = handle.read()
+        except OSError:
+            continue
+        # Fields after the parenthesized command name, which may contain spaces.
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if len(fields) < 22 or int(fields[2]) != pgid:
+            continue
+        # utime, stime, cutime, cstime
+        ticks += sum(int(value) for value in fields[11:15])
+        rss += int(fields[21]) * _PAGE_SIZE
+    return rss, ticks
+
+
+def _physical_memory() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        # No sysconf (Windows): effectively no tree limit by default.
+        return 1 << 62
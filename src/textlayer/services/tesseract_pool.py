@@ -0,0 +1,508 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import glob
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import sys
+import threading
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseManager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# "cli" runs one tesseract process per page (ocrmypdf's default);
+# "persistent" sends pages to long-lived workers that keep models loaded.
+ENGINE_CHOICES = ("cli", "persistent")
+DEFAULT_ENGINE = "cli"
+AUTHKEY_ENV = "TEXTLAYER_POOL_AUTHKEY"
+# Workers are replaced after this many pages or this much peak memory, to
+# bound leaks and fragmentation in long-running Tesseract instances.
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_RSS_MB = 1536
+# Workers start when pages arrive and exit after this long without one.
+DEFAULT_IDLE_SECONDS = 60.0
+_OEM_DEFAULT = 3
+_MAX_CRASHES = 3
+# Request ids are uuid4 hex strings.
+_REQUEST_ID_SIZE = 32
+_LIBRARY_NAMES = ("libtesseract.so.5", "libtesseract.so.4", "libtesseract.5.dylib", "libtesseract.dylib")
+
+
+class TesseractLibraryError(RuntimeError):
+    pass
+
+
+@dataclass
+class RecognitionRequest:
+    image_path: str
+    lang: str
+    oem: int = _OEM_DEFAULT
+    psm: Optional[int] = None
+    config_files: tuple[str, ...] = ()
+    variables: dict[str, str] = field(default_factory=dict)
+    # Any of "hocr", "pdf" (text-only), "txt" -> output file path.
+    outputs: dict[str, str] = field(default_factory=dict)
+
+    def engine_key(self) -> tuple:
+        # Settings that stick to an initialized engine; requests that differ
+        # in any of them go to separate workers. That includes psm: it is
+        # only set when given and would carry over to a page without one.
+        return (self.lang, self.oem, self.psm, self.config_files, tuple(sorted(self.variables.items())))
+
+
+def find_library(tesseract_path: str = "") -> Optional[str]:
+    # The library normally sits next to a configured tesseract.exe on
+    # Windows, and on the loader path elsewhere.
+    if tesseract_path:
+        directory = os.path.dirname(tesseract_path)
+        for pattern in ("libtesseract*.dll", "tesseract*.dll", "libtesseract*.so*", "libtesseract*.dylib"):
+            matches = sorted(glob.glob(os.path.join(directory, pattern)))
+            if matches:
+                return matches[-1]
+    found = ctypes.util.find_library("tesseract")
+    if found:
+        return found
+    for name in _LIBRARY_NAMES:
+        try:
+            ctypes.CDLL(name)
+        except OSError:
+            continue
+        return name
+    return None
+
+
+class TessApi:
+    # Thin ctypes wrapper over the libtesseract C API (capi.h). One instance
+    # holds one initialized language set.
+    def __init__(
+        self,
+        library_path: str,
+        lang: str,
+        oem: int = _OEM_DEFAULT,
+        datapath: Optional[str] = None,
+    ) -> None:
+        try:
+            self._lib = ctypes.CDLL(library_path)
+        except OSError as exc:
+            raise TesseractLibraryError(f"Cannot load {library_path}: {exc}") from exc
+        self._declare()
+        self._handle = self._lib.TessBaseAPICreate()
+        datapath = datapath or os.environ.get("TESSDATA_PREFIX")
+        result = self._lib.TessBaseAPIInit2(
+            self._handle,
+            datapath.encode("utf-8") if datapath else None,
+            lang.encode("utf-8"),
+            oem,
+        )
+        if result != 0:
+            self._lib.TessBaseAPIDelete(self._handle)
+            raise TesseractLibraryError(f"Tesseract could not load language '{lang}'.")
+
+    def recognize(self, request: RecognitionRequest) -> None:
+        from PIL import Image
+
+        lib = self._lib
+        handle = self._handle
+        with Image.open(request.image_path) as image:
+            if image.mode not in ("L", "RGB"):
+                image = image.convert("RGB" if "A" in image.mode or image.mode == "P" else "L")
+            width, height = image.size
+            channels = 1 if image.mode == "L" else 3
+            pixels = image.tobytes()
+            dpi = image.info.get("dpi", (300, 300))[0]
+        try:
+            for config_file in request.config_files:
+                lib.TessBaseAPIReadConfigFile(handle, config_file.encode("utf-8"))
+            for name, value in request.variables.items():
+                lib.TessBaseAPISetVariable(handle, name.encode("utf-8"), str(value).encode("utf-8"))
+            if request.psm is not None:
+                lib.TessBaseAPISetPageSegMode(handle, request.psm)
+            lib.TessBaseAPISetInputName(handle, request.image_path.encode("utf-8"))
+            lib.TessBaseAPISetImage(handle, pixels, width, height, channels, width * channels)
+            lib.TessBaseAPISetSourceResolution(handle, int(round(dpi)))
+            if lib.TessBaseAPIRecognize(handle, None) != 0:
+                raise TesseractLibraryError(f"Recognition failed for {request.image_path}")
+            if "hocr" in request.outputs:
+                _write_text(request.outputs["hocr"], self._take_text(lib.TessBaseAPIGetHOCRText(handle, 0)))
+            if "txt" in request.outputs:
+                _write_text(request.outputs["txt"], self._take_text(lib.TessBaseAPIGetUTF8Text(handle)))
+            if "pdf" in request.outputs:
+                self._render_pdf(request.outputs["pdf"])
+        finally:
+            lib.TessBaseAPIClear(handle)
+
+    def close(self) -> None:
+        if self._handle:
+            self._lib.TessBaseAPIEnd(self._handle)
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+
+    def _render_pdf(self, output_pdf: str) -> None:
+        # Same text-only PDF the tesseract CLI writes with textonly_pdf=1.
+        lib = self._lib
+        prefix = os.path.splitext(output_pdf)[0]
+        renderer = lib.TessPDFRendererCreate(
+            prefix.encode("utf-8"),
+            lib.TessBaseAPIGetDatapath(self._handle),
+            1,
+        )
+        if not renderer:
+            raise TesseractLibraryError("Could not create the Tesseract PDF renderer.")
+        try:
+            ok = (
+                lib.TessResultRendererBeginDocument(renderer, b"")
+                and lib.TessResultRendererAddImage(renderer, self._handle)
+                and lib.TessResultRendererEndDocument(renderer)
+            )
+        finally:
+            lib.TessDeleteResultRenderer(renderer)
+        if not ok:
+            raise TesseractLibraryError(f"Could not write {output_pdf}")
+
+    def _take_text(self, pointer: int) -> str:
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode("utf-8", errors="replace")
+        finally:
+            self._lib.TessDeleteText(ctypes.c_void_p(pointer))
+
+    def _declare(self) -> None:
+        lib = self._lib
+        p, s, i = ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int
+        signatures = {
+            "TessBaseAPICreate": (p, []),
+            "TessBaseAPIDelete": (None, [p]),
+            "TessBaseAPIInit2": (i, [p, s, s, i]),
+            "TessBaseAPIEnd": (None, [p]),
+            "TessBaseAPIClear": (None, [p]),
+            "TessBaseAPIReadConfigFile": (None, [p, s]),
+            "TessBaseAPISetVariable": (i, [p, s, s]),
+            "TessBaseAPISetPageSegMode": (None, [p, i]),
+            "TessBaseAPISetInputName": (None, [p, s]),
+            "TessBaseAPISetImage": (None, [p, s, i, i, i, i]),
+            "TessBaseAPISetSourceResolution": (None, [p, i]),
+            "TessBaseAPIRecognize": (i, [p, p]),
+            "TessBaseAPIGetUTF8Text": (p, [p]),
+            "TessBaseAPIGetHOCRText": (p, [p, i]),
+            "TessBaseAPIGetDatapath": (s, [p]),
+            "TessDeleteText": (None, [p]),
+            "TessPDFRendererCreate": (p, [s, s, i]),
+            "TessResultRendererBeginDocument": (i, [p, s]),
+            "TessResultRendererAddImage": (i, [p, p]),
+            "TessResultRendererEndDocument": (i, [p]),
+            "TessDeleteResultRenderer": (None, [p]),
+        }
+        for name, (restype, argtypes) in signatures.items():
+            function = getattr(lib, name)
+            function.restype = restype
+            function.argtypes = argtypes
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _worker_main(
+    library_path: str,
+    datapath: Optional[str],
+    lang: str,
+    oem: int,
+    requests: multiprocessing.Queue,
+    responses: multiprocessing.Queue,
+    current,
+    max_pages: int,
+    max_rss_mb: int,
+    idle_seconds: float,
+) -> None:
+    # current: shared memory holding the id of the request being worked
+    # on. Unlike a queued message it survives a crash, so the pool can fail
+    # that request as soon as it finds the worker dead.
+    # Parallelism comes from running several workers; Tesseract's own OpenMP
+    # threads would only oversubscribe the cores. Read when the library loads.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    try:
+        api = TessApi(library_path, lang, oem, datapath)
+    except TesseractLibraryError as exc:
+        responses.put((None, str(exc)))
+        return
+    pages = 0
+    try:
+        while True:
+            try:
+                item = requests.get(timeout=idle_seconds)
+            except queue.Empty:
+                # The pool starts a worker again when pages arrive.
+                return
+            if item is None:
+                return
+            request_id, request = item
+            current.value = request_id.encode("ascii")
+            try:
+                api.recognize(request)
+                responses.put((request_id, None))
+            except Exception as exc:
+                responses.put((request_id, str(exc) or type(exc).__name__))
+            current.value = b""
+            pages += 1
+            # Exit between pages; the pool starts a fresh worker.
+            if pages >= max_pages or _peak_rss_mb() > max_rss_mb:
+                return
+    finally:
+        api.close()
+
+
+class _EngineGroup:
+    # Workers sharing one (language set, OEM); a page goes to whichever
+    # worker is free next. Workers are started for waiting pages, up to
+    # workers_per_group and the pool's limit across all groups.
+    def __init__(self, pool: TesseractPool, lang: str, oem: int) -> None:
+        self._pool = pool
+        self.lang = lang
+        self.oem = oem
+        context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._requests = context.Queue()
+        self._responses = context.Queue()
+        # Each worker with the shared id of the request it is on.
+        self._processes: list[tuple[multiprocessing.Process, ctypes.Array]] = []
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._crashes = 0
+        self.error: Optional[str] = None
+        self._router = threading.Thread(target=self._route, name=f"textlayer-tess-{lang}", daemon=True)
+        self._router.start()
+
+    def submit(self, request: RecognitionRequest) -> Future:
+        future: Future = Future()
+        request_id = uuid.uuid4().hex
+        with self._lock:
+            if self.error:
+                future.set_exception(TesseractLibraryError(self.error))
+                return future
+            self._futures[request_id] = future
+            self._maintain_locked()
+        self._requests.put((request_id, request))
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for _ in self._processes:
+                self._requests.put(None)
+            processes = [process for process, _ in self._processes]
+            self._processes = []
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            self._pool._release_worker()
+
+    def _maintain_locked(self) -> None:
+        # Drop workers that recycled themselves, went idle (exit code 0) or
+        # died, and start workers for the pages waiting.
+        alive = []
+        for process, current in self._processes:
+            if process.is_alive():
+                alive.append((process, current))
+                continue
+            self._pool._release_worker()
+            if not process.exitcode:
+                continue
+            self._crashes += 1
+            # Fail the page the worker died on now instead of leaving its
+            # caller to wait for the timeout.
+            future = self._futures.pop(current.value.decode("ascii"), None)
+            if future is not None:
+                future.set_exception(
+                    TesseractLibraryError(f"Tesseract worker for '{self.lang}' died with exit code {process.exitcode}.")
+                )
+        self._processes = alive
+        if self._crashes >= _MAX_CRASHES and not self.error:
+            # Workers keep dying without answering; stop respawning and let
+            # callers fall back to the tesseract command.
+            self._fail_locked(f"Tesseract workers for '{self.lang}' keep crashing.")
+        wanted = min(self._pool.workers_per_group, len(self._futures))
+        while not self._closed and not self.error and len(self._processes) < wanted:
+            # A group with waiting pages always gets one worker, so a busy
+            # language cannot starve the others.
+            if not self._pool._claim_worker(first=not self._processes):
+                break
+            current = self._context.Array("c", _REQUEST_ID_SIZE, lock=False)
+            process = self._context.Process(
+                target=_worker_main,
+                args=(
+                    self._pool.library_path,
+                    self._pool.datapath,
+                    self.lang,
+                    self.oem,
+                    self._requests,
+                    self._responses,
+                    current,
+                    self._pool.max_pages,
+                    self._pool.max_rss_mb,
+                    self._pool.idle_seconds,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append((process, current))
+
+    def _route(self) -> None:
+        while not self._closed:
+            try:
+                request_id, error = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    self._maintain_locked()
+                continue
+            with self._lock:
+                if request_id is None:
+                    # A worker could not initialize; fail fast from now on.
+                    self._fail_locked(error)
+                    continue
+                self._crashes = 0
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(TesseractLibraryError(error))
+            else:
+                future.set_result(None)
+
+    def _fail_locked(self, error: str) -> None:
+        self.error = error
+        for future in self._futures.values():
+            future.set_exception(TesseractLibraryError(error))
+        self._futures.clear()
+
+
+class TesseractPool:
+    def __init__(
+        self,
+        library_path: str,
+        datapath: Optional[str] = None,
+        workers_per_group: Optional[int] = None,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        max_rss_mb: int = DEFAULT_MAX_RSS_MB,
+        max_workers: Optional[int] = None,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+    ) -> None:
+        self.library_path = library_path
+        self.datapath = datapath
+        self.workers_per_group = max(1, workers_per_group or os.cpu_count() or 1)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        # Workers across all groups; each holds a loaded model, so several
+        # languages must not multiply them.
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.idle_seconds = idle_seconds
+        self._groups: dict[tuple, _EngineGroup] = {}
+        self._lock = threading.Lock()
+        self._workers = 0
+        # Taken inside a group's lock, never the other way round.
+        self._workers_lock = threading.Lock()
+
+    def recognize(self, request: RecognitionRequest, timeout: Optional[float] = None) -> None:
+        key = request.engine_key()
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _EngineGroup(self, request.lang, request.oem)
+        group.submit(request).result(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            groups = list(self._groups.values())
+            self._groups.clear()
+        for group in groups:
+            group.close()
+
+    def _claim_worker(self, first: bool) -> bool:
+        # first: the group has no worker yet and gets one beyond the limit.
+        with self._workers_lock:
+            if not first and self._workers >= self.max_workers:
+                return False
+            self._workers += 1
+            return True
+
+    def _release_worker(self) -> None:
+        with self._workers_lock:
+            self._workers -= 1
+
+
+@dataclass
+class PoolServer:
+    pool: TesseractPool
+    address: tuple[str, int]
+    authkey: bytes
+    server: object = field(repr=False, default=None)
+
+
+_server: Optional[PoolServer] = None
+_server_lock = threading.Lock()
+
+
+def get_pool_server(tesseract_path: str = "") -> PoolServer:
+    # One pool per TextLayer process, shared by every conversion it runs and
+    # reached by ocrmypdf's page workers over a local socket.
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        library_path = find_library(tesseract_path)
+        if not library_path:
+            raise TesseractLibraryError("libtesseract not found.")
+        datapath = None
+        if tesseract_path and os.path.isdir(os.path.join(os.path.dirname(tesseract_path), "tessdata")):
+            datapath = os.path.join(os.path.dirname(tesseract_path), "tessdata")
+        pool = TesseractPool(library_path, datapath)
+        authkey = secrets.token_bytes(16)
+        manager_cls = type("_PoolManager", (BaseManager,), {})
+        manager_cls.register("pool", callable=lambda: pool)
+        server = manager_cls(address=("127.0.0.1", 0), authkey=authkey).get_server()
+        threading.Thread(target=server.serve_forever, name="textlayer-tess-pool", daemon=True).start()
+        _server = PoolServer(pool, server.address, authkey, server)
+        logger.info("Persistent Tesseract pool listening on %s:%d", *server.address)
+        return _server
+
+
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register("pool")
+_client = None
+_client_lock = threading.Lock()
+
+
+def connect_pool(address: tuple[str, int], authkey: bytes):
+    # Cached per process: ocrmypdf reuses its page workers for many pages.
+    global _client
+    with _client_lock:
+        if _client is None:
+            manager = _ClientManager(address=address, authkey=authkey)
+            manager.connect()
+            _client = manager.pool()
+        return _client
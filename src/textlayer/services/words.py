@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+# Word-level OCR results: one table per document, stored column by column so
+# downstream tools can load coordinates for millions of words without
+# parsing XML. hOCR and ALTO are rendered from the same table.
+
+WORD_FORMATS = ("npz", "hocr", "alto")
+_SUFFIXES = {"npz": ".words.npz", "hocr": ".hocr", "alto": ".alto.xml"}
+_PAGE_HOCR = "page-{:06d}.hocr"
+_PAGE_HOCR_RE = re.compile(r"page-(\d{6})\.hocr$")
+_LINE_CLASSES = {"ocr_line", "ocr_caption", "ocr_header", "ocr_textfloat"}
+_BBOX_RE = re.compile(r"bbox\s+(-?\d+)\s+(-?\d+)\s+(-?\d+)\s+(-?\d+)")
+_WCONF_RE = re.compile(r"x_wconf\s+(\d+)")
+_ALTO_NS = "http://www.loc.gov/standards/alto/ns-v4#"
+
+
+@dataclass
+class WordTable:
+    # Per word (n rows). Coordinates are OCR image pixels, top-left origin;
+    # scale by page_sizes to map onto the PDF page.
+    page: np.ndarray  # int32, zero-based page index
+    block: np.ndarray  # int32, paragraph number within the page
+    line: np.ndarray  # int32, line number within the page
+    bbox: np.ndarray  # int32 (n, 4): x0, y0, x1, y1
+    conf: np.ndarray  # int8, 0-100, -1 when Tesseract gave none
+    text_offsets: np.ndarray  # int64 (n + 1) into text_blob
+    text_blob: np.ndarray  # uint8, UTF-8 words back to back
+    # Per page (m rows): OCR image width and height in pixels.
+    page_sizes: np.ndarray  # int32 (m, 2)
+
+    def __len__(self) -> int:
+        return len(self.page)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_sizes)
+
+    def text(self, index: int) -> str:
+        start, end = self.text_offsets[index], self.text_offsets[index + 1]
+        return self.text_blob[start:end].tobytes().decode("utf-8")
+
+    def page_rows(self, page: int) -> range:
+        # Rows are stored in page order, so each page is one slice.
+        start, end = np.searchsorted(self.page, [page, page + 1])
+        return range(int(start), int(end))
+
+    @classmethod
+    def empty(cls, page_count: int = 0) -> WordTable:
+        return _build_table([], np.zeros((page_count, 2), dtype=np.int32))
+
+    @classmethod
+    def concat(cls, tables: list[WordTable]) -> WordTable:
+        # Page indices continue from one table to the next.
+        if not tables:
+            return cls.empty()
+        page_base = np.cumsum([0] + [table.page_count for table in tables[:-1]])
+        text_base = np.cumsum([0] + [len(table.text_blob) for table in tables[:-1]])
+        return cls(
+            page=np.concatenate([table.page + base for table, base in zip(tables, page_base)]).astype(np.int32),
+            block=np.concatenate([table.block for table in tables]),
+            line=np.concatenate([table.line for table in tables]),
+            bbox=np.concatenate([table.bbox for table in tables]).reshape(-1, 4),
+            conf=np.concatenate([table.conf for table in tables]),
+            text_offsets=np.concatenate(
+                [np.zeros(1, dtype=np.int64)]
+                + [table.text_offsets[1:] + base for table, base in zip(tables, text_base)]
+            ),
+            text_blob=np.concatenate([table.text_blob for table in tables]),
+            page_sizes=np.concatenate([table.page_sizes for table in tables]).reshape(-1, 2),
+        )
+
+
+def page_hocr_path(words_dir: str, page_number: int) -> str:
+    # page_number is one-based, like ocrmypdf's work files.
+    return os.path.join(words_dir, _PAGE_HOCR.format(page_number))
+
+
+def word_output_paths(prefix: str, formats: tuple[str, ...] = WORD_FORMATS) -> dict[str, str]:
+    return {fmt: prefix + _SUFFIXES[fmt] for fmt in formats}
+
+
+def collect_words(words_dir: str, page_count: int) -> WordTable:
+    # Pages without hOCR (skipped or already had text) stay in the table as
+    # pages with no words, so page indices match the PDF.
+    page_sizes = np.zeros((page_count, 2), dtype=np.int32)
+    rows = []
+    for name in sorted(os.listdir(words_dir)):
+        match = _PAGE_HOCR_RE.match(name)
+        if not match:
+            continue
+        page = int(match.group(1)) - 1
+        if not 0 <= page < page_count:
+            continue
+        with open(os.path.join(words_dir, name), "rb") as handle:
+            size, words = parse_hocr(handle.read())
+        page_sizes[page] = size
+        rows.extend((page, *word) for word in words)
+    return _build_table(rows, page_sizes)
+
+
+def parse_hocr(data: bytes) -> tuple[tuple[int, int], list[tuple]]:
+    # Returns the page image size and (block, line, bbox, conf, text) rows
+    # for one Tesseract hOCR page.
+    root = ET.fromstring(data)
+    size = (0, 0)
+    words: list[tuple] = []
+    counters = {"block": -1, "line": -1}
+
+    def walk(element: ET.Element) -> None:
+        nonlocal size
+        classes = set((element.get("class") or "").split())
+        title = element.get("title") or ""
+        if "ocr_page" in classes:
+            bbox = _parse_bbox(title)
+            if bbox:
+                size = (bbox[2], bbox[3])
+        if "ocr_par" in classes:
+            counters["block"] += 1
+        if classes & _LINE_CLASSES:
+            counters["line"] += 1
+        if "ocrx_word" in classes:
+            text = "".join(element.itertext()).strip()
+            bbox = _parse_bbox(title)
+            if text and bbox:
+                match = _WCONF_RE.search(title)
+                conf = int(match.group(1)) if match else -1
+                words.append((max(0, counters["block"]), max(0, counters["line"]), bbox, conf, text))
+            return
+        for child in element:
+            walk(child)
+
+    walk(root)
+    return size, words
+
+
+def save_words(table: WordTable, path: str) -> None:
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        page=table.page,
+        block=table.block,
+        line=table.line,
+        bbox=table.bbox,
+        conf=table.conf,
+        text_offsets=table.text_offsets,
+        text_blob=table.text_blob,
+        page_sizes=table.page_sizes,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_words(path: str) -> WordTable:
+    with np.load(path) as data:
+        return WordTable(**{name: data[name] for name in data.files})
+
+
+def write_word_outputs(table: WordTable, prefix: str, formats: tuple[str, ...] = WORD_FORMATS) -> dict[str, str]:
+    paths = word_output_paths(prefix, formats)
+    if "npz" in paths:
+        save_words(table, paths["npz"])
+    if "hocr" in paths:
+        _write_streamed(paths["hocr"], _render_hocr(table))
+    if "alto" in paths:
+        _write_streamed(paths["alto"], _render_alto(table))
+    return paths
+
+
+def _build_table(rows: list[tuple], page_sizes: np.ndarray) -> WordTable:
+    encoded = [row[5].encode("utf-8") for row in rows]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return WordTable(
+        page=np.array([row[0] for row in rows], dtype=np.int32),
+        block=np.array([row[1] for row in rows], dtype=np.int32),
+        line=np.array([row[2] for row in rows], dtype=np.int32),
+        bbox=np.array([row[3] for row in rows], dtype=np.int32).reshape(-1, 4),
+        conf=np.array([row[4] for row in rows], dtype=np.int8),
+        text_offsets=offsets,
+        text_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8).copy(),
+        page_sizes=page_sizes,
+    )
+
+
+def _parse_bbox(title: str) -> Optional[tuple[int, int, int, int]]:
+    match = _BBOX_RE.search(title)
+    if not match:
+        return None
+    return tuple(int(value) for value in match.groups())
+
+
+def _write_streamed(path: str, chunks: Iterator[str]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _group_lines(table: WordTable, rows: range) -> Iterator[tuple[int, int, list[int]]]:
+    # Yields (block, line, word rows) for consecutive words of one line.
+    current: list[int] = []
+    for index in rows:
+        if current and (table.block[index], table.line[index]) != (table.block[current[0]], table.line[current[0]]):
+            yield int(table.block[current[0]]), int(table.line[current[0]]), current
+            current = []
+        current.append(index)
+    if current:
+        yield int(table.block[current[0]]), int(table.line[current[0]]), current
+
+
+def _union_bbox(table: WordTable, rows: list[int]) -> tuple[int, int, int, int]:
+    boxes = table.bbox[rows]
+    return int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max())
+
+
+def _render_hocr(table: WordTable) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"\n'
+        '    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">\n'
+        "<head>\n<title></title>\n"
+        '<meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+        '<meta name="ocr-system" content="TextLayer"/>\n'
+        '<meta name="ocr-capabilities" content="ocr_page ocr_par ocr_line ocrx_word"/>\n'
+        "</head>\n<body>\n"
+    )
+    for page in range(table.page_count):
+        width, height = (int(value) for value in table.page_sizes[page])
+        parts = [f'<div class="ocr_page" id="page_{page + 1}" title="bbox 0 0 {width} {height}; ppageno {page}">\n']
+        block = None
+        for line_block, line, rows in _group_lines(table, table.page_rows(page)):
+            if line_block != block:
+                if block is not None:
+                    parts.append("</p>\n")
+                block = line_block
+                parts.append(f'<p class="ocr_par" id="par_{page + 1}_{block + 1}">\n')
+            x0, y0, x1, y1 = _union_bbox(table, rows)
+            parts.append(f'<span class="ocr_line" id="line_{page + 1}_{line + 1}" title="bbox {x0} {y0} {x1} {y1}">')
+            for index in rows:
+                wx0, wy0, wx1, wy1 = (int(value) for value in table.bbox[index])
+                parts.append(
+                    f'<span class="ocrx_word" id="word_{page + 1}_{index + 1}" '
+                    f'title="bbox {wx0} {wy0} {wx1} {wy1}; x_wconf {max(0, int(table.conf[index]))}">'
+                    f"{escape(table.text(index))}</span> "
+                )
+            parts.append("</span>\n")
+        if block is not None:
+            parts.append("</p>\n")
+        parts.append("</div>\n")
+        yield "".join(parts)
+    yield "</body>\n</html>\n"
+
+
+def _render_alto(table: WordTable) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<alto xmlns="{_ALTO_NS}">\n'
+        "<Description><MeasurementUnit>pixel</MeasurementUnit>"
+        "<sourceImageInformation><fileName/></sourceImageInformation></Description>\n"
+        "<Layout>\n"
+    )
+    for page in range(table.page_count):
+        width, height = (int(value) for value in table.page_sizes[page])
+        parts = [
+            f'<Page ID="page_{page + 1}" PHYSICAL_IMG_NR="{page + 1}" WIDTH="{width}" HEIGHT="{height}">\n'
+            f'<PrintSpace HPOS="0" VPOS="0" WIDTH="{width}" HEIGHT="{height}">\n'
+        ]
+        blocks: dict[int, list[tuple[int, list[int]]]] = {}
+        for block, line, rows in _group_lines(table, table.page_rows(page)):
+            blocks.setdefault(block, []).append((line, rows))
+        for block, lines in blocks.items():
+            x0, y0, x1, y1 = _union_bbox(table, [index for _, rows in lines for index in rows])
+            parts.append(
+                f'<TextBlock ID="block_{page + 1}_{block + 1}" '
+                f'HPOS="{x0}" VPOS="{y0}" WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}">\n'
+            )
+            for line, rows in lines:
+                x0, y0, x1, y1 = _union_bbox(table, rows)
+                parts.append(
+                    f'<TextLine ID="line_{page + 1}_{line + 1}" '
+                    f'HPOS="{x0}" VPOS="{y0}" WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}">'
+                )
+                for position, index in enumerate(rows):
+                    if position:
+                        parts.append("<SP/>")
+                    wx0, wy0, wx1, wy1 = (int(value) for value in table.bbox[index])
+                    conf = int(table.conf[index])
+                    wc = f' WC="{conf / 100:.2f}"' if conf >= 0 else ""
+                    parts.append(
+                        f"<String CONTENT={quoteattr(table.text(index))} "
+                        f'HPOS="{wx0}" VPOS="{wy0}" WIDTH="{wx1 - wx0}" HEIGHT="{wy1 - wy0}"{wc}/>'
+                    )
+                parts.append("</TextLine>\n")
+            parts.append("</TextBlock>\n")
+        parts.append("</PrintSpace>\n</Page>\n")
+        yield "".join(parts)
+    yield "</Layout>\n</alto>\n"
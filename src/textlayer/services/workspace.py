@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+_JOB_PREFIX = "textlayer-job-"
+_MB = 1024 * 1024
+# Space left free on the temp volume for everything else on the machine.
+_RESERVE_BYTES = 512 * _MB
+# Intermediates ocrmypdf keeps per page besides the page image: hOCR, text,
+# the single-page text PDF and small temporary files.
+_PAGE_OVERHEAD_BYTES = 256 * 1024
+# Held jobs re-check free space this often; other programs free space too.
+_WAIT_POLL_SECONDS = 5.0
+# Jobs held on an event loop cannot be woken by release(), so they poll.
+_ASYNC_POLL_SECONDS = 1.0
+# How often a running job's directory is measured against its budget.
+_CHECK_INTERVAL = 2.0
+
+
+class WorkspaceBudgetError(RuntimeError):
+    pass
+
+
+@dataclass
+class WorkspaceLease:
+    job_id: int
+    path: str
+    reserved_bytes: int
+    used_bytes: int = 0
+    checked_at: float = 0.0
+
+
+class WorkspaceManager:
+    # Hands every OCR job its own directory under a configurable temp root
+    # (a RAM disk or fast local SSD) and admits jobs only while their
+    # estimated intermediates fit the global budget and the free space.
+    def __init__(self, root: str = "", job_budget_mb: int = 0, total_budget_mb: int = 0) -> None:
+        self.root = os.path.abspath(root) if root else tempfile.gettempdir()
+        self.job_budget = max(0, job_budget_mb) * _MB
+        self.total_budget = max(0, total_budget_mb) * _MB
+        self._condition = threading.Condition()
+        self._active: dict[int, WorkspaceLease] = {}
+        self._ids = itertools.count(1)
+        os.makedirs(self.root, exist_ok=True)
+        self._remove_stale()
+
+    def acquire(self, estimate_bytes: int, on_wait: Optional[Callable[[str], None]] = None) -> WorkspaceLease:
+        reserved = self._reservation(estimate_bytes)
+        with self._condition:
+            waited = False
+            while not self._fits_locked(reserved):
+                if not waited and on_wait is not None:
+                    on_wait(self._wait_message(reserved))
+                waited = True
+                self._condition.wait(_WAIT_POLL_SECONDS)
+            return self._lease_locked(reserved)
+
+    def try_acquire(self, estimate_bytes: int) -> Optional[WorkspaceLease]:
+        # Non-blocking acquire: None while the job does not fit.
+        reserved = self._reservation(estimate_bytes)
+        with self._condition:
+            if not self._fits_locked(reserved):
+                return None
+            return self._lease_locked(reserved)
+
+    async def acquire_async(
+        self, estimate_bytes: int, on_wait: Optional[Callable[[str], None]] = None
+    ) -> WorkspaceLease:
+        # Held jobs wait on the event loop instead of blocking a thread each.
+        lease = self.try_acquire(estimate_bytes)
+        if lease is None and on_wait is not None:
+            on_wait(self._wait_message(self._reservation(estimate_bytes)))
+        while lease is None:
+            await asyncio.sleep(_ASYNC_POLL_SECONDS)
+            lease = self.try_acquire(estimate_bytes)
+        return lease
+
+    def release(self, lease: WorkspaceLease) -> None:
+        # Called from finally blocks, so failed jobs are cleaned up as well.
+        shutil.rmtree(lease.path, ignore_errors=True)
+        with self._condition:
+            self._active.pop(lease.job_id, None)
+            self._condition.notify_all()
+
+    async def check_async(self, lease: WorkspaceLease, force: bool = False) -> None:
+        # Raises WorkspaceBudgetError once the job's directory outgrows its
+        # per-job budget. Cheap to call often: it measures at most every
+        # _CHECK_INTERVAL seconds, walking the directory in a worker thread
+        # so a large tree does not stall the event loop.
+        now = time.monotonic()
+        if not force and now - lease.checked_at < _CHECK_INTERVAL:
+            return
+        lease.checked_at = now
+        lease.used_bytes = await asyncio.to_thread(directory_size, lease.path)
+        if self.job_budget and lease.used_bytes > self.job_budget:
+            raise WorkspaceBudgetError(
+                f"Temp space budget exceeded ({_format_mb(lease.used_bytes)} used, "
+                f"{_format_mb(self.job_budget)} allowed per job)"
+            )
+
+    def apply_env(self, lease: WorkspaceLease, env: dict) -> None:
+        # ocrmypdf, Ghostscript and Tesseract all create their temp files
+        # through the platform temp variables.
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            env[name] = lease.path
+
+    def temp_dir(self, prefix: str) -> str:
+        # Unbudgeted scratch space (staging, probes) on the same fast volume.
+        return tempfile.mkdtemp(prefix=prefix, dir=self.root)
+
+    def release_all(self) -> None:
+        with self._condition:
+            leases = list(self._active.values())
+        for lease in leases:
+            self.release(lease)
+
+    def _reservation(self, estimate_bytes: int) -> int:
+        # A job larger than its own budget would be stopped anyway; only
+        # reserve what it is allowed to use.
+        reserved = max(0, estimate_bytes)
+        if self.job_budget:
+            reserved = min(reserved, self.job_budget)
+        return reserved
+
+    def _wait_message(self, reserved: int) -> str:
+        return f"Waiting for temp space ({_format_mb(reserved)} needed in {self.root})..."
+
+    def _lease_locked(self, reserved: int) -> WorkspaceLease:
+        job_id = next(self._ids)
+        path = tempfile.mkdtemp(prefix=f"{_JOB_PREFIX}{os.getpid()}-{job_id}-", dir=self.root)
+        lease = WorkspaceLease(job_id=job_id, path=path, reserved_bytes=reserved)
+        self._active[job_id] = lease
+        logger.info("Workspace: job %d gets %s (reserved %s)", job_id, path, _format_mb(reserved))
+        return lease
+
+    def _fits_locked(self, reserved: int) -> bool:
+        if not self._active:
+            # Never hold a job when nothing else runs; it could wait forever.
+            return True
+        # Space promised to running jobs that they have not written yet.
+        outstanding = sum(max(0, lease.reserved_bytes - lease.used_bytes) for lease in self._active.values())
+        if self.total_budget and sum(lease.reserved_bytes for lease in self._active.values()) + reserved > self.total_budget:
+            return False
+        try:
+            free = shutil.disk_usage(self.root).free
+        except OSError:
+            return True
+        return free - outstanding - _RESERVE_BYTES >= reserved
+
+    def _remove_stale(self) -> None:
+        # Directories of processes that crashed or were killed mid-job.
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.startswith(_JOB_PREFIX):
+                continue
+            try:
+                pid = int(entry.name[len(_JOB_PREFIX):].split("-", 1)[0])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not pid_alive(pid):
+                logger.info("Removing stale workspace %s", entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def estimate_job_bytes(input_bytes: int, pages: int, megapixels: float = 0.0, color: str = "unknown") -> int:
+    # ocrmypdf keeps every page image until the output is assembled, plus a
+    # copy of the input and the intermediate output PDF.
+    bytes_per_pixel = 1 if color == "gray" else 3
+    return int(megapixels * 1e6 * bytes_per_pixel + 2 * input_bytes + pages * _PAGE_OVERHEAD_BYTES)
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        # Files come and go while ocrmypdf runs.
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        try:
+            import ctypes
+
+            # PROCESS_QUERY_LIMITED_INFORMATION
+            handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+            if not handle:
+                return False
+            ctypes.windll.kernel32.CloseHandle(handle)
+            return True
+        except Exception:
+            return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else.
+        return True
+    return True
+
+
+def _format_mb(value: int) -> str:
+    return f"{value / _MB:.0f} MB"
+
+
+_workspace: Optional[WorkspaceManager] = None
+_workspace_lock = threading.Lock()
+
+
+def configure_workspace(root: str = "", job_budget_mb: int = 0, total_budget_mb: int = 0) -> WorkspaceManager:
+    global _workspace
+    manager = WorkspaceManager(root, job_budget_mb, total_budget_mb)
+    with _workspace_lock:
+        _workspace = manager
+    return manager
+
+
+def get_workspace() -> WorkspaceManager:
+    global _workspace
+    with _workspace_lock:
+        if _workspace is None:
+            _workspace = WorkspaceManager()
+        return _workspace
+
+
+@atexit.register
+def _cleanup() -> None:
+    # Closing the app or Ctrl+C mid-job still removes the job directories.
+    if _workspace is not None:
+        _workspace.release_all()
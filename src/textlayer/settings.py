@@ -43,7 +43,7 @@ class SettingsManager:
         self._settings.setValue("ocr/language", lang)
 
     def get_output_type(self) -> str:
-        # "pdfa" (default) or "pdf"
+        # "pdfa" (default), "pdfa_fast", or "pdf"
         return self._settings.value("output/type", "pdfa")
 
     def set_output_type(self, value: str) -> None:
@@ -55,3 +55,147 @@ class SettingsManager:
 
     def set_color_strategy(self, value: str) -> None:
         self._settings.setValue("output/color_strategy", value)
+
+    def get_preprocess_mode(self) -> str:
+        # "none" (default), "auto", or "binarize"
+        return self._settings.value("ocr/preprocess", "none")
+
+    def set_preprocess_mode(self, value: str) -> None:
+        self._settings.setValue("ocr/preprocess", value)
+
+    def get_preprocess_target_dpi(self) -> int:
+        try:
+            return int(self._settings.value("ocr/preprocess_target_dpi", 300))
+        except (TypeError, ValueError):
+            return 300
+
+    def set_preprocess_target_dpi(self, value: int) -> None:
+        self._settings.setValue("ocr/preprocess_target_dpi", value)
+
+    def get_optimize_preset(self) -> str:
+        # "none", "fast" (default), "balanced", or "max"
+        return self._settings.value("output/optimize", "fast")
+
+    def set_optimize_preset(self, value: str) -> None:
+        self._settings.setValue("output/optimize", value)
+
+    def get_word_output(self) -> bool:
+        # Write word boxes (.words.npz, .hocr, .alto.xml) next to the output.
+        return self._settings.value("output/words", False, type=bool)
+
+    def set_word_output(self, value: bool) -> None:
+        self._settings.setValue("output/words", value)
+
+    def get_ocr_engine(self) -> str:
+        # "cli" (default, one tesseract process per page) or "persistent"
+        return self._settings.value("ocr/engine", "cli")
+
+    def set_ocr_engine(self, value: str) -> None:
+        self._settings.setValue("ocr/engine", value)
+
+    def get_rasterizer(self) -> str:
+        # "default" (OCRmyPDF's own), "pymupdf" or "embedded"
+        return self._settings.value("ocr/rasterizer", "default")
+
+    def set_rasterizer(self, value: str) -> None:
+        self._settings.setValue("ocr/rasterizer", value)
+
+    def get_timeout_seconds(self) -> float:
+        # Wall-clock limit per OCRmyPDF run; 0 derives it from the estimate.
+        try:
+            return float(self._settings.value("ocr/timeout_seconds", 0))
+        except (TypeError, ValueError):
+            return 0.0
+
+    def set_timeout_seconds(self, value: float) -> None:
+        self._settings.setValue("ocr/timeout_seconds", value)
+
+    def get_stall_seconds(self) -> float:
+        # Stop a run that shows neither output nor CPU use for this long.
+        try:
+            return float(self._settings.value("ocr/stall_seconds", 600))
+        except (TypeError, ValueError):
+            return 600.0
+
+    def set_stall_seconds(self, value: float) -> None:
+        self._settings.setValue("ocr/stall_seconds", value)
+
+    def get_memory_limit_mb(self) -> int:
+        # Memory limit for the OCR process tree; 0 allows 80% of RAM.
+        try:
+            return int(self._settings.value("ocr/memory_limit_mb", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def set_memory_limit_mb(self, value: int) -> None:
+        self._settings.setValue("ocr/memory_limit_mb", value)
+
+    def get_adaptive_ocr(self) -> bool:
+        # Fast first pass, then re-OCR only low-confidence pages.
+        return self._settings.value("ocr/adaptive", False, type=bool)
+
+    def set_adaptive_ocr(self, value: bool) -> None:
+        self._settings.setValue("ocr/adaptive", value)
+
+    def get_refine_threshold(self) -> float:
+        # Pages with a mean word confidence below this get a second pass.
+        try:
+            return float(self._settings.value("ocr/refine_threshold", 70))
+        except (TypeError, ValueError):
+            return 70.0
+
+    def set_refine_threshold(self, value: float) -> None:
+        self._settings.setValue("ocr/refine_threshold", value)
+
+    def get_blank_pages(self) -> str:
+        # "off" (OCR every page, the default), "skip" (no OCR on blank
+        # pages), "drop" (remove them)
+        return self._settings.value("ocr/blank_pages", "off")
+
+    def set_blank_pages(self, value: str) -> None:
+        self._settings.setValue("ocr/blank_pages", value)
+
+    def get_incremental_output(self) -> bool:
+        # Plain PDF output as the input plus an appended text layer.
+        return self._settings.value("output/incremental", False, type=bool)
+
+    def set_incremental_output(self, value: bool) -> None:
+        self._settings.setValue("output/incremental", value)
+
+    def get_temp_dir(self) -> str:
+        # Root for job intermediates, e.g. a RAM disk; "" is the system temp.
+        return self._settings.value("workspace/temp_dir", "")
+
+    def set_temp_dir(self, path: str) -> None:
+        self._settings.setValue("workspace/temp_dir", path)
+
+    def get_job_temp_budget_mb(self) -> int:
+        # Largest temp space one job may use; 0 means no limit.
+        try:
+            return int(self._settings.value("workspace/job_budget_mb", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def set_job_temp_budget_mb(self, value: int) -> None:
+        self._settings.setValue("workspace/job_budget_mb", value)
+
+    def get_total_temp_budget_mb(self) -> int:
+        # Temp space shared by all running jobs; 0 means free space only.
+        try:
+            return int(self._settings.value("workspace/total_budget_mb", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def set_total_temp_budget_mb(self, value: int) -> None:
+        self._settings.setValue("workspace/total_budget_mb", value)
+
+    def get_checkpoint_pages(self) -> int:
+        # Pages per resumable range; 0 (the default) runs each document in
+        # one OCRmyPDF pass.
+        try:
+            return int(self._settings.value("ocr/checkpoint_pages", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def set_checkpoint_pages(self, value: int) -> None:
+        self._settings.setValue("ocr/checkpoint_pages", value)
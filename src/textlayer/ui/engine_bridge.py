@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from textlayer.services.engine import EngineJob, OCREngine
+from textlayer.services.ocr_service import OCRTask
+
+logger = logging.getLogger(__name__)
+
+
+# How long closing the window waits for cancelled jobs to clean up.
+_SHUTDOWN_TIMEOUT = 10.0
+
+
+class EngineBridge(QObject):
+    # Qt face of the OCR engine. The engine's event loop runs on one
+    # background thread; signals emitted there reach slots on the GUI
+    # thread through queued connections.
+    progress = Signal(int, str)
+    # Emitted with an OCRReport right before a successful `finished`.
+    report = Signal(object)
+    finished = Signal(bool, str, str, str)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="textlayer-engine", daemon=True)
+        self._thread.start()
+        self.engine = OCREngine()
+        self._jobs: list[EngineJob] = []
+
+    def start(self, task: OCRTask) -> None:
+        asyncio.run_coroutine_threadsafe(self._run(task), self._loop)
+
+    def cancel(self) -> None:
+        self._loop.call_soon_threadsafe(self._cancel_all)
+
+    def shutdown(self) -> None:
+        # Cancels running jobs, waits for their process trees and temp
+        # space to go, then stops the loop. No signals after this.
+        self.blockSignals(True)
+        if self._loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.engine.shutdown(), self._loop)
+        try:
+            future.result(_SHUTDOWN_TIMEOUT)
+        except Exception:
+            logger.warning("OCR engine did not shut down cleanly", exc_info=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(_SHUTDOWN_TIMEOUT)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    async def _run(self, task: OCRTask) -> None:
+        job = self.engine.submit(task, self.progress.emit)
+        self._jobs.append(job)
+        try:
+            result = await job.wait()
+        finally:
+            self._jobs.remove(job)
+            self.engine.jobs.pop(job.job_id, None)
+        if result.report is not None:
+            self.report.emit(result.report)
+        self.finished.emit(result.success, result.message, result.output_pdf, result.output_txt)
+
+    def _cancel_all(self) -> None:
+        for job in self._jobs:
+            job.cancel()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+import re
+from collections import deque
+
+from PySide6.QtCore import QTimer, QUrl
+from PySide6.QtGui import QDesktopServices
+from PySide6.QtWidgets import (
+    QComboBox,
+    QHBoxLayout,
+    QMessageBox,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from textlayer.logging_config import log_file_path
+
+# Lines kept in memory and on screen; the full log stays on disk.
+MAX_LINES = 5000
+# Lines arriving within one interval are painted with a single append.
+FLUSH_INTERVAL_MS = 100
+
+_ERROR_RE = re.compile(r"\b(error|exception|traceback|failed)\b", re.IGNORECASE)
+_WARNING_RE = re.compile(r"\b(warning|warn)\b", re.IGNORECASE)
+
+
+def guess_level(text: str) -> int:
+    # ocrmypdf and Tesseract output arrives as plain lines without levels.
+    if _ERROR_RE.search(text):
+        return logging.ERROR
+    if _WARNING_RE.search(text):
+        return logging.WARNING
+    return logging.INFO
+
+
+class LogView(QWidget):
+    # Status log with a ring-buffer cap and timer-batched painting, so chatty
+    # jobs cost one widget update per interval instead of one per line.
+    def __init__(self, parent: QWidget | None = None, max_lines: int = MAX_LINES) -> None:
+        super().__init__(parent)
+        self._entries: deque[tuple[int, str]] = deque(maxlen=max_lines)
+        self._pending: list[tuple[int, str]] = []
+        self._min_level = logging.INFO
+
+        self.level_combo = QComboBox()
+        self.level_combo.addItem(self.tr("All"), logging.INFO)
+        self.level_combo.addItem(self.tr("Warnings and errors"), logging.WARNING)
+        self.level_combo.addItem(self.tr("Errors only"), logging.ERROR)
+        self.open_log_btn = QPushButton(self.tr("Open Full Log"))
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        # Qt drops the oldest blocks itself once the cap is reached.
+        self.text.setMaximumBlockCount(max_lines)
+
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(self.level_combo)
+        toolbar.addStretch(1)
+        toolbar.addWidget(self.open_log_btn)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.text)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(FLUSH_INTERVAL_MS)
+        self._timer.timeout.connect(self.flush)
+        self.level_combo.currentIndexChanged.connect(self._on_level_changed)
+        self.open_log_btn.clicked.connect(self.open_full_log)
+
+    def append(self, text: str, level: int | None = None) -> None:
+        entry = (guess_level(text) if level is None else level, text)
+        self._entries.append(entry)
+        self._pending.append(entry)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        self._timer.stop()
+        # The ring buffer may already have dropped part of a huge burst.
+        pending = self._pending[-self._entries.maxlen:]
+        self._pending = []
+        lines = [text for level, text in pending if level >= self._min_level]
+        if lines:
+            self.text.appendPlainText("\n".join(lines))
+            scrollbar = self.text.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._pending = []
+        self.text.clear()
+
+    def open_full_log(self) -> None:
+        path = log_file_path().resolve()
+        if not path.exists() or not QDesktopServices.openUrl(QUrl.fromLocalFile(str(path))):
+            QMessageBox.information(self, "TextLayer", self.tr("Log file: {path}").format(path=path))
+
+    def retranslate(self) -> None:
+        self.level_combo.setItemText(0, self.tr("All"))
+        self.level_combo.setItemText(1, self.tr("Warnings and errors"))
+        self.level_combo.setItemText(2, self.tr("Errors only"))
+        self.open_log_btn.setText(self.tr("Open Full Log"))
+
+    def _on_level_changed(self) -> None:
+        self._min_level = self.level_combo.currentData() or logging.INFO
+        self._pending = []
+        # Re-render from the buffer; bounded by the cap, so this stays cheap.
+        self.text.setPlainText("\n".join(text for level, text in self._entries if level >= self._min_level))
+        scrollbar = self.text.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import dataclasses
 import json
 import logging
 import os
 import shutil
+import sqlite3
 import sys
+import time
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QThread
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtWidgets import QApplication
 from PySide6.QtWidgets import (
     QComboBox,
@@ -19,7 +22,6 @@ from PySide6.QtWidgets import (
     QMainWindow,
     QMessageBox,
     QPushButton,
-    QPlainTextEdit,
     QFileDialog,
     QVBoxLayout,
     QWidget,
@@ -29,10 +31,21 @@ from textlayer.i18n import I18nManager
 from textlayer.font_utils import pick_font_for_language
 from textlayer.settings import SettingsManager
 from textlayer.services.detection import detect_file, format_file_info
-from textlayer.services.ocr_service import OCRTask, OCRWorker
+from textlayer.services.input_source import InputSource
+from textlayer.services.engine import CANCELLED_MESSAGE
+from textlayer.services.journal import JobJournal
+from textlayer.services.ocr_service import OCRReport, OCRResult, OCRTask
+from textlayer.services.workspace import configure_workspace
+from textlayer.ui.engine_bridge import EngineBridge
+from textlayer.ui.log_view import LogView
+from textlayer.ui.preview_panel import PreviewPanel
+from textlayer.utils import format_bytes
 
 logger = logging.getLogger(__name__)
 
+# Journal batch of conversions started from the window.
+_JOURNAL_BATCH = "gui"
+
 
 class DropArea(QFrame):
     def __init__(self, label: QLabel, path_label: QLabel) -> None:
@@ -69,9 +82,21 @@ class MainWindow(QMainWindow):
         self.custom_output_path = ""
         self.last_text_path = ""
         self.current_detection = None
-
-        self.worker_thread: QThread | None = None
-        self.worker: OCRWorker | None = None
+        # The selected file is read once and shared by detection and OCR.
+        self.current_source: InputSource | None = None
+        self.worker_source: InputSource | None = None
+
+        # Conversions run on the asyncio OCR engine, off the GUI thread.
+        self.engine = EngineBridge(self)
+        # Each conversion is recorded in the job journal, so one cut short
+        # by a crash can be resumed at the next start.
+        self.journal: JobJournal | None = None
+        try:
+            self.journal = JobJournal()
+        except (OSError, sqlite3.Error):
+            logger.warning("Job journal is not available", exc_info=True)
+        self.journal_id: int | None = None
+        self.job_started = 0.0
 
         self.setWindowTitle("TextLayer")
         self.resize(1100, 650)
@@ -80,6 +105,7 @@ class MainWindow(QMainWindow):
         self._load_settings()
         self._wire_events()
         self._update_progress(0, self.tr("Idle"))
+        QTimer.singleShot(0, self._offer_resume)
 
     def _build_ui(self) -> None:
         central = QWidget()
@@ -121,9 +147,23 @@ class MainWindow(QMainWindow):
         input_layout.addWidget(self.browse_btn)
         left_layout.addWidget(self.input_group)
 
+        self.preview_group = QGroupBox(self.tr("Pages"))
+        preview_layout = QVBoxLayout(self.preview_group)
+        self.preview_panel = PreviewPanel()
+        preview_layout.addWidget(self.preview_panel)
+        left_layout.addWidget(self.preview_group)
+
         self.convert_btn = QPushButton(self.tr("Convert"))
         self.convert_btn.setFixedHeight(48)
-        left_layout.addWidget(self.convert_btn, alignment=Qt.AlignHCenter)
+        self.cancel_btn = QPushButton(self.tr("Cancel"))
+        self.cancel_btn.setFixedHeight(48)
+        self.cancel_btn.setEnabled(False)
+        convert_row = QHBoxLayout()
+        convert_row.addStretch(1)
+        convert_row.addWidget(self.convert_btn)
+        convert_row.addWidget(self.cancel_btn)
+        convert_row.addStretch(1)
+        left_layout.addLayout(convert_row)
 
         output_frame = QFrame()
         output_layout = QVBoxLayout(output_frame)
@@ -133,6 +173,7 @@ class MainWindow(QMainWindow):
         ocr_lang_row = QHBoxLayout()
         self.ocr_language_label = QLabel(self.tr("OCR Language"))
         self.ocr_language_combo = QComboBox()
+        self.ocr_language_combo.addItem(self.tr("Auto"), "auto")
         self.ocr_language_combo.addItem("English", "eng")
         self.ocr_language_combo.addItem("简体中文", "chi_sim")
         self.ocr_language_combo.addItem("繁體中文", "chi_tra")
@@ -145,6 +186,7 @@ class MainWindow(QMainWindow):
         self.output_type_label = QLabel(self.tr("Output Type"))
         self.output_type_combo = QComboBox()
         self.output_type_combo.addItem("PDF/A (default)", "pdfa")
+        self.output_type_combo.addItem("PDF/A (fast)", "pdfa_fast")
         self.output_type_combo.addItem("PDF", "pdf")
         output_type_row.addWidget(self.output_type_label)
         output_type_row.addWidget(self.output_type_combo)
@@ -160,6 +202,83 @@ class MainWindow(QMainWindow):
         color_row.addWidget(self.color_strategy_combo)
         output_layout.addLayout(color_row)
 
+        preprocess_row = QHBoxLayout()
+        self.preprocess_label = QLabel(self.tr("Preprocessing"))
+        self.preprocess_combo = QComboBox()
+        self.preprocess_combo.addItem(self.tr("Off"), "none")
+        self.preprocess_combo.addItem(self.tr("Auto"), "auto")
+        self.preprocess_combo.addItem(self.tr("Auto + Binarize"), "binarize")
+        preprocess_row.addWidget(self.preprocess_label)
+        preprocess_row.addWidget(self.preprocess_combo)
+        output_layout.addLayout(preprocess_row)
+
+        optimize_row = QHBoxLayout()
+        self.optimize_label = QLabel(self.tr("Optimization"))
+        self.optimize_combo = QComboBox()
+        self.optimize_combo.addItem(self.tr("None"), "none")
+        self.optimize_combo.addItem(self.tr("Fast"), "fast")
+        self.optimize_combo.addItem(self.tr("Balanced"), "balanced")
+        self.optimize_combo.addItem(self.tr("Max"), "max")
+        optimize_row.addWidget(self.optimize_label)
+        optimize_row.addWidget(self.optimize_combo)
+        output_layout.addLayout(optimize_row)
+
+        words_row = QHBoxLayout()
+        self.words_label = QLabel(self.tr("Word Data"))
+        self.words_combo = QComboBox()
+        self.words_combo.addItem(self.tr("Off"), False)
+        self.words_combo.addItem("hOCR + ALTO + NPZ", True)
+        words_row.addWidget(self.words_label)
+        words_row.addWidget(self.words_combo)
+        output_layout.addLayout(words_row)
+
+        engine_row = QHBoxLayout()
+        self.engine_label = QLabel(self.tr("OCR Engine"))
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem(self.tr("Per page"), "cli")
+        self.engine_combo.addItem(self.tr("Persistent"), "persistent")
+        engine_row.addWidget(self.engine_label)
+        engine_row.addWidget(self.engine_combo)
+        output_layout.addLayout(engine_row)
+
+        rasterizer_row = QHBoxLayout()
+        self.rasterizer_label = QLabel(self.tr("Page Rendering"))
+        self.rasterizer_combo = QComboBox()
+        self.rasterizer_combo.addItem(self.tr("OCRmyPDF"), "default")
+        self.rasterizer_combo.addItem(self.tr("PyMuPDF"), "pymupdf")
+        self.rasterizer_combo.addItem(self.tr("Embedded Images"), "embedded")
+        rasterizer_row.addWidget(self.rasterizer_label)
+        rasterizer_row.addWidget(self.rasterizer_combo)
+        output_layout.addLayout(rasterizer_row)
+
+        passes_row = QHBoxLayout()
+        self.passes_label = QLabel(self.tr("OCR Passes"))
+        self.passes_combo = QComboBox()
+        self.passes_combo.addItem(self.tr("Single"), False)
+        self.passes_combo.addItem(self.tr("Adaptive"), True)
+        passes_row.addWidget(self.passes_label)
+        passes_row.addWidget(self.passes_combo)
+        output_layout.addLayout(passes_row)
+
+        blank_row = QHBoxLayout()
+        self.blank_label = QLabel(self.tr("Blank Pages"))
+        self.blank_combo = QComboBox()
+        self.blank_combo.addItem(self.tr("OCR"), "off")
+        self.blank_combo.addItem(self.tr("Skip OCR"), "skip")
+        self.blank_combo.addItem(self.tr("Remove"), "drop")
+        blank_row.addWidget(self.blank_label)
+        blank_row.addWidget(self.blank_combo)
+        output_layout.addLayout(blank_row)
+
+        writing_row = QHBoxLayout()
+        self.writing_label = QLabel(self.tr("PDF Writing"))
+        self.writing_combo = QComboBox()
+        self.writing_combo.addItem(self.tr("Rewrite"), False)
+        self.writing_combo.addItem(self.tr("Append to Input"), True)
+        writing_row.addWidget(self.writing_label)
+        writing_row.addWidget(self.writing_combo)
+        output_layout.addLayout(writing_row)
+
         output_row = QHBoxLayout()
         self.output_dir_edit = QLineEdit()
         self.output_dir_edit.setReadOnly(True)
@@ -213,14 +332,14 @@ class MainWindow(QMainWindow):
         status_layout.addWidget(self._row(self.ocr_label, self.ocr_value))
         status_layout.addWidget(self._row(self.output_label_right, self.output_value))
 
-        self.status_log = QPlainTextEdit()
-        self.status_log.setReadOnly(True)
+        self.status_log = LogView()
         status_layout.addWidget(self.status_log)
 
         right_layout.addWidget(self.status_group)
 
         menu = self.menuBar().addMenu(self.tr("Preferences"))
         self.set_tesseract_action = menu.addAction(self.tr("Set Tesseract Path..."))
+        self.set_temp_dir_action = menu.addAction(self.tr("Set Temp Folder..."))
         help_menu = self.menuBar().addMenu("?")
         self.about_action = help_menu.addAction(self.tr("About"))
 
@@ -253,10 +372,40 @@ class MainWindow(QMainWindow):
         color_index = self.color_strategy_combo.findData(color_strategy)
         if color_index >= 0:
             self.color_strategy_combo.setCurrentIndex(color_index)
+        preprocess = self.settings.get_preprocess_mode()
+        preprocess_index = self.preprocess_combo.findData(preprocess)
+        if preprocess_index >= 0:
+            self.preprocess_combo.setCurrentIndex(preprocess_index)
+        optimize = self.settings.get_optimize_preset()
+        optimize_index = self.optimize_combo.findData(optimize)
+        if optimize_index >= 0:
+            self.optimize_combo.setCurrentIndex(optimize_index)
+        words_index = self.words_combo.findData(self.settings.get_word_output())
+        if words_index >= 0:
+            self.words_combo.setCurrentIndex(words_index)
+        engine_index = self.engine_combo.findData(self.settings.get_ocr_engine())
+        if engine_index >= 0:
+            self.engine_combo.setCurrentIndex(engine_index)
+        rasterizer_index = self.rasterizer_combo.findData(self.settings.get_rasterizer())
+        if rasterizer_index >= 0:
+            self.rasterizer_combo.setCurrentIndex(rasterizer_index)
+        passes_index = self.passes_combo.findData(self.settings.get_adaptive_ocr())
+        if passes_index >= 0:
+            self.passes_combo.setCurrentIndex(passes_index)
+        blank_index = self.blank_combo.findData(self.settings.get_blank_pages())
+        if blank_index >= 0:
+            self.blank_combo.setCurrentIndex(blank_index)
+        writing_index = self.writing_combo.findData(self.settings.get_incremental_output())
+        if writing_index >= 0:
+            self.writing_combo.setCurrentIndex(writing_index)
 
     def _wire_events(self) -> None:
         self.browse_btn.clicked.connect(self._on_browse_pdf)
         self.convert_btn.clicked.connect(self._on_convert)
+        self.cancel_btn.clicked.connect(self._on_cancel)
+        self.engine.progress.connect(self._on_progress)
+        self.engine.report.connect(self._on_report)
+        self.engine.finished.connect(self._on_finished)
         self.output_dir_btn.clicked.connect(self._on_choose_output_dir)
         self.output_save_as_btn.clicked.connect(self._on_save_as)
         self.save_text_btn.clicked.connect(self._on_save_text_as)
@@ -264,7 +413,16 @@ class MainWindow(QMainWindow):
         self.ocr_language_combo.currentIndexChanged.connect(self._on_ocr_language_changed)
         self.output_type_combo.currentIndexChanged.connect(self._on_output_type_changed)
         self.color_strategy_combo.currentIndexChanged.connect(self._on_color_strategy_changed)
+        self.preprocess_combo.currentIndexChanged.connect(self._on_preprocess_changed)
+        self.optimize_combo.currentIndexChanged.connect(self._on_optimize_changed)
+        self.words_combo.currentIndexChanged.connect(self._on_words_changed)
+        self.engine_combo.currentIndexChanged.connect(self._on_engine_changed)
+        self.rasterizer_combo.currentIndexChanged.connect(self._on_rasterizer_changed)
+        self.passes_combo.currentIndexChanged.connect(self._on_passes_changed)
+        self.blank_combo.currentIndexChanged.connect(self._on_blank_changed)
+        self.writing_combo.currentIndexChanged.connect(self._on_writing_changed)
         self.set_tesseract_action.triggered.connect(self._on_set_tesseract_path)
+        self.set_temp_dir_action.triggered.connect(self._on_set_temp_dir)
         self.about_action.triggered.connect(self._on_about)
 
     def _on_language_changed(self) -> None:
@@ -291,21 +449,67 @@ class MainWindow(QMainWindow):
         if value:
             self.settings.set_color_strategy(value)
 
+    def _on_preprocess_changed(self) -> None:
+        value = self.preprocess_combo.currentData()
+        if value:
+            self.settings.set_preprocess_mode(value)
+
+    def _on_optimize_changed(self) -> None:
+        value = self.optimize_combo.currentData()
+        if value:
+            self.settings.set_optimize_preset(value)
+
+    def _on_words_changed(self) -> None:
+        self.settings.set_word_output(bool(self.words_combo.currentData()))
+
+    def _on_engine_changed(self) -> None:
+        value = self.engine_combo.currentData()
+        if value:
+            self.settings.set_ocr_engine(value)
+
+    def _on_rasterizer_changed(self) -> None:
+        value = self.rasterizer_combo.currentData()
+        if value:
+            self.settings.set_rasterizer(value)
+
+    def _on_passes_changed(self) -> None:
+        self.settings.set_adaptive_ocr(bool(self.passes_combo.currentData()))
+
+    def _on_blank_changed(self) -> None:
+        value = self.blank_combo.currentData()
+        if value:
+            self.settings.set_blank_pages(value)
+
+    def _on_writing_changed(self) -> None:
+        self.settings.set_incremental_output(bool(self.writing_combo.currentData()))
+
     def _retranslate_ui(self) -> None:
         self.setWindowTitle("TextLayer")
         self.input_group.setTitle(self.tr("Input"))
         self.input_hint.setText(self.tr("Drop PDF here or click 'Browse PDF' to select a file."))
         self.browse_btn.setText(self.tr("Browse PDF..."))
         self.convert_btn.setText(self.tr("Convert"))
+        self.cancel_btn.setText(self.tr("Cancel"))
         self.output_label.setText(self.tr("Output Directory"))
         self.ocr_language_label.setText(self.tr("OCR Language"))
         self.output_type_label.setText(self.tr("Output Type"))
         self.color_strategy_label.setText(self.tr("Color Strategy"))
+        self.preprocess_label.setText(self.tr("Preprocessing"))
+        self.optimize_label.setText(self.tr("Optimization"))
+        self.words_label.setText(self.tr("Word Data"))
+        self.engine_label.setText(self.tr("OCR Engine"))
+        self.rasterizer_label.setText(self.tr("Page Rendering"))
+        self.passes_label.setText(self.tr("OCR Passes"))
+        self.blank_label.setText(self.tr("Blank Pages"))
+        self.writing_label.setText(self.tr("PDF Writing"))
         self.output_dir_btn.setText(self.tr("Browse..."))
         self.output_save_as_btn.setText(self.tr("Save As..."))
         self.save_text_btn.setText(self.tr("Save Text As..."))
         self.language_label.setText(self.tr("Language"))
         self.status_group.setTitle(self.tr("Status"))
+        self.preview_group.setTitle(self.tr("Pages"))
+        self.preview_panel.retranslate()
+        self.status_log.retranslate()
         self.location_label.setText(self.tr("Location"))
         self.size_label.setText(self.tr("Size"))
         self.disk_label.setText(self.tr("Size on disk"))
@@ -316,9 +520,11 @@ class MainWindow(QMainWindow):
         self.ocr_label.setText(self.tr("OCR Decision"))
         self.output_label_right.setText(self.tr("Output"))
         self.set_tesseract_action.setText(self.tr("Set Tesseract Path..."))
+        self.set_temp_dir_action.setText(self.tr("Set Temp Folder..."))
         self.menuBar().clear()
         menu = self.menuBar().addMenu(self.tr("Preferences"))
         menu.addAction(self.set_tesseract_action)
+        menu.addAction(self.set_temp_dir_action)
         help_menu = self.menuBar().addMenu("?")
         help_menu.addAction(self.about_action)
         self._update_progress(0, self.tr("Idle"))
@@ -339,11 +545,29 @@ class MainWindow(QMainWindow):
                 self.output_dir_edit.setText(self.current_output_dir)
                 self.settings.set_output_dir(self.current_output_dir)
         self.custom_output_path = ""
+        self._open_source(path)
         self._detect_and_update()
 
+    def _open_source(self, path: str) -> None:
+        previous = self.current_source
+        self.current_source = None
+        # A running conversion keeps its source until it finishes.
+        if previous is not None and previous is not self.worker_source:
+            previous.close()
+        if not path or not os.path.isfile(path):
+            return
+        source = InputSource(path)
+        try:
+            source.open()
+        except OSError:
+            logger.exception("Failed to open input %s", path)
+            source.close()
+            return
+        self.current_source = source
+
     def _detect_and_update(self) -> None:
         self._append_status(self.tr("Detecting file..."))
-        self.current_detection = detect_file(self.current_input_path)
+        self.current_detection = detect_file(self.current_input_path, self.current_source)
         result = self.current_detection
 
         if result.file_info:
@@ -363,6 +587,13 @@ class MainWindow(QMainWindow):
             self.accessed_value.setText("-")
 
         self.pages_value.setText(str(result.page_count or "-"))
+        if result.page_count and not result.decision.startswith("reject"):
+            # Render from the staged copy when the input is on a network share.
+            preview_path = self.current_source.local_path if self.current_source else self.current_input_path
+            kinds = [page.kind for page in result.profile.pages] if result.profile else None
+            self.preview_panel.set_document(preview_path, result.page_count, kinds)
+        else:
+            self.preview_panel.clear()
         self.ocr_value.setText(self.tr(result.details))
         output_path = self._get_output_path() if self.current_input_path else "-"
         self.output_value.setText(output_path)
@@ -432,6 +663,26 @@ class MainWindow(QMainWindow):
             self.settings.set_tesseract_path(file_path)
             self._append_status(self.tr("Tesseract path saved."))
 
+    def _on_set_temp_dir(self) -> None:
+        directory = QFileDialog.getExistingDirectory(
+            self,
+            self.tr("Select temp folder (e.g. a RAM disk or fast local drive)"),
+            self.settings.get_temp_dir(),
+        )
+        if not directory:
+            return
+        try:
+            configure_workspace(
+                directory,
+                self.settings.get_job_temp_budget_mb(),
+                self.settings.get_total_temp_budget_mb(),
+            )
+        except OSError as exc:
+            QMessageBox.warning(self, "TextLayer", str(exc))
+            return
+        self.settings.set_temp_dir(directory)
+        self._append_status(self.tr("Temp folder saved."))
+
     def _on_about(self) -> None:
         text = self._load_about_text()
         QMessageBox.information(self, "TextLayer", text)
@@ -469,15 +720,20 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "TextLayer", self.tr("File not found."))
             return
 
-        # Re-run detection at conversion time to ensure up-to-date decisions.
-        result = detect_file(self.current_input_path)
-        self.current_detection = result
+        # Reuse the analysis from selecting the file unless the file changed
+        # since; the task carries it on so the PDF is not read again.
+        result = self.current_detection
+        if result is None or result.profile is None or not result.profile.is_current():
+            if self.current_source is None or self.current_source.is_stale():
+                self._open_source(self.current_input_path)
+            result = detect_file(self.current_input_path, self.current_source)
+            self.current_detection = result
 
-        if result.decision in ("reject_not_pdf", "reject_encrypted", "reject_signed", "reject_error"):
+        if result.decision in ("reject_not_pdf", "reject_encrypted", "reject_signed", "reject_error", "reject_empty"):
             self._append_status(self.tr(result.details))
             QMessageBox.warning(self, "TextLayer", self.tr(result.details))
             return
-        if result.decision == "skip_text_only":
+        if result.decision in ("skip_text_only", "skip_blank"):
             self._append_status(self.tr(result.details))
             QMessageBox.information(self, "TextLayer", self.tr(result.details))
             return
@@ -506,8 +762,13 @@ class MainWindow(QMainWindow):
         lang = self.ocr_language_combo.currentData() or self.settings.get_ocr_language()
         output_type = self.output_type_combo.currentData() or self.settings.get_output_type()
         color_strategy = self.color_strategy_combo.currentData() or self.settings.get_color_strategy()
+        preprocess = self.preprocess_combo.currentData() or self.settings.get_preprocess_mode()
+        optimize = self.optimize_combo.currentData() or self.settings.get_optimize_preset()
 
         output_txt = str(Path(self.current_output_dir) / (Path(self.current_input_path).stem + "_ocr.txt"))
+        output_words = None
+        if self.words_combo.currentData():
+            output_words = str(Path(self.current_output_dir) / Path(self.current_input_path).stem)
 
         task = OCRTask(
             input_pdf=self.current_input_path,
@@ -518,51 +779,182 @@ class MainWindow(QMainWindow):
             redo_ocr=redo_ocr,
             output_type=output_type,
             color_strategy=color_strategy,
+            preprocess=preprocess,
+            preprocess_target_dpi=self.settings.get_preprocess_target_dpi(),
+            optimize=optimize,
+            page_count=result.page_count,
+            checkpoint_pages=self.settings.get_checkpoint_pages(),
+            output_words=output_words,
+            ocr_engine=self.engine_combo.currentData() or self.settings.get_ocr_engine(),
+            rasterizer=self.rasterizer_combo.currentData() or self.settings.get_rasterizer(),
+            timeout_seconds=self.settings.get_timeout_seconds(),
+            stall_seconds=self.settings.get_stall_seconds(),
+            memory_limit_mb=self.settings.get_memory_limit_mb(),
+            adaptive=bool(self.passes_combo.currentData()),
+            refine_threshold=self.settings.get_refine_threshold(),
+            blank_pages=self.blank_combo.currentData() or self.settings.get_blank_pages(),
+            incremental=bool(self.writing_combo.currentData()),
+            profile=result.profile,
+            input_source=self.current_source,
         )
 
         self._set_busy(True)
         self._append_status(self.tr("Output will be saved to: {path}").format(path=output_path))
         self._start_worker(task)
 
-    def _start_worker(self, task: OCRTask) -> None:
-        self.worker_thread = QThread()
-        self.worker = OCRWorker(task)
-        self.worker.moveToThread(self.worker_thread)
+    def _start_worker(self, task: OCRTask, journal_id: int | None = None) -> None:
+        self.worker_source = task.input_source
+        if self.journal is not None:
+            if journal_id is None:
+                # Converting again on request, even if it was done before.
+                journal_id = self.journal.add(task, _JOURNAL_BATCH, max_attempts=1, rerun=True).job_id
+            # Not claimed: another process is converting the same job.
+            self.journal_id = journal_id if self.journal.start(journal_id) else None
+        self.job_started = time.monotonic()
+        self.engine.start(task)
+
+    def _offer_resume(self) -> None:
+        # Conversions the last session did not finish (crash, power loss,
+        # closed while running). The newest one is offered; resuming it
+        # skips the page ranges its checkpoints already hold.
+        if self.journal is None:
+            return
+        self.journal.recover()
+        entries = self.journal.pending(_JOURNAL_BATCH)
+        if not entries:
+            return
+        entry = entries[-1]
+        for older in entries[:-1]:
+            self.journal.abandon(older.job_id, "Not resumed.")
+        task = entry.task
+        if not os.path.isfile(task.input_pdf):
+            self.journal.abandon(entry.job_id, "File not found.")
+            return
+        answer = QMessageBox.question(
+            self,
+            self.tr("Resume Conversion"),
+            self.tr("The conversion of {name} did not finish. Resume it?").format(name=os.path.basename(task.input_pdf)),
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if answer != QMessageBox.Yes:
+            self.journal.abandon(entry.job_id, "Not resumed.")
+            return
 
-        self.worker_thread.started.connect(self.worker.run)
-        self.worker.progress.connect(self._on_progress)
-        self.worker.finished.connect(self._on_finished)
-        self.worker.finished.connect(self.worker_thread.quit)
-        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.set_input_file(task.input_pdf)
+        result = self.current_detection
+        if result.decision.startswith("reject") or result.decision in ("skip_text_only", "skip_blank"):
+            self.journal.abandon(entry.job_id, result.details)
+            return
+        task = dataclasses.replace(
+            task,
+            page_count=result.page_count,
+            profile=result.profile,
+            input_source=self.current_source,
+        )
+        self._set_busy(True)
+        self._append_status(self.tr("Output will be saved to: {path}").format(path=task.output_pdf))
+        self._start_worker(task, entry.job_id)
 
-        self.worker_thread.start()
+    def _on_cancel(self) -> None:
+        self.cancel_btn.setEnabled(False)
+        self._append_status(self.tr("Cancelling..."))
+        self.engine.cancel()
 
     def _on_progress(self, percent: int, status: str) -> None:
         if percent < 0:
             current = self.progress_label.text()
             if current:
-                self._append_status(status)
+                # Tool output: the log view guesses the level from the text.
+                self.status_log.append(status)
             return
         self._update_progress(percent, status)
 
+    def _on_report(self, report: OCRReport) -> None:
+        saved = 0.0
+        if report.input_bytes:
+            saved = (1.0 - report.output_bytes / report.input_bytes) * 100
+        self._append_status(self.tr("Output size: {before} -> {after} ({saved}% saved) in {seconds}s").format(
+            before=format_bytes(report.input_bytes),
+            after=format_bytes(report.output_bytes),
+            saved=f"{saved:.1f}",
+            seconds=f"{report.elapsed_seconds:.1f}",
+        ))
+        if report.lang:
+            self._append_status(self.tr("OCR language: {lang}").format(lang=report.lang))
+        if report.cpu_seconds or report.peak_rss_bytes:
+            self._append_status(self.tr("CPU time {seconds}s, peak memory {memory}").format(
+                seconds=f"{report.cpu_seconds:.1f}",
+                memory=format_bytes(report.peak_rss_bytes),
+            ))
+        if report.blank_pages:
+            template = (
+                self.tr("{count} blank page(s) removed")
+                if report.blank_removed
+                else self.tr("{count} blank page(s) skipped")
+            )
+            self._append_status(template.format(count=len(report.blank_pages)))
+        if report.incremental:
+            self._append_status(self.tr("Text layer appended to the input file"))
+        confidence = report.confidence
+        if confidence is not None and confidence.mean is not None:
+            self._append_status(self.tr(
+                "Mean confidence {mean}, {refined} page(s) re-OCRed, {low} still below {threshold}"
+            ).format(
+                mean=f"{confidence.mean:.1f}",
+                refined=len(confidence.refined),
+                low=len(confidence.low_pages),
+                threshold=f"{confidence.threshold:g}",
+            ))
+
     def _on_finished(self, success: bool, message: str, output_pdf: str, output_txt: str) -> None:
         self._set_busy(False)
+        if self.journal is not None and self.journal_id is not None:
+            if message == CANCELLED_MESSAGE:
+                self.journal.abandon(self.journal_id, message)
+            else:
+                result = OCRResult(success, message, output_pdf, output_txt)
+                self.journal.finish(self.journal_id, result, time.monotonic() - self.job_started)
+            self.journal_id = None
+        if self.worker_source is not None and self.worker_source is not self.current_source:
+            self.worker_source.close()
+        self.worker_source = None
         display_message = self._format_worker_message(message)
-        self._append_status(display_message)
+        self._append_status(display_message, logging.INFO if success else logging.ERROR)
+        # Show everything before the modal message box blocks painting.
+        self.status_log.flush()
         if success:
             self._update_progress(100, self.tr("Ready"))
             self.last_text_path = output_txt
             self.save_text_btn.setEnabled(bool(output_txt))
             QMessageBox.information(self, "TextLayer", self.tr("Conversion finished."))
+        elif message == CANCELLED_MESSAGE:
+            self._update_progress(0, self.tr("Idle"))
         else:
             QMessageBox.critical(self, "TextLayer", display_message)
 
+    def closeEvent(self, event) -> None:
+        # Stops a running conversion and removes its temp space; the
+        # journal offers it again at the next start.
+        if self.journal is not None and self.journal_id is not None:
+            self.journal.requeue(self.journal_id)
+        self.engine.shutdown()
+        if self.journal is not None:
+            self.journal.close()
+        self.preview_panel.shutdown()
+        # Remove staged copies of network inputs.
+        for source in (self.current_source, self.worker_source):
+            if source is not None:
+                source.close()
+        super().closeEvent(event)
+
     def _set_busy(self, busy: bool) -> None:
         self.convert_btn.setEnabled(not busy)
+        self.cancel_btn.setEnabled(busy)
         self.browse_btn.setEnabled(not busy)
         self.output_dir_btn.setEnabled(not busy)
         self.output_save_as_btn.setEnabled(not busy)
         self.language_combo.setEnabled(not busy)
+        self.set_temp_dir_action.setEnabled(not busy)
 
     def _update_progress(self, percent: int, status: str) -> None:
         self.progress_label.setText(self.tr("Progress: {percent}% - {status}").format(
@@ -570,8 +962,8 @@ class MainWindow(QMainWindow):
             status=status,
         ))
 
-    def _append_status(self, text: str) -> None:
-        self.status_log.appendPlainText(text)
+    def _append_status(self, text: str, level: int = logging.INFO) -> None:
+        self.status_log.append(text, level)
 
     def _format_worker_message(self, message: str) -> str:
         if message.startswith("Tesseract language '") and message.endswith("not installed."):
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PySide6.QtCore import QObject, QPoint, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QIcon, QImage, QPixmap
+from PySide6.QtWidgets import QListView, QListWidget, QListWidgetItem, QVBoxLayout, QWidget
+
+from textlayer.services.detection import classify_page
+
+logger = logging.getLogger(__name__)
+
+
+THUMB_WIDTH = 96
+THUMB_HEIGHT = 136
+# Decoded thumbnails kept in memory; off-screen pages beyond this are
+# dropped and re-rendered when scrolled back into view.
+CACHE_BYTES = 32 * 1024 * 1024
+_RENDER_THREADS = 2
+# Pages rendered together; each batch opens the document once.
+_BATCH_PAGES = 4
+# Pages beyond each edge of the viewport rendered ahead of scrolling.
+_MARGIN_PAGES = 4
+_SCROLL_DEBOUNCE_MS = 50
+
+
+class ThumbnailCache:
+    # LRU of rendered page images, bounded by decoded size in bytes.
+    def __init__(self, max_bytes: int = CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._images: OrderedDict[int, QImage] = OrderedDict()
+
+    def __contains__(self, page: int) -> bool:
+        return page in self._images
+
+    def get(self, page: int) -> Optional[QImage]:
+        image = self._images.get(page)
+        if image is not None:
+            self._images.move_to_end(page)
+        return image
+
+    def put(self, page: int, image: QImage) -> list[int]:
+        # Returns the pages evicted to make room.
+        old = self._images.pop(page, None)
+        if old is not None:
+            self.size -= old.sizeInBytes()
+        self._images[page] = image
+        self.size += image.sizeInBytes()
+        evicted = []
+        while self.size > self.max_bytes and len(self._images) > 1:
+            evicted_page, evicted_image = self._images.popitem(last=False)
+            self.size -= evicted_image.sizeInBytes()
+            evicted.append(evicted_page)
+        return evicted
+
+    def clear(self) -> None:
+        self._images.clear()
+        self.size = 0
+
+
+class _RenderSignals(QObject):
+    # generation, page (zero-based), image (None when skipped), page class
+    rendered = Signal(int, int, object, str)
+
+
+class PreviewPanel(QWidget):
+    # Horizontal strip of page thumbnails. Only pages in or near the
+    # viewport are rendered, on background threads.
+    def __init__(self, parent: Optional[QWidget] = None, cache_bytes: int = CACHE_BYTES) -> None:
+        super().__init__(parent)
+        self.strip = QListWidget()
+        self.strip.setViewMode(QListView.IconMode)
+        self.strip.setFlow(QListView.LeftToRight)
+        self.strip.setWrapping(False)
+        self.strip.setMovement(QListView.Static)
+        self.strip.setUniformItemSizes(True)
+        self.strip.setIconSize(QSize(THUMB_WIDTH, THUMB_HEIGHT))
+        self.strip.setHorizontalScrollMode(QListView.ScrollPerPixel)
+        self.strip.setFixedHeight(THUMB_HEIGHT + 60)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.strip)
+
+        self.cache = ThumbnailCache(cache_bytes)
+        self._path = ""
+        self._generation = 0
+        self._classes: dict[int, str] = {}
+        self._classify = True
+        self._inflight: set[int] = set()
+        # Read by render threads to skip pages scrolled away meanwhile.
+        self._wanted: frozenset[int] = frozenset()
+        self._wanted_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_RENDER_THREADS, thread_name_prefix="textlayer-preview"
+        )
+        self._signals = _RenderSignals()
+        self._signals.rendered.connect(self._on_rendered)
+        self._placeholder = _placeholder_icon()
+
+        self._schedule_timer = QTimer(self)
+        self._schedule_timer.setSingleShot(True)
+        self._schedule_timer.setInterval(_SCROLL_DEBOUNCE_MS)
+        self._schedule_timer.timeout.connect(self._schedule)
+        # Not connected directly: start(int) would take the value as interval.
+        self.strip.horizontalScrollBar().valueChanged.connect(lambda _value: self._schedule_timer.start())
+
+    def set_document(self, path: str, page_count: int, kinds: Optional[list[str]] = None) -> None:
+        # kinds: page classes from detection; render threads then only
+        # render instead of classifying each page again.
+        self.clear()
+        self._path = path
+        self._classify = kinds is None
+        if kinds is not None:
+            self._classes = dict(enumerate(kinds))
+        for page in range(page_count):
+            item = QListWidgetItem(self._placeholder, self._label(page))
+            item.setTextAlignment(Qt.AlignHCenter)
+            self.strip.addItem(item)
+        self._schedule_timer.start()
+
+    def clear(self) -> None:
+        # Results of earlier documents still in flight are ignored.
+        self._generation += 1
+        self._path = ""
+        self._classes.clear()
+        self._inflight.clear()
+        self._set_wanted(frozenset())
+        self.cache.clear()
+        self.strip.clear()
+
+    def shutdown(self) -> None:
+        self.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def retranslate(self) -> None:
+        for page in range(self.strip.count()):
+            self.strip.item(page).setText(self._label(page))
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self._schedule_timer.start()
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self._schedule_timer.start()
+
+    def _schedule(self) -> None:
+        if not self._path or not self.strip.count():
+            return
+        first, last = self._visible_range()
+        first = max(0, first - _MARGIN_PAGES)
+        last = min(self.strip.count() - 1, last + _MARGIN_PAGES)
+        wanted = frozenset(range(first, last + 1))
+        self._set_wanted(wanted)
+        missing = [page for page in sorted(wanted) if page not in self.cache and page not in self._inflight]
+        for start in range(0, len(missing), _BATCH_PAGES):
+            batch = missing[start:start + _BATCH_PAGES]
+            self._inflight.update(batch)
+            self._executor.submit(self._render_batch, self._generation, self._path, batch, self._classify)
+        for page in wanted:
+            # Touch visible pages so they are the last to be evicted.
+            self.cache.get(page)
+
+    def _visible_range(self) -> tuple[int, int]:
+        viewport = self.strip.viewport().rect()
+        middle = viewport.center().y()
+        first = self.strip.indexAt(QPoint(viewport.left() + 1, middle)).row()
+        last = self.strip.indexAt(QPoint(viewport.right() - 1, middle)).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            # The strip ends inside the viewport.
+            last = self.strip.count() - 1
+        return first, last
+
+    def _render_batch(self, generation: int, path: str, pages: list[int], classify: bool) -> None:
+        # Runs on a render thread. Each batch opens its own document:
+        # PyMuPDF documents must not be shared between threads, and no
+        # handle stays open once the strip is cleared.
+        try:
+            import fitz
+
+            doc = fitz.open(path)
+        except Exception as exc:
+            logger.warning("Preview could not open %s: %s", path, exc)
+            for page_index in pages:
+                self._signals.rendered.emit(generation, page_index, None, "")
+            return
+        try:
+            for page_index in pages:
+                if generation != self._generation or page_index not in self._get_wanted():
+                    self._signals.rendered.emit(generation, page_index, None, "")
+                    continue
+                try:
+                    page = doc.load_page(page_index)
+                    kind = classify_page(page) if classify else ""
+                    zoom = min(THUMB_WIDTH / page.rect.width, THUMB_HEIGHT / page.rect.height)
+                    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                    # copy() detaches the image from the pixmap buffer.
+                    image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+                except Exception as exc:
+                    logger.debug("Preview of page %d failed: %s", page_index + 1, exc)
+                    image, kind = None, ""
+                self._signals.rendered.emit(generation, page_index, image, kind)
+        finally:
+            doc.close()
+
+    def _on_rendered(self, generation: int, page: int, image: Optional[QImage], kind: str) -> None:
+        if generation != self._generation:
+            return
+        self._inflight.discard(page)
+        if image is None:
+            return
+        if kind:
+            self._classes[page] = kind
+        item = self.strip.item(page)
+        if item is None:
+            return
+        item.setIcon(QIcon(QPixmap.fromImage(image)))
+        item.setText(self._label(page))
+        for evicted in self.cache.put(page, image):
+            evicted_item = self.strip.item(evicted)
+            if evicted_item is not None:
+                # Let Qt free the pixmap too; the page class label stays.
+                evicted_item.setIcon(self._placeholder)
+
+    def _label(self, page: int) -> str:
+        kind = self._classes.get(page)
+        names = {
+            "image": self.tr("image"),
+            "text": self.tr("text"),
+            "mixed": self.tr("image + text"),
+            "blank": self.tr("blank"),
+        }
+        return f"{page + 1}\n{names[kind]}" if kind in names else str(page + 1)
+
+    def _set_wanted(self, wanted: frozenset[int]) -> None:
+        with self._wanted_lock:
+            self._wanted = wanted
+
+    def _get_wanted(self) -> frozenset[int]:
+        with self._wanted_lock:
+            return self._wanted
+
+
+def _placeholder_icon() -> QIcon:
+    pixmap = QPixmap(THUMB_WIDTH, THUMB_HEIGHT)
+    pixmap.fill(QColor(235, 235, 235))
+    return QIcon(pixmap)
@@ -12,6 +12,15 @@ def format_bytes(size: int) -> str:
     return f"{value:.1f} PB"
 
 
+def format_duration(seconds: float) -> str:
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
 def format_dt(ts: float) -> str:
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d, %H:%M:%S")
 
@@ -24,3 +33,12 @@ def size_on_disk(size: int, cluster: int = 4096) -> int:
 
 def is_pdf_path(path: str) -> bool:
     return os.path.splitext(path)[1].lower() == ".pdf"
+
+
+def app_data_dir() -> str:
+    # Per-user, machine-local storage for job state that must survive restarts.
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, "TextLayer")
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "textlayer")
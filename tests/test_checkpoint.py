@@ -0,0 +1,57 @@
+import os
+
+from textlayer.services.checkpoint import _chunk_path, _load_manifest, _write_manifest, task_fingerprint
+from textlayer.services.ocr_service import OCRTask, _page_spec
+from textlayer.services.pdf_split import output_starts, page_ranges
+
+
+def test_page_spec_compresses_runs():
+    assert _page_spec([0, 1, 2, 6, 8, 9]) == "1-3,7,9-10"
+    assert _page_spec([4]) == "5"
+
+
+def test_page_ranges_cover_every_page():
+    assert page_ranges(25, 10) == [(0, 10), (10, 20), (20, 25)]
+    assert page_ranges(3, 0) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_output_starts_shift_after_dropped_pages():
+    ranges = [(0, 10), (10, 20), (20, 25)]
+    assert output_starts(ranges, {"0": [2, 3]}, dropped=True) == [0, 8, 18]
+    assert output_starts(ranges, {"0": [2, 3]}, dropped=False) == [0, 10, 20]
+
+
+def _task(tmp_path):
+    source = tmp_path / "in.pdf"
+    source.write_bytes(b"%PDF-1.4\n")
+    return OCRTask(str(source), str(tmp_path / "out.pdf"), "eng", None, "", False, "pdf", "auto", page_count=25)
+
+
+def test_manifest_resumes_ranges_whose_chunks_survived(tmp_path):
+    task = _task(tmp_path)
+    work_dir = str(tmp_path / "work")
+    manifest = _load_manifest(work_dir, task, 10)
+    assert [tuple(item) for item in manifest["ranges"]] == [(0, 10), (10, 20), (20, 25)]
+    for index in (0, 1):
+        open(_chunk_path(work_dir, index, "pdf"), "wb").close()
+    manifest["done"] = [0, 1]
+    _write_manifest(work_dir, manifest)
+    os.remove(_chunk_path(work_dir, 1, "pdf"))
+
+    resumed = _load_manifest(work_dir, task, 10)
+    assert resumed["done"] == [0]
+    assert resumed["fingerprint"] == task_fingerprint(task)
+
+
+def test_changed_input_starts_over(tmp_path):
+    task = _task(tmp_path)
+    work_dir = str(tmp_path / "work")
+    manifest = _load_manifest(work_dir, task, 10)
+    open(_chunk_path(work_dir, 0, "pdf"), "wb").close()
+    manifest["done"] = [0]
+    _write_manifest(work_dir, manifest)
+    with open(task.input_pdf, "ab") as handle:
+        handle.write(b"%changed\n")
+
+    assert _load_manifest(work_dir, task, 10)["done"] == []
+    assert not os.path.exists(_chunk_path(work_dir, 0, "pdf"))
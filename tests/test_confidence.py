@@ -0,0 +1,30 @@
+import numpy as np
+
+from textlayer.services.confidence import ConfidenceSummary, low_confidence_pages, page_confidence, sparse_pages
+from textlayer.services.words import _build_table
+
+
+def _table(confs_per_page):
+    # One row per word: (page, block, line, bbox, conf, text).
+    rows = [
+        (page, 1, 1, (0, 0, 10, 10), conf, "w")
+        for page, confs in enumerate(confs_per_page)
+        for conf in confs
+    ]
+    return _build_table(rows, np.full((len(confs_per_page), 2), 100, dtype=np.int32))
+
+
+def test_page_confidence_means_and_sparse_pages():
+    table = _table([[90, 80, 70], [95, -1], [], [60, 60, 60, -1]])
+    assert sparse_pages(table) == [1, 2]
+    # Sparse pages that are not blank count as unreadable.
+    assert page_confidence(table) == {0: 80.0, 1: 0.0, 2: 0.0, 3: 60.0}
+    # Blank ones are left out.
+    assert page_confidence(table, blank=[2]) == {0: 80.0, 1: 0.0, 3: 60.0}
+
+
+def test_low_confidence_pages():
+    means = page_confidence(_table([[90, 80, 70], [50], [60, 60, 60]]))
+    assert low_confidence_pages(means, 70.0) == [1, 2]
+    assert low_confidence_pages(means, 50.0) == [1]
+    assert ConfidenceSummary(65.0, means).low_pages == [1, 2]
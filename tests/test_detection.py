@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from textlayer.services.detection import DEFAULT_BLANK_MODE, find_blank_pages, is_blank_image
+
+
+def _paper(tone=235):
+    return np.full((440, 340), tone, dtype=np.uint8)
+
+
+def test_blank_images():
+    assert is_blank_image(_paper())
+    # Gray recycled paper with a scanner shadow along the edge.
+    shadowed = _paper(180)
+    shadowed[:, :10] = 20
+    assert is_blank_image(shadowed)
+    # Dust: isolated dark pixels, none touching another.
+    rng = np.random.default_rng(0)
+    dusty = _paper()
+    dusty[rng.integers(20, 200, 500) * 2 + 1, rng.integers(15, 155, 500) * 2 + 1] = 0
+    assert is_blank_image(dusty)
+
+
+def test_inked_images():
+    line = _paper()
+    line[200:203, 50:290] = 30
+    assert not is_blank_image(line)
+    # Faint pencil is still ink once it is well below the paper tone.
+    pencil = _paper()
+    pencil[100:102, 60:280] = 150
+    assert not is_blank_image(pencil)
+
+
+def test_find_blank_pages(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page().draw_rect(fitz.Rect(100, 300, 500, 320), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.new_page().insert_text((72, 400), "Page three", fontsize=14)
+    # A dark band at the edge only, like a scanner shadow.
+    doc.new_page().draw_rect(fitz.Rect(0, 0, 12, 842), color=(0, 0, 0), fill=(0, 0, 0))
+    path = str(tmp_path / "mixed.pdf")
+    doc.save(path)
+    doc.close()
+    assert find_blank_pages(path) == ([0, 3], 4)
+
+
+def test_blank_pages_are_ocred_by_default():
+    assert DEFAULT_BLANK_MODE == "off"
@@ -0,0 +1,82 @@
+import shutil
+import threading
+from multiprocessing import AuthenticationError
+
+import pikepdf
+import pytest
+
+from textlayer.services import distributed
+from textlayer.services.distributed import Coordinator, run_worker
+from textlayer.services.ocr_service import OCRReport, OCRResult, OCRTask
+from textlayer.services.pdf_split import read_sidecar
+
+
+def _fake_ocr(task, progress):
+    # Stands in for OCRmyPDF: the output is the input, the text names each page by its width.
+    shutil.copyfile(task.input_pdf, task.output_pdf)
+    with pikepdf.open(task.input_pdf) as pdf:
+        texts = [f"w{int(page.mediabox[2])}" for page in pdf.pages]
+    with open(task.output_txt, "w", encoding="utf-8") as handle:
+        handle.write("\f".join(texts))
+    return OCRResult(True, "ok", task.output_pdf, task.output_txt, OCRReport(lang=task.lang))
+
+
+def _document(path, pages):
+    pdf = pikepdf.new()
+    for index in range(pages):
+        pdf.add_blank_page(page_size=(100 + index, 200))
+    pdf.save(path)
+
+
+def _task(tmp_path, pages):
+    input_pdf = str(tmp_path / "in.pdf")
+    _document(input_pdf, pages)
+    return OCRTask(
+        input_pdf=input_pdf,
+        output_pdf=str(tmp_path / "out.pdf"),
+        lang="eng",
+        output_txt=str(tmp_path / "out.txt"),
+        tesseract_path="",
+        redo_ocr=False,
+        output_type="pdf",
+        color_strategy="auto",
+        page_count=pages,
+        blank_pages="off",
+    )
+
+
+@pytest.fixture
+def coordinator(monkeypatch):
+    monkeypatch.setattr(distributed, "run_ocr_task", _fake_ocr)
+    coordinator = Coordinator(("127.0.0.1", 0), chunk_pages=2)
+    coordinator.start()
+    yield coordinator
+    coordinator.stop()
+
+
+def test_localhost_round_trip(tmp_path, coordinator):
+    worker = threading.Thread(
+        target=run_worker,
+        args=(coordinator.address, coordinator.authkey),
+        kwargs={"worker_id": "test", "poll_interval": 0.1},
+        daemon=True,
+    )
+    worker.start()
+    result = coordinator.process(_task(tmp_path, 5), lambda percent, line: None)
+
+    assert result.success, result.message
+    with pikepdf.open(result.output_pdf) as pdf:
+        assert [int(page.mediabox[2]) for page in pdf.pages] == [100, 101, 102, 103, 104]
+    assert read_sidecar(result.output_txt) == ["w100", "w101", "w102", "w103", "w104"]
+
+
+def test_coordinator_listens_on_loopback_with_random_key():
+    first = Coordinator(("127.0.0.1", 0))
+    second = Coordinator()
+    assert second.address[0] == "127.0.0.1"
+    assert first.authkey != second.authkey and len(first.authkey) >= 32
+
+
+def test_worker_with_wrong_key_is_refused(coordinator):
+    with pytest.raises(AuthenticationError):
+        run_worker(coordinator.address, b"not-the-key", worker_id="intruder")
@@ -0,0 +1,91 @@
+import pikepdf
+import pytest
+from pikepdf import Dictionary, Name
+
+from textlayer.services.incremental import _last_xref, write_incremental
+
+
+def _original(path, object_streams=pikepdf.ObjectStreamMode.disable, pages=3, **save_options):
+    pdf = pikepdf.new()
+    for _ in range(pages):
+        page = pdf.add_blank_page(page_size=(200, 300))
+        page.obj.Contents = pdf.make_stream(b"q 0 0 0 rg 20 20 160 260 re f Q")
+    pdf.docinfo[Name.Title] = "original"
+    pdf.save(path, object_stream_mode=object_streams, **save_options)
+
+
+def _ocr(source, target, skip=(), extra_pages=0, **open_options):
+    # What OCRmyPDF makes of source: an invisible-text form XObject named
+    # /OCR-... drawn ahead of each page's content.
+    with pikepdf.open(source, **open_options) as pdf:
+        font = pdf.make_indirect(Dictionary(Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica))
+        for index, page in enumerate(pdf.pages):
+            if index in skip:
+                continue
+            form = pdf.make_stream(
+                b"BT 3 Tr /f-0-0 12 Tf 10 10 Td (page %d) Tj ET" % index,
+                Type=Name.XObject,
+                Subtype=Name.Form,
+                BBox=page.mediabox,
+                Resources=Dictionary(Font=Dictionary({"/f-0-0": font})),
+            )
+            name = Name.random(prefix="OCR-")
+            page.obj.Resources = Dictionary(XObject=Dictionary({str(name): form}))
+            page.contents_add(pikepdf.Stream(pdf, b"q 1 0 0 1 0 0 cm\n%s Do\nQ\n" % name), prepend=True)
+        for _ in range(extra_pages):
+            pdf.add_blank_page(page_size=(200, 300))
+        pdf.save(target)
+
+
+@pytest.mark.parametrize(
+    ("object_streams", "xref_stream"),
+    [(pikepdf.ObjectStreamMode.disable, False), (pikepdf.ObjectStreamMode.generate, True)],
+    ids=["xref-table", "xref-stream"],
+)
+def test_update_appends_text_layers(tmp_path, object_streams, xref_stream):
+    original, ocr, output = (str(tmp_path / name) for name in ("in.pdf", "ocr.pdf", "out.pdf"))
+    _original(original, object_streams)
+    assert _last_xref(original)[1] == xref_stream
+    _ocr(original, ocr, skip={1})
+    assert write_incremental(original, ocr, output)
+
+    with open(original, "rb") as handle:
+        before = handle.read()
+    with open(output, "rb") as handle:
+        after = handle.read()
+    assert after.startswith(before) and len(after) > len(before)
+
+    with pikepdf.open(output) as pdf:
+        assert pdf.get_warnings() == []
+        assert str(pdf.docinfo[Name.Title]) == "original"
+        layers = [
+            [name for name in page.obj.Resources.get(Name.XObject, {}).keys() if name.startswith("/OCR-")]
+            for page in pdf.pages
+        ]
+        assert [len(names) for names in layers] == [1, 0, 1]
+        first = pdf.pages[0].obj.Contents
+        assert b"Do" in first[0].read_bytes() and b" re f" in first[1].read_bytes()
+
+
+def test_encrypted_input_is_refused(tmp_path):
+    original, ocr, output = (str(tmp_path / name) for name in ("in.pdf", "ocr.pdf", "out.pdf"))
+    _original(original, encryption=pikepdf.Encryption(owner="owner", user=""))
+    _ocr(original, ocr)
+    assert not write_incremental(original, ocr, output)
+    assert not (tmp_path / "out.pdf").exists()
+
+
+def test_different_page_count_is_refused(tmp_path):
+    original, ocr, output = (str(tmp_path / name) for name in ("in.pdf", "ocr.pdf", "out.pdf"))
+    _original(original)
+    _ocr(original, ocr, extra_pages=1)
+    assert not write_incremental(original, ocr, output)
+    assert not (tmp_path / "out.pdf").exists()
+
+
+def test_output_without_text_layers_is_refused(tmp_path):
+    original, ocr, output = (str(tmp_path / name) for name in ("in.pdf", "ocr.pdf", "out.pdf"))
+    _original(original)
+    _ocr(original, ocr, skip={0, 1, 2})
+    assert not write_incremental(original, ocr, output)
+    assert not (tmp_path / "out.pdf").exists()
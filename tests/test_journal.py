@@ -0,0 +1,21 @@
+from textlayer.services.journal import JobJournal
+from textlayer.services.ocr_service import OCRTask
+
+
+def _task(tmp_path, name):
+    return OCRTask(str(tmp_path / name), str(tmp_path / f"out-{name}"), "eng", None, "", False, "pdf", "auto")
+
+
+def test_unreadable_input_is_recorded_as_failed(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    missing = journal.add(_task(tmp_path, "gone.pdf"), "batch")
+    assert missing.state == "failed"
+    assert not missing.retrying
+    assert missing.message.startswith("Cannot read input")
+    assert not journal.start(missing.job_id)
+
+    # The rest of the batch goes on.
+    (tmp_path / "here.pdf").write_bytes(b"%PDF-1.4\n")
+    assert journal.add(_task(tmp_path, "here.pdf"), "batch").state == "queued"
+    assert missing.job_id not in [entry.job_id for entry in journal.pending()]
+    journal.close()
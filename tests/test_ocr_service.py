@@ -0,0 +1,18 @@
+import dataclasses
+
+from textlayer.services.ocr_service import OCRTask, _plugin_args
+
+
+def _task(**changes):
+    task = OCRTask("in.pdf", "out.pdf", "eng", None, "", False, "pdf", "auto", preprocess="none")
+    return dataclasses.replace(task, **changes)
+
+
+def test_plain_conversion_does_not_load_the_plugin():
+    assert _plugin_args(_task()) == []
+
+
+def test_plugin_is_loaded_for_features_that_need_it():
+    assert _plugin_args(_task(rasterizer="pymupdf"))[:2] == ["--plugin", "textlayer.services.ocrmypdf_plugin"]
+    assert _plugin_args(_task(), words_dir="/tmp/words")[:2] == ["--plugin", "textlayer.services.ocrmypdf_plugin"]
+    assert "--textlayer-preprocess" in _plugin_args(_task(preprocess="auto"))
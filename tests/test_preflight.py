@@ -0,0 +1,43 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from textlayer.services import preflight
+from textlayer.services.preflight import run_preflight
+
+
+def _read_paths(path):
+    with open(path, encoding="utf-8", errors="surrogateescape") as handle:
+        return sorted(json.loads(line)["path"] for line in handle)
+
+
+def test_undecodable_file_name_resumes(tmp_path):
+    name = os.fsdecode(b"caf\xe9.pdf")
+    (tmp_path / name).write_bytes(b"not a pdf")
+    report = str(tmp_path / "report.jsonl")
+    first = run_preflight(str(tmp_path), report, workers=1)
+    second = run_preflight(str(tmp_path), report, workers=1)
+    assert (first.files, second.files, second.resumed) == (1, 0, 1)
+    assert _read_paths(report) == [str(tmp_path / name)]
+
+
+def _crash_on_marker(path, lang="eng", output_type="pdfa"):
+    if "crash" in os.path.basename(path):
+        os._exit(1)
+    return preflight._error_record(path, "inspected")
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the patched function")
+def test_worker_crash_only_fails_its_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(preflight, "inspect_file", _crash_on_marker)
+    names = ["a.pdf", "b.pdf", "crash.pdf", "d.pdf"]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+    report = str(tmp_path / "report.jsonl")
+    summary = run_preflight(str(tmp_path), report, workers=2)
+    with open(report, encoding="utf-8") as handle:
+        errors = {os.path.basename(record["path"]): record["error"] for record in map(json.loads, handle)}
+    assert summary.files == 4
+    assert errors == {"a.pdf": "inspected", "b.pdf": "inspected", "crash.pdf": "worker crashed", "d.pdf": "inspected"}
@@ -0,0 +1,59 @@
+import numpy as np
+from PIL import Image
+
+from textlayer.services.preprocess import PreprocessOptions, otsu_threshold, preprocess_image, whiten_borders
+
+
+def test_otsu_threshold_separates_two_levels():
+    gray = np.array([[40] * 50 + [200] * 50], dtype=np.uint8)
+    threshold = otsu_threshold(gray)
+    assert 40 <= threshold < 200
+
+
+def test_otsu_threshold_of_empty_image():
+    assert otsu_threshold(np.zeros((0, 0), dtype=np.uint8)) == 127
+
+
+def test_whiten_borders_paints_dark_scanner_edges():
+    gray = np.full((100, 100), 230, dtype=np.uint8)
+    gray[:5, :] = 0
+    gray[:, 97:] = 10
+    out = whiten_borders(gray)
+    assert (out[:5, :] == 255).all()
+    assert (out[:, 97:] == 255).all()
+    assert (out[5:, :97] == 230).all()
+
+
+def test_whiten_borders_stops_at_the_edge_limit():
+    # A dark band deeper than 10% of the page is left alone past the limit.
+    gray = np.full((100, 100), 230, dtype=np.uint8)
+    gray[:30, :] = 0
+    out = whiten_borders(gray)
+    assert (out[:10, :] == 255).all()
+    assert (out[10:30, :] == 0).all()
+
+
+def test_whiten_borders_keeps_a_clean_page():
+    gray = np.full((40, 60), 230, dtype=np.uint8)
+    assert whiten_borders(gray) is gray
+
+
+def _image(dpi=None):
+    image = Image.new("L", (600, 400), 255)
+    if dpi:
+        image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def test_downsamples_only_clearly_oversized_scans():
+    options = PreprocessOptions(target_dpi=300, crop_borders=False)
+    assert preprocess_image(_image(600), options).size == (300, 200)
+    # Within 1.25x of the target: left as it is.
+    assert preprocess_image(_image(360), options).size == (600, 400)
+
+
+def test_unknown_resolution_is_not_invented():
+    options = PreprocessOptions(target_dpi=300, crop_borders=False)
+    image = preprocess_image(_image(), options)
+    assert image.size == (600, 400)
+    assert "dpi" not in image.info
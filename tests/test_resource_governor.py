@@ -0,0 +1,45 @@
+import asyncio
+
+from textlayer.services import resource_governor
+from textlayer.services.resource_governor import ResourceGovernor
+
+
+def _clock(monkeypatch, busy, own):
+    # busy and own are lists of (system, TextLayer) CPU seconds, one per sample.
+    times = iter(range(0, 1000, 10))
+    monkeypatch.setattr(resource_governor.time, "monotonic", lambda: float(next(times)))
+    monkeypatch.setattr(resource_governor, "_system_busy_seconds", lambda: busy.pop(0))
+    monkeypatch.setattr(resource_governor, "_own_cpu_seconds", lambda pgids: own.pop(0))
+
+
+def test_own_finished_jobs_are_not_external_load(monkeypatch):
+    # Over 10 s the machine was busy for 80 CPU seconds, all of them ours.
+    _clock(monkeypatch, busy=[0.0, 80.0], own=[0.0, 80.0])
+    governor = ResourceGovernor(total_cores=8)
+    governor.release(governor.acquire(100))
+    assert governor.acquire(100).jobs == 8
+
+
+def test_external_load_reduces_the_budget(monkeypatch):
+    # 30 of 80 CPU seconds over 10 s were someone else's: 3 cores.
+    _clock(monkeypatch, busy=[0.0, 80.0], own=[0.0, 50.0])
+    governor = ResourceGovernor(total_cores=8)
+    governor.release(governor.acquire(100))
+    assert governor.acquire(100).jobs == 5
+
+
+def test_expected_jobs_get_their_share(monkeypatch):
+    monkeypatch.setattr(resource_governor, "_system_busy_seconds", lambda: None)
+    monkeypatch.setattr(resource_governor.os, "getloadavg", lambda: (0.0, 0.0, 0.0))
+    governor = ResourceGovernor(total_cores=8)
+
+    async def job(ticket):
+        governor.bind(ticket)
+        return governor.acquire(50)
+
+    async def both():
+        tickets = [governor.expect(50), governor.expect(50)]
+        return await asyncio.gather(*(job(ticket) for ticket in tickets))
+
+    first, second = asyncio.run(both())
+    assert (first.jobs, second.jobs) == (4, 4)
@@ -0,0 +1,58 @@
+from textlayer.services.pdf_split import clear_sidecar_pages, merge_sidecars, read_sidecar, replace_sidecar_pages
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_merge_keeps_trailing_blank_pages(tmp_path):
+    first = _write(tmp_path / "0.txt", "x1\fx2\f")
+    second = _write(tmp_path / "1.txt", "y1\fy2")
+    merged = str(tmp_path / "merged.txt")
+    merge_sidecars([first, second], merged)
+    assert read_sidecar(merged) == ["x1", "x2", "", "y1", "y2"]
+
+
+def test_merge_keeps_blank_chunk(tmp_path):
+    parts = [_write(tmp_path / f"{index}.txt", text) for index, text in enumerate(["a", "", "\f"])]
+    merged = str(tmp_path / "merged.txt")
+    merge_sidecars(parts, merged)
+    assert read_sidecar(merged) == ["a", "", "", ""]
+
+
+def test_read_expands_skipped_page_runs(tmp_path):
+    path = _write(tmp_path / "run.txt", "p1\n\f[OCR skipped on page(s) 2-4]\fp5\n\f[OCR skipped on page(s) 6]")
+    assert read_sidecar(path) == [
+        "p1\n",
+        "[OCR skipped on page(s) 2]",
+        "[OCR skipped on page(s) 3]",
+        "[OCR skipped on page(s) 4]",
+        "p5\n",
+        "[OCR skipped on page(s) 6]",
+    ]
+
+
+def test_clear_blank_pages_after_compressed_skip_note(tmp_path):
+    # Six pages, the third and fourth blank and left out of OCR.
+    path = _write(tmp_path / "out.txt", "p1\n\fp2\n\f[OCR skipped on page(s) 3-4]\fp5\n\fp6\n")
+    clear_sidecar_pages(path, [2, 3])
+    assert read_sidecar(path) == ["p1\n", "p2\n", "", "", "p5\n", "p6\n"]
+
+
+def test_replace_refined_pages_from_partial_run(tmp_path):
+    base = _write(tmp_path / "base.txt", "p1\n\fp2\n\fp3\n\fp4\n\fp5\n\fp6\n")
+    # A --pages 2,5 run: one note for each run of pages it left out.
+    refined = _write(
+        tmp_path / "refined.txt",
+        "[OCR skipped on page(s) 1]\fr2\n\f[OCR skipped on page(s) 3-4]\fr5\n\f[OCR skipped on page(s) 6]",
+    )
+    assert replace_sidecar_pages(base, refined, [1, 4])
+    assert read_sidecar(base) == ["p1\n", "r2\n", "p3\n", "p4\n", "r5\n", "p6\n"]
+
+
+def test_replace_refuses_mismatched_sidecars(tmp_path):
+    base = _write(tmp_path / "base.txt", "p1\fp2\fp3")
+    refined = _write(tmp_path / "refined.txt", "[OCR skipped on page(s) 1]\fr2")
+    assert not replace_sidecar_pages(base, refined, [1])
+    assert read_sidecar(base) == ["p1", "p2", "p3"]
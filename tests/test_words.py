@@ -0,0 +1,143 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from textlayer.services.words import (
+    WordTable,
+    _render_alto,
+    _render_hocr,
+    collect_words,
+    load_words,
+    page_hocr_path,
+    parse_hocr,
+    save_words,
+)
+
+# Trimmed from a Tesseract 5 hOCR page.
+_PAGE_ONE = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
+ <head><title></title><meta name="ocr-system" content="tesseract 5.3.0" /></head>
+ <body>
+  <div class='ocr_page' id='page_1' title='image "p.png"; bbox 0 0 2480 3508; ppageno 0; scan_res 300 300'>
+   <div class='ocr_carea' id='block_1_1' title="bbox 200 300 1200 420">
+    <p class='ocr_par' id='par_1_1' lang='deu' title="bbox 200 300 1200 420">
+     <span class='ocr_line' id='line_1_1' title="bbox 200 300 1200 350; baseline 0 -8; x_size 50">
+      <span class='ocrx_word' id='word_1_1' title='bbox 200 300 420 350; x_wconf 96'>Grüße</span>
+      <span class='ocrx_word' id='word_1_2' title='bbox 440 300 520 350; x_wconf 91'>&amp;</span>
+      <span class='ocrx_word' id='word_1_3' title='bbox 540 302 1200 350; x_wconf 88'><strong>Tschüs</strong></span>
+     </span>
+     <span class='ocr_line' id='line_1_2' title="bbox 200 370 700 420; baseline 0 -8; x_size 50">
+      <span class='ocrx_word' id='word_1_4' title='bbox 200 370 700 420; x_wconf 42'>"quoted"</span>
+      <span class='ocrx_word' id='word_1_5' title='bbox 710 370 720 420; x_wconf 95'> </span>
+     </span>
+    </p>
+   </div>
+   <div class='ocr_carea' id='block_1_2' title="bbox 200 900 600 950">
+    <p class='ocr_par' id='par_1_2' lang='deu' title="bbox 200 900 600 950">
+     <span class='ocr_header' id='line_1_3' title="bbox 200 900 600 950">
+      <span class='ocrx_word' id='word_1_6' title='bbox 200 900 600 950; x_wconf 77'>&lt;Ende&gt;</span>
+     </span>
+    </p>
+   </div>
+  </div>
+ </body>
+</html>
+"""
+_PAGE_TWO = """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml">
+ <body>
+  <div class='ocr_page' id='page_1' title='bbox 0 0 1240 1754; ppageno 0'>
+   <p class='ocr_par' id='par_1_1' title="bbox 10 20 300 60">
+    <span class='ocr_line' id='line_1_1' title="bbox 10 20 300 60">
+     <span class='ocrx_word' id='word_1_1' title='bbox 10 20 300 60; x_wconf 99'>Zwei</span>
+    </span>
+   </p>
+  </div>
+ </body>
+</html>
+"""
+_EXPECTED_ONE = [
+    (0, 0, (200, 300, 420, 350), 96, "Grüße"),
+    (0, 0, (440, 300, 520, 350), 91, "&"),
+    (0, 0, (540, 302, 1200, 350), 88, "Tschüs"),
+    (0, 1, (200, 370, 700, 420), 42, '"quoted"'),
+    (1, 2, (200, 900, 600, 950), 77, "<Ende>"),
+]
+
+
+def _rows(table):
+    return [
+        (int(table.page[index]), int(table.block[index]), int(table.line[index]),
+         tuple(int(value) for value in table.bbox[index]), int(table.conf[index]), table.text(index))
+        for index in range(len(table))
+    ]
+
+
+def _document(tmp_path, name, pages):
+    # A words folder like ocrmypdf leaves it, one hOCR file per page.
+    words_dir = tmp_path / name
+    words_dir.mkdir()
+    for number, data in enumerate(pages, start=1):
+        with open(page_hocr_path(str(words_dir), number), "w", encoding="utf-8") as handle:
+            handle.write(data)
+    return collect_words(str(words_dir), len(pages))
+
+
+def _parse_alto(data):
+    ns = {"alto": "http://www.loc.gov/standards/alto/ns-v4#"}
+    pages = []
+    for page in ET.fromstring(data).iterfind(".//alto:Page", ns):
+        words = []
+        for block, text_block in enumerate(page.iterfind(".//alto:TextBlock", ns)):
+            for text_line in text_block.iterfind("alto:TextLine", ns):
+                for string in text_line.iterfind("alto:String", ns):
+                    x, y, w, h = (int(string.get(key)) for key in ("HPOS", "VPOS", "WIDTH", "HEIGHT"))
+                    conf = round(float(string.get("WC")) * 100) if string.get("WC") else -1
+                    words.append((block, text_line.get("ID"), (x, y, x + w, y + h), conf, string.get("CONTENT")))
+        pages.append(((int(page.get("WIDTH")), int(page.get("HEIGHT"))), words))
+    return pages
+
+
+def test_parse_hocr():
+    size, words = parse_hocr(_PAGE_ONE.encode("utf-8"))
+    assert size == (2480, 3508)
+    assert words == _EXPECTED_ONE
+
+
+def test_words_round_trip(tmp_path):
+    first = _document(tmp_path, "first", [_PAGE_ONE, _PAGE_TWO])
+    second = _document(tmp_path, "second", [_PAGE_TWO])
+    path = str(tmp_path / "doc.words.npz")
+    save_words(WordTable.concat([first, second]), path)
+    table = load_words(path)
+
+    # Pages and text offsets continue from one table to the next.
+    assert table.page_count == 3
+    assert table.page_sizes.tolist() == [[2480, 3508], [1240, 1754], [1240, 1754]]
+    assert table.text_offsets[-1] == len(table.text_blob)
+    expected = [(0, *word) for word in _EXPECTED_ONE] + [
+        (1, 0, 0, (10, 20, 300, 60), 99, "Zwei"),
+        (2, 0, 0, (10, 20, 300, 60), 99, "Zwei"),
+    ]
+    assert _rows(table) == expected
+    assert list(table.page_rows(1)) == [5]
+
+    # The rendered hOCR reads back page by page as the same words.
+    root = ET.fromstring("".join(_render_hocr(table)))
+    pages = [element for element in root.iter() if element.get("class") == "ocr_page"]
+    assert len(pages) == 3
+    for page, element in enumerate(pages):
+        size, words = parse_hocr(ET.tostring(element))
+        assert size == tuple(table.page_sizes[page])
+        assert [(page, *word) for word in words] == [row for row in expected if row[0] == page]
+
+    # So does the ALTO, block by block.
+    alto = _parse_alto("".join(_render_alto(table)))
+    assert [size for size, _ in alto] == [tuple(size) for size in table.page_sizes.tolist()]
+    read_back = [(page, *word) for page, (_, words) in enumerate(alto) for word in words]
+    assert read_back == [
+        (page, block, f"line_{page + 1}_{line + 1}", bbox, conf, text) for page, block, line, bbox, conf, text in expected
+    ]
+    assert np.array_equal(table.conf, [word[3] for _, words in alto for word in words])
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+from textlayer.services import workspace
+from textlayer.services.ocr_service import _run_ocr_process
+from textlayer.services.workspace import WorkspaceManager
+
+
+def test_silent_job_is_held_to_its_budget(tmp_path, monkeypatch):
+    # Writes past its budget without printing a line: only the watch tick
+    # can notice.
+    manager = WorkspaceManager(str(tmp_path), job_budget_mb=1)
+    monkeypatch.setattr(workspace, "_workspace", manager)
+    space = manager.try_acquire(0)
+    script = f"import time; open({os.path.join(space.path, 'big')!r}, 'wb').write(bytes(3 << 20)); time.sleep(30)"
+    try:
+        usage = asyncio.run(_run_ocr_process([sys.executable, "-c", script], dict(os.environ), lambda *_: None, space=space))
+    finally:
+        manager.release(space)
+    assert usage.return_code != 0
+    assert usage.killed_reason.startswith("Temp space budget exceeded")
+
+
+def test_check_measures_at_most_every_interval(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), job_budget_mb=1)
+    space = manager.try_acquire(0)
+    asyncio.run(manager.check_async(space))
+    (tmp_path / os.path.basename(space.path) / "data").write_bytes(bytes(1000))
+    asyncio.run(manager.check_async(space))
+    assert space.used_bytes == 0
+    asyncio.run(manager.check_async(space, force=True))
+    assert space.used_bytes == 1000
+    manager.release(space)